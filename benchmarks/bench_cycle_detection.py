@@ -0,0 +1,47 @@
+########
+# Copyright (c) 2015 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+"""Measures the time it takes to report a circular dependency in a
+blueprint whose node templates all depend on each other.
+
+    python -m benchmarks.bench_cycle_detection [nodes_count]
+"""
+
+import sys
+
+from dsl_parser import (exceptions,
+                        parser)
+
+from benchmarks import blueprints
+
+
+def main():
+    nodes_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    raw = blueprints.dense_cycle_blueprint(nodes_count)
+    with blueprints.timer('detect cycle in {0} node templates'
+                          .format(nodes_count)):
+        try:
+            parser.parse(raw)
+        except exceptions.DSLParsingLogicException as e:
+            if e.err_code != exceptions.ERROR_CODE_CYCLE:
+                raise
+            cycle = e.circular_dependency
+        else:
+            raise RuntimeError('No circular dependency detected')
+    print 'reported cycle length: {0}'.format(len(cycle) - 1)
+
+
+if __name__ == '__main__':
+    main()
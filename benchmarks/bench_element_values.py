@@ -0,0 +1,70 @@
+########
+# Copyright (c) 2015 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+"""Counts copy.deepcopy calls (including the recursive ones) and measures
+the time of parsing a synthetic 5k node templates blueprint.
+
+    python -m benchmarks.bench_element_values [nodes_count]
+
+Set DSL_PARSER_DEBUG_SHARED_VALUES=true to measure the debug mode.
+"""
+
+import copy
+import shutil
+import sys
+import tempfile
+
+from dsl_parser import parser
+
+from benchmarks import blueprints
+
+
+class _DeepcopyCounter(object):
+
+    def __init__(self):
+        self.calls = 0
+        self._deepcopy = copy.deepcopy
+
+    def __enter__(self):
+        def counting_deepcopy(*args, **kwargs):
+            self.calls += 1
+            return self._deepcopy(*args, **kwargs)
+        copy.deepcopy = counting_deepcopy
+        return self
+
+    def __exit__(self, *exc_info):
+        copy.deepcopy = self._deepcopy
+
+
+def main():
+    nodes_count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    directory = tempfile.mkdtemp()
+    try:
+        path = blueprints.write_multi_import_blueprint(
+            directory,
+            imports_count=2,
+            types_per_import=20,
+            nodes_count=nodes_count)
+        with _DeepcopyCounter() as counter:
+            with blueprints.timer('parse {0} node templates'
+                                  .format(nodes_count)):
+                parser.parse_from_path(path)
+        print 'deepcopy calls: {0}'.format(counter.calls)
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+########
+# Copyright (c) 2015 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+"""Compares reading the version and imports of a large blueprint with
+parse_dsl_header to loading the whole blueprint.
+
+    python -m benchmarks.bench_header [nodes_count]
+"""
+
+import sys
+
+from dsl_parser import (parser,
+                        yaml_loader)
+
+from benchmarks import blueprints
+
+
+def main():
+    nodes_count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    raw = blueprints.main_blueprint(imports=['types.yaml'],
+                                    nodes_count=nodes_count,
+                                    node_type='bench.nodes.Root')
+    print 'blueprint: {0} KB'.format(len(raw) // 1024)
+    results = {}
+    with blueprints.timer('load', results):
+        yaml_loader.load(raw, 'blueprint.yaml')
+    with blueprints.timer('parse_dsl_header', results):
+        parser.parse_dsl_header(raw, 'blueprint.yaml')
+    print 'speedup: {0:.0f}x'.format(results['load'] /
+                                     results['parse_dsl_header'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+########
+# Copyright (c) 2015 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+"""Measures the peak RSS of loading a synthetic 10k node templates
+blueprint into a holder tree.
+
+    python -m benchmarks.bench_holder_memory [nodes_count]
+"""
+
+import gc
+import resource
+import sys
+
+from dsl_parser import (holder,
+                        yaml_loader)
+
+from benchmarks import blueprints
+
+
+def _count_holders(root):
+    count = 0
+    stack = [root]
+    while stack:
+        current = stack.pop()
+        count += 1
+        if isinstance(current.value, dict):
+            for key_holder, value_holder in current.value.iteritems():
+                stack.append(key_holder)
+                stack.append(value_holder)
+        elif isinstance(current.value, (list, set)):
+            stack.extend(current.value)
+    return count
+
+
+def _max_rss_kb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def main():
+    nodes_count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    raw = blueprints.main_blueprint(imports=['types.yaml'],
+                                    nodes_count=nodes_count,
+                                    node_type='bench.nodes.Root')
+    gc.collect()
+    before = _max_rss_kb()
+    with blueprints.timer('load {0} node templates'.format(nodes_count)):
+        result = yaml_loader.load(raw, 'blueprint.yaml')
+    after = _max_rss_kb()
+    holders = _count_holders(result)
+    print 'holders: {0}'.format(holders)
+    empty_holder = holder.Holder(None)
+    holder_size = sys.getsizeof(empty_holder)
+    if hasattr(empty_holder, '__dict__'):
+        holder_size += sys.getsizeof(empty_holder.__dict__)
+    print 'holder size: {0} bytes'.format(holder_size)
+    print 'peak RSS before load: {0} KB'.format(before)
+    print 'peak RSS after load: {0} KB'.format(after)
+    print 'peak RSS growth: {0} KB'.format(after - before)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+########
+# Copyright (c) 2015 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+"""Measures merging the sections of many imported type libraries into
+the combined blueprint, for a growing number of imports. The time per
+merged type should stay about the same.
+
+    python -m benchmarks.bench_import_merge [imports_count] [types_per_import]
+"""
+
+import sys
+
+from dsl_parser import yaml_loader
+from dsl_parser.elements import imports
+
+from benchmarks import blueprints
+
+
+def _ordered_imports(imports_count, types_per_import):
+    ordered_imports = [{
+        'import': 'blueprint.yaml',
+        'parsed': yaml_loader.load(
+            blueprints.main_blueprint(imports=[],
+                                      nodes_count=1,
+                                      node_type='bench.nodes.Root'),
+            'blueprint.yaml')
+    }, {
+        'import': 'root.yaml',
+        'parsed': yaml_loader.load(blueprints.root_library(), 'root.yaml')
+    }]
+    for i in range(imports_count):
+        name = 'lib{0}.yaml'.format(i)
+        ordered_imports.append({
+            'import': name,
+            'parsed': yaml_loader.load(
+                blueprints.types_library(i, types_per_import), name)
+        })
+    return ordered_imports
+
+
+def main():
+    imports_count = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    types_per_import = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+    for count in [imports_count // 4, imports_count // 2, imports_count]:
+        ordered_imports = _ordered_imports(count, types_per_import)
+        # node types, data types and relationships of the libraries
+        types_count = count * (2 * types_per_import + types_per_import // 10)
+        results = {}
+        description = 'merge {0} imports ({1} types)'.format(count,
+                                                             types_count)
+        with blueprints.timer(description, results):
+            combined = imports._combine_imports(
+                parsed_dsl_holder=ordered_imports[0]['parsed'],
+                ordered_imports=ordered_imports,
+                version=None,
+                validate_version=False)
+        _, node_types = combined.get_item('node_types')
+        assert len(node_types.value) == count * types_per_import + 1
+        print '{0:<50} {1:8.2f}us'.format(
+            '  per type', results[description] * 1e6 / types_count)
+
+
+if __name__ == '__main__':
+    main()
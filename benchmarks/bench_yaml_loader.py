@@ -0,0 +1,65 @@
+########
+# Copyright (c) 2015 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+"""Compares the pure python MarkedLoader with the libyaml backed
+CMarkedLoader on a large multi-import blueprint.
+
+    python -m benchmarks.bench_yaml_loader
+"""
+
+import os
+import shutil
+import tempfile
+
+from dsl_parser import yaml_loader
+
+from benchmarks import blueprints
+
+
+def _load_all(paths, loader_cls):
+    for path in paths:
+        with open(path) as f:
+            yaml_loader.load(f.read(), path, loader_cls=loader_cls)
+
+
+def main():
+    if yaml_loader.CMarkedLoader is None:
+        print 'PyYAML is not built with libyaml, nothing to compare'
+        return
+    directory = tempfile.mkdtemp()
+    try:
+        blueprints.write_multi_import_blueprint(directory,
+                                                imports_count=20,
+                                                types_per_import=150,
+                                                nodes_count=500)
+        paths = [os.path.join(directory, name)
+                 for name in os.listdir(directory)]
+        size = sum(os.path.getsize(path) for path in paths)
+        print 'blueprint: {0} files, {1} KB'.format(len(paths), size // 1024)
+        results = {}
+        for loader_cls in [yaml_loader.MarkedLoader,
+                           yaml_loader.CMarkedLoader]:
+            with blueprints.timer('load ({0})'.format(loader_cls.__name__),
+                                  results):
+                _load_all(paths, loader_cls)
+        print 'load speedup: {0:.1f}x'.format(
+            results['load (MarkedLoader)'] /
+            results['load (CMarkedLoader)'])
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
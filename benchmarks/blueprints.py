@@ -0,0 +1,156 @@
+########
+# Copyright (c) 2015 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+"""Synthetic blueprints used by the benchmarks in this package."""
+
+import os
+import time
+import contextlib
+
+VERSION = 'tosca_definitions_version: cloudify_dsl_1_2\n'
+
+PLUGINS = """
+plugins:
+    bench_plugin:
+        executor: central_deployment_agent
+        source: dummy
+"""
+
+
+def types_library(index, types_count):
+    """A types/plugin yaml file, similar to the type libraries blueprints
+    usually import."""
+    lines = [VERSION, 'data_types:']
+    for i in range(types_count):
+        lines.append("""
+    lib{0}.datatypes.Type{1}:
+        properties:
+            prop1:
+                type: string
+                default: value
+            prop2:
+                type: integer
+                default: {1}""".format(index, i))
+    lines.append('\nnode_types:')
+    for i in range(types_count):
+        derived_from = ('lib{0}.nodes.Type{1}'.format(index, i - 1)
+                        if i else 'bench.nodes.Root')
+        lines.append("""
+    lib{0}.nodes.Type{1}:
+        derived_from: {2}
+        properties:
+            prop1:
+                description: a property of lib{0}.nodes.Type{1}
+                default: value
+            prop2:
+                type: lib{0}.datatypes.Type{1}
+        interfaces:
+            lib{0}.interfaces.Lifecycle:
+                create: bench_plugin.tasks.create
+                start:
+                    implementation: bench_plugin.tasks.start
+                    inputs:
+                        timeout:
+                            default: 30""".format(index, i, derived_from))
+    lines.append('\nrelationships:')
+    for i in range(types_count // 10):
+        lines.append("""
+    lib{0}.relationships.Type{1}:
+        derived_from: bench.relationships.Root
+        source_interfaces:
+            lib{0}.interfaces.Relationship:
+                establish: bench_plugin.tasks.establish""".format(index, i))
+    return '\n'.join(lines) + '\n'
+
+
+def root_library():
+    return VERSION + PLUGINS + """
+node_types:
+    bench.nodes.Root:
+        properties:
+            root_prop:
+                default: root
+relationships:
+    bench.relationships.Root: {}
+"""
+
+
+def main_blueprint(imports, nodes_count, node_type):
+    lines = [VERSION, 'imports:']
+    lines.extend('    - {0}'.format(i) for i in imports)
+    lines.append('node_templates:')
+    for i in range(nodes_count):
+        lines.append("""
+    node{0}:
+        type: {1}
+        properties:
+            prop1: value{0}""".format(i, node_type))
+        if i:
+            lines.append("""        relationships:
+            -   type: bench.relationships.Root
+                target: node{0}""".format(i - 1))
+    return '\n'.join(lines) + '\n'
+
+
+def dense_cycle_blueprint(nodes_count):
+    """A blueprint in which every node template has a relationship to
+    every other node template, so its dependency graph is a complete
+    directed graph with an exponential number of simple cycles."""
+    lines = [VERSION, root_library()[len(VERSION):], 'node_templates:']
+    for i in range(nodes_count):
+        lines.append("""
+    node{0}:
+        type: bench.nodes.Root
+        relationships:""".format(i))
+        for j in range(nodes_count):
+            if i != j:
+                lines.append("""
+            -   type: bench.relationships.Root
+                target: node{0}""".format(j))
+    return '\n'.join(lines) + '\n'
+
+
+def write_multi_import_blueprint(directory,
+                                 imports_count=10,
+                                 types_per_import=100,
+                                 nodes_count=200):
+    """Writes a main blueprint importing ``imports_count`` type libraries
+    into ``directory`` and returns the main blueprint path."""
+    imports = ['root.yaml']
+    _write(directory, 'root.yaml', root_library())
+    for i in range(imports_count):
+        name = 'lib{0}.yaml'.format(i)
+        _write(directory, name, types_library(i, types_per_import))
+        imports.append(name)
+    node_type = 'lib0.nodes.Type{0}'.format(types_per_import - 1)
+    return _write(directory, 'blueprint.yaml',
+                  main_blueprint(imports, nodes_count, node_type))
+
+
+def _write(directory, name, content):
+    path = os.path.join(directory, name)
+    with open(path, 'w') as f:
+        f.write(content)
+    return path
+
+
+@contextlib.contextmanager
+def timer(description, results=None):
+    start = time.time()
+    yield
+    elapsed = time.time() - start
+    if results is not None:
+        results[description] = elapsed
+    print '{0:<50} {1:8.3f}s'.format(description, elapsed)
@@ -0,0 +1,115 @@
+########
+# Copyright (c) 2015 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+"""
+The dsl-parser command:
+
+    dsl-parser lock blueprint.yaml --vendor-dir vendor
+    dsl-parser parse blueprint.yaml --lockfile vendor/imports.lock
+"""
+
+import argparse
+import json
+import os
+import sys
+
+from dsl_parser import (deadline,
+                        exceptions,
+                        import_lock,
+                        parser)
+from dsl_parser.import_resolver.lockfile_import_resolver import \
+    LockfileImportResolver
+
+
+def main(args=None):
+    arg_parser = _arg_parser()
+    args = arg_parser.parse_args(args)
+    try:
+        return args.func(args)
+    except exceptions.DSLParsingException, ex:
+        sys.stderr.write('{0}\n'.format(ex))
+        return 1
+
+
+def lock(args):
+    vendor_dir = args.vendor_dir or os.path.join(
+        os.path.dirname(os.path.abspath(args.blueprint)), 'vendor')
+    lockfile = import_lock.lock_imports(
+        args.blueprint,
+        vendor_dir=vendor_dir,
+        lockfile_path=args.lockfile,
+        resources_base_url=args.resources_base_url)
+    sys.stdout.write('Locked {0} imports of {1} in {2}\n'.format(
+        len(lockfile['imports']),
+        args.blueprint,
+        args.lockfile or os.path.join(vendor_dir,
+                                      import_lock.LOCKFILE_NAME)))
+    return 0
+
+
+def parse(args):
+    resolver = None
+    if args.lockfile:
+        resolver = LockfileImportResolver(args.lockfile)
+    plan = parser.parse_from_path(
+        args.blueprint,
+        resources_base_url=args.resources_base_url,
+        resolver=resolver,
+        validate_version=not args.no_validate_version,
+        deadline=deadline.Deadline(args.timeout))
+    json.dump(plan, sys.stdout, indent=2, sort_keys=True)
+    sys.stdout.write('\n')
+    return 0
+
+
+def _arg_parser():
+    arg_parser = argparse.ArgumentParser(
+        prog='dsl-parser', description='Cloudify DSL parser')
+    commands = arg_parser.add_subparsers()
+
+    lock_parser = commands.add_parser(
+        'lock',
+        help='Resolve all the imports of a blueprint, copy them to a '
+             'vendor directory and write a lockfile of them')
+    lock_parser.add_argument('blueprint', help='Path of the blueprint')
+    lock_parser.add_argument(
+        '--vendor-dir',
+        help='Directory to copy the imports to (default: vendor, next to '
+             'the blueprint)')
+    lock_parser.add_argument(
+        '--lockfile',
+        help='Path of the lockfile (default: imports.lock in the vendor '
+             'directory)')
+    lock_parser.add_argument('--resources-base-url')
+    lock_parser.set_defaults(func=lock)
+
+    parse_parser = commands.add_parser(
+        'parse', help='Parse a blueprint and print its plan as JSON')
+    parse_parser.add_argument('blueprint', help='Path of the blueprint')
+    parse_parser.add_argument(
+        '--lockfile',
+        help='Read the imports from the files vendored by the lock '
+             'command, without network calls')
+    parse_parser.add_argument('--resources-base-url')
+    parse_parser.add_argument('--no-validate-version', action='store_true')
+    parse_parser.add_argument(
+        '--timeout', type=float,
+        help='Fail if parsing takes longer than this many seconds')
+    parse_parser.set_defaults(func=parse)
+    return arg_parser
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,132 @@
+########
+# Copyright (c) 2015 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+"""
+Deadlines of parses.
+
+A Deadline is given to a parse (e.g. ``parser.parse_from_url(url,
+deadline=Deadline(30))``) to bound how long it may take, and may be
+cancelled from another thread. While the parse runs, its deadline is the
+current deadline of the thread parsing, and of the threads fetching its
+imports. Request timeouts are shrunk to the time remaining, and the
+imports traversal and the framework's element loop check it, so the
+parse raises DSLParsingDeadlineException soon after its deadline passed
+or it was cancelled.
+"""
+
+import contextlib
+import functools
+import threading
+import time
+
+from dsl_parser import exceptions
+
+_local = threading.local()
+
+
+class Deadline(object):
+    """
+    A deadline ``timeout`` seconds from its creation, or no deadline if
+    ``timeout`` is None, which can still be cancelled.
+    """
+
+    def __init__(self, timeout=None):
+        self.timeout = timeout
+        self.expires_at = time.time() + timeout \
+            if timeout is not None else None
+        self.cancelled = False
+
+    def cancel(self):
+        """Cancels the parse, which raises once it checks its deadline"""
+        self.cancelled = True
+
+    def remaining(self):
+        """Returns the seconds remaining, or None if there is no deadline"""
+        if self.expires_at is None:
+            return None
+        return max(self.expires_at - time.time(), 0)
+
+    def expired(self):
+        return self.cancelled or self.remaining() == 0
+
+    def check(self):
+        """Raises DSLParsingDeadlineException if the deadline passed or was
+        cancelled"""
+        if self.cancelled:
+            raise exceptions.DSLParsingDeadlineException(
+                'Parsing was cancelled')
+        if self.remaining() == 0:
+            raise exceptions.DSLParsingDeadlineException(
+                'Parsing exceeded its deadline of {0} seconds'
+                .format(self.timeout))
+
+    def request_timeout(self, timeout):
+        """Returns ``timeout`` shrunk to the time remaining, after checking
+        the deadline"""
+        self.check()
+        remaining = self.remaining()
+        if remaining is None:
+            return timeout
+        return min(timeout, remaining)
+
+
+def current():
+    """Returns the deadline of the parse running in this thread, or None"""
+    return getattr(_local, 'deadline', None)
+
+
+def check():
+    """Checks the current deadline, if there is one"""
+    deadline = current()
+    if deadline is not None:
+        deadline.check()
+
+
+def request_timeout(timeout):
+    """Returns ``timeout`` shrunk to the time remaining of the current
+    deadline, if there is one"""
+    deadline = current()
+    if deadline is None:
+        return timeout
+    return deadline.request_timeout(timeout)
+
+
+@contextlib.contextmanager
+def activated(deadline):
+    """Makes ``deadline`` (if it is not None) the current deadline of this
+    thread in the context"""
+    if deadline is None:
+        yield
+        return
+    previous = current()
+    _local.deadline = deadline
+    try:
+        yield
+    finally:
+        _local.deadline = previous
+
+
+def propagated(func):
+    """Returns ``func`` to run with the current deadline of this thread,
+    e.g. by a thread pool"""
+    deadline = current()
+    if deadline is None:
+        return func
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with activated(deadline):
+            return func(*args, **kwargs)
+    return wrapper
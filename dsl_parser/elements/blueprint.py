@@ -54,16 +54,46 @@ class BlueprintImporter(Element):
         'imports': imports.ImportsLoader,
     }
     requires = {
-        imports.ImportsLoader: ['resource_base']
+        imports.ImportsLoader: ['resource_base', 'imported_blueprints']
     }
 
-    def parse(self, resource_base):
+    def parse(self, resource_base, imported_blueprints):
         return {
             'merged_blueprint': self.child(imports.ImportsLoader).value,
-            'resource_base': resource_base
+            'resource_base': resource_base,
+            'imported_blueprints': imported_blueprints
         }
 
 
+class TypeLibrary(Element):
+    """
+    The types defined by the imports of a blueprint, parsed on their own
+    so they can be prelinked into the blueprints that import them.
+    """
+
+    schema = {
+        'tosca_definitions_version': _version.ToscaDefinitionsVersion,
+        'plugins': plugins.Plugins,
+        'node_types': node_types.NodeTypes,
+        'relationships': relationships.Relationships,
+        'data_types': data_types.DataTypes
+    }
+
+    def parse(self):
+        result = {
+            constants.PLUGINS: set(self.child(plugins.Plugins).value or {})
+        }
+        for section in [node_types.NodeTypes,
+                        relationships.Relationships,
+                        data_types.DataTypes]:
+            section_element = self.child(section)
+            result[section_element.name] = dict(
+                (element.name, {'value': element.value,
+                                'provided': element.provided})
+                for element in section_element.children())
+        return result
+
+
 class Blueprint(Element):
 
     schema = {
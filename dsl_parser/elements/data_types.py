@@ -26,7 +26,9 @@ from dsl_parser.framework.elements import (
 from dsl_parser.framework.requirements import (
     Value,
     Requirement,
-    sibling_predicate)
+    element_name_key,
+    parent_key,
+    parent_keys)
 
 
 class SchemaPropertyDescription(Element):
@@ -61,7 +63,8 @@ class SchemaPropertyDefault(Element):
     requires = {
         SchemaPropertyType: [Requirement('component_types',
                                          required=False,
-                                         predicate=sibling_predicate)]
+                                         source_keys=parent_keys,
+                                         target_key=parent_key)]
     }
 
     def parse(self, component_types):
@@ -157,10 +160,12 @@ class DataType(types.Type):
             Requirement('component_types',
                         multiple_results=True,
                         required=False,
-                        predicate=lambda source, target:
-                            target.name in source.direct_component_types),
+                        source_keys=lambda source:
+                            source.direct_component_types,
+                        target_key=element_name_key),
             Value('super_type',
-                  predicate=types.derived_from_predicate,
+                  source_keys=types.derived_from_keys,
+                  target_key=element_name_key,
                   required=False)
         ]
     }
@@ -227,12 +232,17 @@ class DataTypes(types.Types):
 
 
 # source: element describing data_type name
-# target: data_type
-def _has_type(source, target):
-    return source.initial_value == target.name
+def _type_keys(source):
+    return [source.initial_value]
 
 
 SchemaPropertyType.requires[DataType] = [
-    Value('data_type', predicate=_has_type, required=False),
-    Requirement('component_types', predicate=_has_type, required=False)
+    Value('data_type',
+          source_keys=_type_keys,
+          target_key=element_name_key,
+          required=False),
+    Requirement('component_types',
+                source_keys=_type_keys,
+                target_key=element_name_key,
+                required=False)
 ]
@@ -13,18 +13,27 @@
 #    * See the License for the specific language governing permissions and
 #    * limitations under the License.
 
+import hashlib
 import os
+import sys
+import threading
 import urllib
+import urlparse
+from multiprocessing.pool import ThreadPool
 
 import networkx as nx
 
-from dsl_parser import (exceptions,
+from dsl_parser import (deadline as _deadline,
+                        exceptions,
                         constants,
+                        existence_cache as _existence_cache,
+                        limits as _limits,
                         version as _version,
                         utils)
 from dsl_parser.framework.elements import (Element,
                                            Leaf,
                                            List)
+from dsl_parser.framework.requirements import Requirement
 
 MERGE_NO_OVERRIDE = set([
     constants.INTERFACES,
@@ -62,17 +71,22 @@ class ImportLoader(Element):
 class ImportsLoader(Element):
 
     schema = List(type=ImportLoader)
-    provides = ['resource_base']
+    provides = ['resource_base', 'imported_blueprints']
     requires = {
         'inputs': ['main_blueprint_holder',
                    'resources_base_url',
                    'blueprint_location',
                    'version',
                    'resolver',
-                   'validate_version']
+                   'validate_version',
+                   Requirement('existence_cache', required=False),
+                   Requirement('resource_manifest', required=False),
+                   Requirement('import_prefetch', required=False),
+                   Requirement('limits', required=False)]
     }
 
     resource_base = None
+    imported_blueprints = None
 
     def validate(self, **kwargs):
         imports = [i.value for i in self.children()]
@@ -89,23 +103,45 @@ class ImportsLoader(Element):
               blueprint_location,
               version,
               resolver,
-              validate_version):
+              validate_version,
+              existence_cache,
+              resource_manifest,
+              import_prefetch,
+              limits):
         if blueprint_location:
             blueprint_location = _dsl_location_to_url(
                 dsl_location=blueprint_location,
                 resources_base_url=resources_base_url)
             slash_index = blueprint_location.rfind('/')
             self.resource_base = blueprint_location[:slash_index]
+            manifest_base = self.resource_base
+        else:
+            # e.g. a blueprint parsed from a string
+            manifest_base = resources_base_url
+        if resource_manifest is not None and existence_cache is not None \
+                and manifest_base:
+            existence_cache.add_manifest(manifest_base, resource_manifest)
+        ordered_imports = list(_build_ordered_imports(
+            parsed_dsl_holder=main_blueprint_holder,
+            dsl_location=blueprint_location,
+            resources_base_url=resources_base_url,
+            resolver=resolver,
+            existence_cache=existence_cache,
+            import_prefetch=import_prefetch,
+            limits=limits))
+        if import_prefetch is not None:
+            import_prefetch.record()
+        self.imported_blueprints = [imported for imported in ordered_imports
+                                    if imported['digest'] is not None]
         return _combine_imports(parsed_dsl_holder=main_blueprint_holder,
-                                dsl_location=blueprint_location,
-                                resources_base_url=resources_base_url,
+                                ordered_imports=ordered_imports,
                                 version=version,
-                                resolver=resolver,
                                 validate_version=validate_version)
 
     def calculate_provided(self, **kwargs):
         return {
-            'resource_base': self.resource_base
+            'resource_base': self.resource_base,
+            'imported_blueprints': self.imported_blueprints
         }
 
 
@@ -126,57 +162,177 @@ def _dsl_location_to_url(dsl_location, resources_base_url):
 
 def _get_resource_location(resource_name,
                            resources_base_url,
-                           current_resource_context=None):
+                           current_resource_context=None,
+                           existence_cache=None):
     url_parts = resource_name.split(':')
     if url_parts[0] in ['http', 'https', 'file', 'ftp']:
-        return resource_name
+        return _canonical_url(resource_name)
 
     if os.path.exists(resource_name):
         return 'file:{0}'.format(
             urllib.pathname2url(os.path.abspath(resource_name)))
 
     if current_resource_context:
-        candidate_url = current_resource_context[
-            :current_resource_context.rfind('/') + 1] + resource_name
-        if utils.url_exists(candidate_url):
+        candidate_url = _canonical_url(current_resource_context[
+            :current_resource_context.rfind('/') + 1] + resource_name)
+        if existence_cache is not None:
+            exists = existence_cache.exists(candidate_url)
+        else:
+            exists = utils.url_exists(candidate_url)
+        if exists:
             return candidate_url
 
     if resources_base_url:
-        return resources_base_url + resource_name
+        return _canonical_url(resources_base_url + resource_name)
 
     return None
 
 
-def _combine_imports(parsed_dsl_holder, dsl_location,
-                     resources_base_url, version, resolver,
+_DEFAULT_PORTS = {
+    'http': '80',
+    'https': '443',
+    'ftp': '21'
+}
+
+
+def _canonical_url(url):
+    """Returns the canonical form of ``url``: its scheme and host in lower
+    case, without the default port of its scheme, without a fragment and
+    with the '.' and '..' segments of its path removed. URLs that are
+    already canonical are returned as is."""
+    parts = urlparse.urlsplit(url)
+    scheme = parts.scheme.lower()
+    if scheme not in ['http', 'https', 'file', 'ftp']:
+        return url
+    netloc = parts.netloc
+    userinfo, at, hostport = netloc.rpartition('@')
+    host, colon, port = hostport.partition(':')
+    if port == _DEFAULT_PORTS.get(scheme):
+        colon = port = ''
+    netloc = userinfo + at + host.lower() + colon + port
+    path = parts.path
+    if '/.' in path or path.startswith('.'):
+        path = _remove_dot_segments(path)
+    if (scheme == parts.scheme and netloc == parts.netloc and
+            path == parts.path and not parts.fragment):
+        return url
+    authority = '//' + netloc if url[len(scheme) + 1:].startswith('//') \
+        else ''
+    query = '?' + parts.query if parts.query else ''
+    return '{0}:{1}{2}{3}'.format(scheme, authority, path, query)
+
+
+def _remove_dot_segments(path):
+    """Removes the '.' and '..' segments of ``path`` as RFC 3986 (5.2.4)
+    does for absolute paths. The '..' segments of a relative path that
+    go above its start are kept, e.g. '../a/../b' is '../b'."""
+    absolute = path.startswith('/')
+    segments = path.split('/')
+    if absolute:
+        segments = segments[1:]
+    result = []
+    for segment in segments:
+        if segment == '..':
+            if result and result[-1] != '..':
+                result.pop()
+            elif not absolute:
+                result.append('..')
+        elif segment != '.':
+            result.append(segment)
+    # a removed last segment leaves the path ending with a '/'
+    if segments[-1] in ['.', '..'] and (not result or result[-1] != '..'):
+        result.append('')
+    return ('/' if absolute else '') + '/'.join(result)
+
+
+def _combine_imports(parsed_dsl_holder, ordered_imports, version,
                      validate_version):
-    ordered_imports = _build_ordered_imports(parsed_dsl_holder,
-                                             dsl_location,
-                                             resources_base_url,
-                                             resolver)
     holder_result = parsed_dsl_holder.copy()
     version_key_holder, version_value_holder = parsed_dsl_holder.get_item(
         _version.VERSION)
     holder_result.value = {}
+    # section name -> (section holder, keys of the section), the keys are
+    # only indexed for the sections later imports are merged into
+    sections = {}
     for imported in ordered_imports:
         import_url = imported['import']
         parsed_imported_dsl_holder = imported['parsed']
         if validate_version:
             _validate_version(version.raw, import_url,
                               parsed_imported_dsl_holder)
-        _merge_parsed_into_combined(holder_result, parsed_imported_dsl_holder)
-    holder_result.value[version_key_holder] = version_value_holder
+        _merge_parsed_into_combined(holder_result,
+                                    parsed_imported_dsl_holder,
+                                    sections,
+                                    import_url)
+    holder_result.set_item(version_key_holder, version_value_holder)
     return holder_result
 
 
+def resolve_imports(dsl_string,
+                    dsl_location,
+                    resources_base_url,
+                    resolver,
+                    existence_cache=None,
+                    limits=None):
+    """
+    Loads the blueprint ``dsl_string`` of ``dsl_location`` and resolves
+    its imports, recursively, the same way the imports stage of a parse
+    does, without parsing the blueprint any further.
+
+    Returns the ImportsGraph of the blueprint, whose ``root`` is the URL
+    of the blueprint.
+    """
+    dsl_location = _dsl_location_to_url(
+        dsl_location=dsl_location,
+        resources_base_url=resources_base_url)
+    parsed_dsl_holder = utils.load_yaml(raw_yaml=dsl_string,
+                                        error_message='Failed to parse DSL',
+                                        filename=dsl_location,
+                                        limits=limits)
+    return _build_imports_graph(parsed_dsl_holder,
+                                dsl_location=dsl_location,
+                                resources_base_url=resources_base_url,
+                                resolver=resolver,
+                                existence_cache=existence_cache,
+                                limits=limits)
+
+
 def _build_ordered_imports(parsed_dsl_holder,
                            dsl_location,
                            resources_base_url,
-                           resolver):
+                           resolver,
+                           existence_cache=None,
+                           import_prefetch=None,
+                           limits=None):
+    return _build_imports_graph(parsed_dsl_holder,
+                                dsl_location,
+                                resources_base_url,
+                                resolver,
+                                existence_cache=existence_cache,
+                                import_prefetch=import_prefetch,
+                                limits=limits).topological_sort()
+
+
+def _build_imports_graph(parsed_dsl_holder,
+                         dsl_location,
+                         resources_base_url,
+                         resolver,
+                         existence_cache=None,
+                         import_prefetch=None,
+                         limits=None):
 
     def location(value):
         return value or 'root'
 
+    if existence_cache is None:
+        existence_cache = _existence_cache.ExistenceCache(
+            session=getattr(resolver, 'session', None))
+    if import_prefetch is not None:
+        existence_cache = import_prefetch.existence_cache(existence_cache)
+    fetcher = _imports_fetcher(resolver, resources_base_url, existence_cache,
+                               import_prefetch, limits)
+    fetcher.prefetch(parsed_dsl_holder, dsl_location)
+
     imports_graph = ImportsGraph()
     imports_graph.add(location(dsl_location), parsed_dsl_holder)
 
@@ -188,9 +344,8 @@ def _build_ordered_imports(parsed_dsl_holder,
             return
 
         for another_import in imports_value_holder.restore():
-            import_url = _get_resource_location(another_import,
-                                                resources_base_url,
-                                                _current_import)
+            _deadline.check()
+            import_url = fetcher.location(another_import, _current_import)
             if import_url is None:
                 ex = exceptions.DSLParsingLogicException(
                     13, "Import failed: no suitable location found for "
@@ -200,19 +355,294 @@ def _build_ordered_imports(parsed_dsl_holder,
             if import_url in imports_graph:
                 imports_graph.add_graph_dependency(import_url,
                                                    location(_current_import))
-            else:
-                raw_imported_dsl = resolver.fetch_import(import_url)
-                imported_dsl_holder = utils.load_yaml(
-                    raw_yaml=raw_imported_dsl,
-                    error_message="Failed to parse import '{0}' (via '{1}')"
-                                  .format(another_import, import_url),
-                    filename=another_import)
-                imports_graph.add(import_url, imported_dsl_holder,
-                                  location(_current_import))
-                _build_ordered_imports_recursive(imported_dsl_holder,
-                                                 import_url)
+                continue
+            if limits is not None:
+                # the blueprint is in the graph too
+                limits.check_imports(len(imports_graph))
+            raw_imported_dsl = fetcher.fetch(import_url)
+            digest = _digest(raw_imported_dsl)
+            same_import = imports_graph.find_by_digest(digest)
+            if same_import is not None and _same_imports(
+                    fetcher, imports_graph.parsed(same_import),
+                    same_import, import_url):
+                # the same document, reached by another URL
+                imports_graph.add_alias(import_url, same_import,
+                                        location(_current_import))
+                continue
+            imported_dsl_holder = fetcher.load(
+                import_url,
+                raw_yaml=raw_imported_dsl,
+                error_message="Failed to parse import '{0}' (via '{1}')"
+                              .format(another_import, import_url),
+                filename=another_import)
+            imports_graph.add(import_url, imported_dsl_holder,
+                              location(_current_import),
+                              digest=digest)
+            _build_ordered_imports_recursive(imported_dsl_holder,
+                                             import_url)
     _build_ordered_imports_recursive(parsed_dsl_holder, dsl_location)
-    return imports_graph.topological_sort()
+    return imports_graph
+
+
+def _imports_fetcher(resolver, resources_base_url, existence_cache,
+                     import_prefetch=None, limits=None):
+    max_imports = getattr(resolver, 'max_concurrent_imports', 1)
+    if max_imports > 1:
+        return _ConcurrentImportsFetcher(
+            resolver,
+            resources_base_url,
+            existence_cache,
+            import_prefetch,
+            max_imports=max_imports,
+            max_imports_per_host=getattr(
+                resolver, 'max_concurrent_imports_per_host', 1),
+            limits=limits)
+    return _ImportsFetcher(resolver, resources_base_url, existence_cache,
+                           import_prefetch, limits)
+
+
+class _ImportsFetcher(object):
+    """
+    Locates and fetches imports on demand, one at a time.
+
+    Relative imports are located by checking candidate URLs with
+    ``existence_cache``, and the content a check downloaded is used
+    instead of fetching it again, if the resolver reads the URL as is.
+    Imports ``import_prefetch`` (an import_prefetch.SpeculativePrefetch)
+    prefetched are taken from it. Imports are loaded within ``limits``
+    (a limits.ParsingLimits).
+    """
+
+    def __init__(self, resolver, resources_base_url, existence_cache,
+                 import_prefetch=None, limits=None):
+        self.resolver = resolver
+        self.resources_base_url = resources_base_url
+        self.existence_cache = existence_cache
+        self.import_prefetch = import_prefetch
+        self.limits = limits
+
+    def prefetch(self, parsed_dsl_holder, dsl_location):
+        pass
+
+    def location(self, another_import, current_import):
+        return _get_resource_location(another_import,
+                                      self.resources_base_url,
+                                      current_import,
+                                      existence_cache=self.existence_cache)
+
+    def fetch(self, import_url):
+        if self.import_prefetch is not None:
+            content = self.import_prefetch.fetch(import_url)
+            if content is not None:
+                return content
+        reads_as_is = getattr(self.resolver, 'reads_as_is', None)
+        if reads_as_is is not None and reads_as_is(import_url):
+            content = self.existence_cache.content(import_url)
+            if content is not None:
+                return content
+        return self.resolver.fetch_import(import_url)
+
+    def load(self, import_url, raw_yaml, error_message, filename):
+        return utils.load_yaml(raw_yaml=raw_yaml,
+                               error_message=error_message,
+                               filename=filename,
+                               limits=self.limits)
+
+
+class _ConcurrentImportsFetcher(_ImportsFetcher):
+    """
+    Discovers the imports graph level by level before it is built and
+    fetches the imports of each level concurrently, by up to
+    ``max_imports`` threads and by up to ``max_imports_per_host`` threads
+    from the same host.
+
+    The imports graph is then built by the same depth first traversal
+    as without prefetching, which is answered from the prefetched
+    locations, contents and loaded documents, so the graph and the merge
+    order are the same. Documents are loaded once, by the first name
+    they are imported by in their level, which the traversal loads them
+    by too unless it reaches them by another name first.
+    Failures are kept and raised when the traversal reaches the failed
+    import, imports the traversal gets to but were not prefetched
+    (e.g. imports of an invalid import) are located and fetched on demand.
+
+    ``limits`` (a limits.ParsingLimits) bound the imports of a level
+    before they are fetched, and each import is checked against them
+    when it is loaded, before its imports are read.
+    """
+
+    def __init__(self, resolver, resources_base_url, existence_cache,
+                 import_prefetch, max_imports, max_imports_per_host,
+                 limits=None):
+        super(_ConcurrentImportsFetcher, self).__init__(resolver,
+                                                        resources_base_url,
+                                                        existence_cache,
+                                                        import_prefetch,
+                                                        limits)
+        self.max_imports = max_imports
+        self.max_imports_per_host = max_imports_per_host
+        # (import, current import) -> (location, exc_info)
+        self._locations = {}
+        # import url -> (content, exc_info)
+        self._contents = {}
+        # import url -> (filename, loaded dsl holder)
+        self._loaded = {}
+        self._host_semaphores = {}
+        self._lock = threading.Lock()
+        self._pool = None
+
+    def prefetch(self, parsed_dsl_holder, dsl_location):
+        try:
+            level = [(dsl_location, parsed_dsl_holder)]
+            while level:
+                level = self._prefetch_level(level)
+        finally:
+            if self._pool is not None:
+                self._pool.terminate()
+                self._pool.join()
+                self._pool = None
+
+    def location(self, another_import, current_import):
+        key = (another_import, current_import)
+        if isinstance(another_import, basestring) and key in self._locations:
+            return self._result(self._locations[key])
+        return super(_ConcurrentImportsFetcher, self).location(
+            another_import, current_import)
+
+    def fetch(self, import_url):
+        if import_url in self._contents:
+            return self._result(self._contents.pop(import_url))
+        return super(_ConcurrentImportsFetcher, self).fetch(import_url)
+
+    def load(self, import_url, raw_yaml, error_message, filename):
+        loaded = self._loaded.pop(import_url, None)
+        if loaded is not None and loaded[0] == filename:
+            return loaded[1]
+        return super(_ConcurrentImportsFetcher, self).load(
+            import_url, raw_yaml, error_message, filename)
+
+    def _prefetch_level(self, level):
+        imports = _unique((another_import, current_import)
+                          for current_import, dsl_holder in level
+                          for another_import in _import_names(dsl_holder))
+        new_imports = [i for i in imports if i not in self._locations]
+        self._locations.update(zip(new_imports,
+                                   self._map(self._locate, new_imports)))
+        # import url -> the first name it is imported by in the level
+        names = {}
+        for key in imports:
+            location, _ = self._locations[key]
+            if location is not None:
+                names.setdefault(location, key[0])
+        import_urls = _unique(location for location, exc_info in
+                              (self._locations[i] for i in imports)
+                              if location is not None and
+                              location not in self._contents)
+        if self.limits is not None:
+            self.limits.check_imports(len(self._contents) + len(import_urls))
+        next_level = []
+        for import_url, result in zip(import_urls,
+                                      self._map(self._fetch, import_urls)):
+            self._contents[import_url] = result
+            content, exc_info = result
+            if exc_info is not None:
+                continue
+            try:
+                imported_dsl_holder = super(
+                    _ConcurrentImportsFetcher, self).load(
+                        import_url,
+                        raw_yaml=content,
+                        error_message='',
+                        filename=names[import_url])
+            except exceptions.DSLParsingFormatException:
+                # reported by the traversal, which loads the import again,
+                # as are imports over the limits
+                continue
+            self._loaded[import_url] = (names[import_url],
+                                        imported_dsl_holder)
+            next_level.append((import_url, imported_dsl_holder))
+        return next_level
+
+    def _locate(self, key):
+        another_import, current_import = key
+        with self._host_semaphore(current_import):
+            return self._call(super(_ConcurrentImportsFetcher, self).location,
+                              another_import, current_import)
+
+    def _fetch(self, import_url):
+        with self._host_semaphore(import_url):
+            return self._call(
+                super(_ConcurrentImportsFetcher, self).fetch, import_url)
+
+    def _map(self, func, items):
+        if len(items) <= 1:
+            return map(func, items)
+        if self._pool is None:
+            self._pool = ThreadPool(self.max_imports)
+        return self._pool.map(_deadline.propagated(_limits.propagated(func)),
+                              items, chunksize=1)
+
+    def _host_semaphore(self, url):
+        host = urlparse.urlparse(url or '').netloc
+        with self._lock:
+            semaphore = self._host_semaphores.get(host)
+            if semaphore is None:
+                semaphore = threading.BoundedSemaphore(
+                    self.max_imports_per_host)
+                self._host_semaphores[host] = semaphore
+            return semaphore
+
+    @staticmethod
+    def _call(func, *args):
+        try:
+            return func(*args), None
+        except Exception:
+            return None, sys.exc_info()
+
+    @staticmethod
+    def _result(result):
+        value, exc_info = result
+        if exc_info is not None:
+            raise exc_info[0], exc_info[1], exc_info[2]
+        return value
+
+
+def _import_names(dsl_holder):
+    if not isinstance(dsl_holder.value, dict):
+        return []
+    _, imports_holder = dsl_holder.get_item(constants.IMPORTS)
+    if not imports_holder or not isinstance(imports_holder.value, list):
+        return []
+    return [i.value for i in imports_holder.value
+            if isinstance(i.value, basestring)]
+
+
+def _same_imports(fetcher, parsed_dsl_holder, import_url, other_url):
+    # identical documents at different URLs are the same import only if
+    # their relative imports are located at the same URLs too
+    for another_import in _import_names(parsed_dsl_holder):
+        if (fetcher.location(another_import, import_url) !=
+                fetcher.location(another_import, other_url)):
+            return False
+    return True
+
+
+def _digest(raw_yaml):
+    if isinstance(raw_yaml, unicode):
+        raw_yaml = raw_yaml.encode('utf-8')
+    if not isinstance(raw_yaml, str):
+        return None
+    return hashlib.sha1(raw_yaml).hexdigest()
+
+
+def _unique(items):
+    seen = set()
+    result = []
+    for item in items:
+        if item not in seen:
+            seen.add(item)
+            result.append(item)
+    return result
 
 
 def _validate_version(dsl_version,
@@ -233,59 +663,155 @@ def _validate_version(dsl_version,
 
 
 def _merge_parsed_into_combined(combined_parsed_dsl_holder,
-                                parsed_imported_dsl_holder):
+                                parsed_imported_dsl_holder,
+                                sections,
+                                import_url):
     for key_holder, value_holder in parsed_imported_dsl_holder.value.\
             iteritems():
-        if key_holder.value in IGNORE:
-            pass
-        elif key_holder.value not in combined_parsed_dsl_holder:
+        section_name = key_holder.value
+        if section_name in IGNORE:
+            continue
+        section = sections.get(section_name)
+        if section is None:
+            keys = None
+            if section_name in MERGE_NO_OVERRIDE:
+                # later imports are merged into this section, parsed holders
+                # may be shared (cached) so they are copied before that
+                _validate_mergeable(section_name, value_holder, import_url)
+                value_holder = _copy_dict_holder(value_holder)
+                keys = _index_keys(value_holder)
+            # the combined holder's key index is rebuilt once it is read
             combined_parsed_dsl_holder.value[key_holder] = value_holder
-        elif key_holder.value in MERGE_NO_OVERRIDE:
-            _, to_dict = combined_parsed_dsl_holder.get_item(key_holder.value)
+            sections[section_name] = (value_holder, keys)
+        elif section[1] is not None:
+            _validate_mergeable(section_name, value_holder, import_url)
+            if value_holder.value is None:
+                continue
+            if section[0].value is None:
+                section[0].value = {}
             _merge_into_dict_or_throw_on_duplicate(
                 from_dict_holder=value_holder,
-                to_dict_holder=to_dict,
-                key_name=key_holder.value)
+                to_dict_holder=section[0],
+                to_dict_keys=section[1],
+                key_name=section_name)
         else:
             raise exceptions.DSLParsingLogicException(
                 3, "Import failed: non-mergeable field: '{0}'"
-                   .format(key_holder.value))
+                   .format(section_name))
 
 
 def _merge_into_dict_or_throw_on_duplicate(from_dict_holder, to_dict_holder,
-                                           key_name):
+                                           to_dict_keys, key_name):
+    to_dict = to_dict_holder.value
     for key_holder, value_holder in from_dict_holder.value.iteritems():
-        if key_holder.value not in to_dict_holder:
-            to_dict_holder.value[key_holder] = value_holder
-        else:
-            raise exceptions.DSLParsingLogicException(
-                4, "Import failed: Could not merge '{0}' due to conflict "
-                   "on '{1}'".format(key_name, key_holder.value))
+        key = key_holder.value
+        try:
+            if key in to_dict_keys:
+                raise exceptions.DSLParsingLogicException(
+                    4, "Import failed: Could not merge '{0}' due to "
+                       "conflict on '{1}'".format(key_name, key))
+            to_dict_keys.add(key)
+        except TypeError:
+            # unhashable keys (e.g. complex yaml keys) never conflict
+            pass
+        to_dict[key_holder] = value_holder
+
+
+def _validate_mergeable(section_name, value_holder, import_url):
+    # an empty section is merged as an empty dict
+    if value_holder.value is not None and \
+            not isinstance(value_holder.value, dict):
+        raise exceptions.DSLParsingFormatException(
+            1, "Import failed: '{0}' of import '{1}' must be a dict but "
+               "found a {2}".format(section_name,
+                                    import_url,
+                                    type(value_holder.value).__name__))
+
+
+def _index_keys(dict_holder):
+    keys = set()
+    if dict_holder.value is None:
+        return keys
+    for key_holder in dict_holder.value:
+        try:
+            keys.add(key_holder.value)
+        except TypeError:
+            pass
+    return keys
+
+
+def _copy_dict_holder(dict_holder):
+    result = dict_holder.copy()
+    if isinstance(result.value, dict):
+        result.value = dict(result.value)
+    return result
 
 
 class ImportsGraph(object):
+    """
+    The imports of a blueprint, by the canonical URL of the first location
+    each of them was imported from. Imports are indexed by the digest of
+    their content too, so a document reached again by another URL (e.g.
+    a mirror) is added as an alias of the import it is the same as.
+
+    ``root`` is the first import added, the blueprint importing the others.
+    """
 
     def __init__(self):
+        self.root = None
         self._imports_tree = nx.DiGraph()
         self._imports_graph = nx.DiGraph()
-
-    def add(self, import_url, parsed, via_import=None):
+        # digest -> import url
+        self._digests = {}
+        # alias url -> import url
+        self._aliases = {}
+
+    def add(self, import_url, parsed, via_import=None, digest=None):
+        if self.root is None:
+            self.root = import_url
         if import_url not in self._imports_tree:
-            self._imports_tree.add_node(import_url, parsed=parsed)
-            self._imports_graph.add_node(import_url, parsed=parsed)
+            self._imports_tree.add_node(import_url, parsed=parsed,
+                                        digest=digest)
+            self._imports_graph.add_node(import_url, parsed=parsed,
+                                         digest=digest)
+            if digest is not None:
+                self._digests.setdefault(digest, import_url)
         if via_import:
             self._imports_tree.add_edge(import_url, via_import)
             self._imports_graph.add_edge(import_url, via_import)
 
+    def add_alias(self, alias_url, import_url, via_import=None):
+        self._aliases[alias_url] = import_url
+        self.add_graph_dependency(import_url, via_import)
+
     def add_graph_dependency(self, import_url, via_import):
         if via_import:
+            import_url = self._aliases.get(import_url, import_url)
             self._imports_graph.add_edge(import_url, via_import)
 
+    def find_by_digest(self, digest):
+        if digest is None:
+            return None
+        return self._digests.get(digest)
+
+    def parsed(self, import_url):
+        import_url = self._aliases.get(import_url, import_url)
+        return self._imports_tree.node[import_url]['parsed']
+
+    def aliases(self):
+        """Returns the URLs imports were reached by again, as a dict of
+        the import URL of each of them"""
+        return dict(self._aliases)
+
     def topological_sort(self):
         return reversed(list(
             ({'import': i,
-             'parsed': self._imports_tree.node[i]['parsed']}
+              'parsed': self._imports_tree.node[i]['parsed'],
+              'digest': self._imports_tree.node[i]['digest']}
              for i in nx.topological_sort(self._imports_tree))))
 
     def __contains__(self, item):
-        return item in self._imports_tree
+        return item in self._imports_tree or item in self._aliases
+
+    def __len__(self):
+        return len(self._imports_tree) + len(self._aliases)
@@ -24,7 +24,11 @@ from dsl_parser.elements import (node_types as _node_types,
                                  relationships as _relationships,
                                  operation as _operation,
                                  data_types as _data_types)
-from dsl_parser.framework.requirements import Value, Requirement
+from dsl_parser.framework.requirements import (Value,
+                                               Requirement,
+                                               element_name_key,
+                                               parent_key,
+                                               parent_keys)
 from dsl_parser.framework.elements import (DictElement,
                                            Element,
                                            Leaf,
@@ -53,14 +57,15 @@ class NodeTemplateProperties(Element):
 
     schema = Leaf(type=dict)
     requires = {
-        NodeTemplateType: [],
+        NodeTemplateType: [Value('node_type_name',
+                                 source_keys=parent_keys,
+                                 target_key=parent_key)],
         _node_types.NodeTypes: [Value('node_types')],
         _data_types.DataTypes: [Value('data_types')]
     }
 
-    def parse(self, node_types, data_types):
+    def parse(self, node_type_name, node_types, data_types):
         properties = self.initial_value or {}
-        node_type_name = self.sibling(NodeTemplateType).value
         node_type = node_types[node_type_name]
         return utils.merge_schema_and_instance_properties(
             instance_properties=properties,
@@ -121,14 +126,14 @@ class NodeTemplateRelationshipProperties(Element):
 
     schema = Leaf(type=dict)
     requires = {
-        NodeTemplateRelationshipType: [],
+        NodeTemplateRelationshipType: [Value('relationship_type_name',
+                                             source_keys=parent_keys,
+                                             target_key=parent_key)],
         _relationships.Relationships: [Value('relationships')],
         _data_types.DataTypes: [Value('data_types')]
     }
 
-    def parse(self, relationships, data_types):
-        relationship_type_name = self.sibling(
-            NodeTemplateRelationshipType).value
+    def parse(self, relationship_type_name, relationships, data_types):
         properties = self.initial_value or {}
         return utils.merge_schema_and_instance_properties(
             instance_properties=properties,
@@ -170,12 +175,11 @@ class NodeTemplateInstances(DictElement):
             return self.initial_value
 
 
-def _node_template_relationship_type_predicate(source, target):
+def _node_template_relationship_type_keys(source):
     try:
-        return (source.child(NodeTemplateRelationshipType).initial_value ==
-                target.name)
+        return [source.child(NodeTemplateRelationshipType).initial_value]
     except exceptions.DSLParsingElementMatchException:
-        return False
+        return []
 
 
 class NodeTemplateRelationship(Element):
@@ -190,7 +194,8 @@ class NodeTemplateRelationship(Element):
     requires = {
         _relationships.Relationship: [
             Value('relationship_type',
-                  predicate=_node_template_relationship_type_predicate)]
+                  source_keys=_node_template_relationship_type_keys,
+                  target_key=element_name_key)]
     }
 
     def parse(self, relationship_type):
@@ -256,20 +261,17 @@ class NodeTemplateRelationships(Element):
         }
 
 
-def _node_template_related_nodes_predicate(source, target):
-    if source.name == target.name:
-        return False
+def _node_template_related_nodes_keys(source):
     targets = source.descendants(NodeTemplateRelationshipTarget)
-    relationship_targets = [e.initial_value for e in targets]
-    return target.name in relationship_targets
+    return [e.initial_value for e in targets
+            if e.initial_value != source.name]
 
 
-def _node_template_node_type_predicate(source, target):
+def _node_template_node_type_keys(source):
     try:
-        return (source.child(NodeTemplateType).initial_value ==
-                target.name)
+        return [source.child(NodeTemplateType).initial_value]
     except exceptions.DSLParsingElementMatchException:
-        return False
+        return []
 
 
 class NodeTemplate(Element):
@@ -282,14 +284,17 @@ class NodeTemplate(Element):
         'properties': NodeTemplateProperties,
     }
     requires = {
-        'inputs': [Requirement('resource_base', required=False)],
+        'inputs': [Requirement('resource_base', required=False),
+                   Requirement('existence_cache', required=False)],
         'self': [Value('related_node_templates',
-                       predicate=_node_template_related_nodes_predicate,
+                       source_keys=_node_template_related_nodes_keys,
+                       target_key=element_name_key,
                        multiple_results=True)],
         _plugins.Plugins: [Value('plugins')],
         _node_types.NodeType: [
             Value('node_type',
-                  predicate=_node_template_node_type_predicate)],
+                  source_keys=_node_template_node_type_keys,
+                  target_key=element_name_key)],
         _node_types.NodeTypes: ['host_types']
     }
 
@@ -298,6 +303,7 @@ class NodeTemplate(Element):
               host_types,
               plugins,
               resource_base,
+              existence_cache,
               related_node_templates):
         node = self.build_dict_result()
         node.update({
@@ -306,6 +312,11 @@ class NodeTemplate(Element):
             constants.TYPE_HIERARCHY: node_type[constants.TYPE_HIERARCHY]
         })
 
+        # relationships are shared with the relationship elements and
+        # get their operations set below
+        node[constants.RELATIONSHIPS] = [
+            dict(relationship)
+            for relationship in node[constants.RELATIONSHIPS]]
         node[constants.INTERFACES] = interfaces_parser.\
             merge_node_type_and_node_template_interfaces(
                 node_type_interfaces=node_type[constants.INTERFACES],
@@ -317,14 +328,16 @@ class NodeTemplate(Element):
             interfaces=node[constants.INTERFACES],
             plugins=plugins,
             error_code=10,
-            resource_base=resource_base)
+            resource_base=resource_base,
+            existence_cache=existence_cache)
 
         node_name_to_node = dict((node['id'], node)
                                  for node in related_node_templates)
         _post_process_node_relationships(processed_node=node,
                                          node_name_to_node=node_name_to_node,
                                          plugins=plugins,
-                                         resource_base=resource_base)
+                                         resource_base=resource_base,
+                                         existence_cache=existence_cache)
 
         contained_in = self.child(NodeTemplateRelationships).provided[
             'contained_in']
@@ -342,7 +355,8 @@ class NodeTemplate(Element):
 def _post_process_node_relationships(processed_node,
                                      node_name_to_node,
                                      plugins,
-                                     resource_base):
+                                     resource_base,
+                                     existence_cache):
     for relationship in processed_node[constants.RELATIONSHIPS]:
         target_node = node_name_to_node[relationship['target_id']]
         _process_node_relationships_operations(
@@ -351,21 +365,24 @@ def _post_process_node_relationships(processed_node,
             operations_attribute='source_operations',
             node_for_plugins=processed_node,
             plugins=plugins,
-            resource_base=resource_base)
+            resource_base=resource_base,
+            existence_cache=existence_cache)
         _process_node_relationships_operations(
             relationship=relationship,
             interfaces_attribute='target_interfaces',
             operations_attribute='target_operations',
             node_for_plugins=target_node,
             plugins=plugins,
-            resource_base=resource_base)
+            resource_base=resource_base,
+            existence_cache=existence_cache)
 
 
 def _process_operations(partial_error_message,
                         interfaces,
                         plugins,
                         error_code,
-                        resource_base):
+                        resource_base,
+                        existence_cache):
     operations = {}
     for interface_name, interface in interfaces.items():
         interface_operations = \
@@ -376,7 +393,8 @@ def _process_operations(partial_error_message,
                 partial_error_message=(
                     "In interface '{0}' {1}".format(interface_name,
                                                     partial_error_message)),
-                resource_base=resource_base)
+                resource_base=resource_base,
+                existence_cache=existence_cache)
         for operation in interface_operations:
             operation_name = operation.pop('name')
             if operation_name in operations:
@@ -398,7 +416,8 @@ def _process_node_relationships_operations(relationship,
                                            operations_attribute,
                                            node_for_plugins,
                                            plugins,
-                                           resource_base):
+                                           resource_base,
+                                           existence_cache):
     partial_error_message = "in relationship of type '{0}' in node '{1}'" \
         .format(relationship['type'],
                 node_for_plugins['id'])
@@ -408,7 +427,8 @@ def _process_node_relationships_operations(relationship,
         interfaces=relationship[interfaces_attribute],
         plugins=plugins,
         error_code=19,
-        resource_base=resource_base)
+        resource_base=resource_base,
+        existence_cache=existence_cache)
 
     relationship[operations_attribute] = operations
 
@@ -427,7 +447,8 @@ class NodeTemplates(Element):
     ]
 
     def parse(self, host_types, plugins):
-        processed_nodes = dict((node.name, node.value)
+        # node values are shared with the node template elements
+        processed_nodes = dict((node.name, dict(node.value))
                                for node in self.children())
         _process_nodes_plugins(
             processed_nodes=processed_nodes,
@@ -33,7 +33,8 @@ class NodeType(types.Type):
     }
     requires = {
         'self': [requirements.Value('super_type',
-                                    predicate=types.derived_from_predicate,
+                                    source_keys=types.derived_from_keys,
+                                    target_key=requirements.element_name_key,
                                     required=False)],
         _data_types.DataTypes: [requirements.Value('data_types')]
     }
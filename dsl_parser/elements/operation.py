@@ -176,13 +176,15 @@ def process_interface_operations(
         plugins,
         error_code,
         partial_error_message,
-        resource_base):
+        resource_base,
+        existence_cache=None):
     return [process_operation(plugins=plugins,
                               operation_name=operation_name,
                               operation_content=operation_content,
                               error_code=error_code,
                               partial_error_message=partial_error_message,
-                              resource_base=resource_base)
+                              resource_base=resource_base,
+                              existence_cache=existence_cache)
             for operation_name, operation_content in interface.items()]
 
 
@@ -193,7 +195,8 @@ def process_operation(
         error_code,
         partial_error_message,
         resource_base,
-        is_workflows=False):
+        is_workflows=False,
+        existence_cache=None):
     payload_field_name = 'parameters' if is_workflows else 'inputs'
     mapping_field_name = 'mapping' if is_workflows else 'implementation'
     operation_mapping = operation_content[mapping_field_name]
@@ -243,7 +246,9 @@ def process_operation(
                 executor=operation_executor,
                 max_retries=operation_max_retries,
                 retry_interval=operation_retry_interval)
-    elif resource_base and _resource_exists(resource_base, operation_mapping):
+    elif resource_base and _resource_exists(resource_base,
+                                            operation_mapping,
+                                            existence_cache):
         operation_payload = copy.deepcopy(operation_payload or {})
         if constants.SCRIPT_PATH_PROPERTY in operation_payload:
             message = "Cannot define '{0}' property in '{1}' for {2} '{3}'" \
@@ -305,8 +310,11 @@ def process_operation(
         raise exceptions.DSLParsingLogicException(error_code, error_message)
 
 
-def _resource_exists(resource_base, resource_name):
-    return utils.url_exists('{0}/{1}'.format(resource_base, resource_name))
+def _resource_exists(resource_base, resource_name, existence_cache=None):
+    url = '{0}/{1}'.format(resource_base, resource_name)
+    if existence_cache is not None:
+        return existence_cache.exists(url)
+    return utils.url_exists(url)
 
 
 def _operation(name,
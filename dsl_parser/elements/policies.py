@@ -17,7 +17,9 @@ from dsl_parser import (exceptions,
                         utils)
 from dsl_parser.elements import (node_templates,
                                  data_types)
-from dsl_parser.framework.requirements import Value
+from dsl_parser.framework.requirements import (Value,
+                                               parent_key,
+                                               parent_keys)
 from dsl_parser.framework.elements import (DictElement,
                                            Element,
                                            Leaf,
@@ -86,13 +88,15 @@ class GroupPolicyProperties(Element):
 
     schema = Leaf(type=dict)
     requires = {
-        GroupPolicyType: [],
+        GroupPolicyType: [Value('policy_type_name',
+                                source_keys=parent_keys,
+                                target_key=parent_key)],
         PolicyTypes: [Value('policy_types')],
         data_types.DataTypes: [Value('data_types')]
     }
 
-    def parse(self, policy_types, data_types):
-        policy_type = policy_types[self.sibling(GroupPolicyType).value]
+    def parse(self, policy_type_name, policy_types, data_types):
+        policy_type = policy_types[policy_type_name]
         policy_type_properties = policy_type.get('properties', {})
         return utils.merge_schema_and_instance_properties(
             self.initial_value or {},
@@ -133,14 +137,15 @@ class GroupPolicyTriggerParameters(Element):
 
     schema = Leaf(type=dict)
     requires = {
-        GroupPolicyTriggerType: [],
+        GroupPolicyTriggerType: [Value('trigger_type_name',
+                                       source_keys=parent_keys,
+                                       target_key=parent_key)],
         PolicyTriggers: [Value('policy_triggers')],
         data_types.DataTypes: [Value('data_types')]
     }
 
-    def parse(self, policy_triggers, data_types):
-        trigger_type = policy_triggers[
-            self.sibling(GroupPolicyTriggerType).value]
+    def parse(self, trigger_type_name, policy_triggers, data_types):
+        trigger_type = policy_triggers[trigger_type_name]
         policy_trigger_parameters = trigger_type.get('parameters', {})
         return utils.merge_schema_and_instance_properties(
             self.initial_value or {},
@@ -20,7 +20,9 @@ from dsl_parser.elements import (data_types as _data_types,
                                  operation,
                                  plugins as _plugins,
                                  types)
-from dsl_parser.framework.requirements import Value, Requirement
+from dsl_parser.framework.requirements import (Value,
+                                               Requirement,
+                                               element_name_key)
 from dsl_parser.framework.elements import Dict
 
 
@@ -33,15 +35,18 @@ class Relationship(types.Type):
         'target_interfaces': operation.NodeTypeInterfaces,
     }
     requires = {
-        'inputs': [Requirement('resource_base', required=False)],
+        'inputs': [Requirement('resource_base', required=False),
+                   Requirement('existence_cache', required=False)],
         _plugins.Plugins: [Value('plugins')],
         'self': [Value('super_type',
-                       predicate=types.derived_from_predicate,
+                       source_keys=types.derived_from_keys,
+                       target_key=element_name_key,
                        required=False)],
         _data_types.DataTypes: [Value('data_types')]
     }
 
-    def parse(self, super_type, plugins, resource_base, data_types):
+    def parse(self, super_type, plugins, resource_base, data_types,
+              existence_cache):
         relationship_type = self.build_dict_result()
         if not relationship_type.get('derived_from'):
             relationship_type.pop('derived_from', None)
@@ -63,7 +68,8 @@ class Relationship(types.Type):
             rel_obj=relationship_type,
             plugins=plugins,
             rel_name=relationship_type_name,
-            resource_base=resource_base)
+            resource_base=resource_base,
+            existence_cache=existence_cache)
         relationship_type['name'] = relationship_type_name
         relationship_type[
             constants.TYPE_HIERARCHY] = self.create_type_hierarchy(super_type)
@@ -76,7 +82,8 @@ class Relationships(types.Types):
     schema = Dict(type=Relationship)
 
 
-def _validate_relationship_fields(rel_obj, plugins, rel_name, resource_base):
+def _validate_relationship_fields(rel_obj, plugins, rel_name, resource_base,
+                                  existence_cache):
     for interfaces in [constants.SOURCE_INTERFACES,
                        constants.TARGET_INTERFACES]:
         for interface_name, interface in rel_obj[interfaces].items():
@@ -85,4 +92,5 @@ def _validate_relationship_fields(rel_obj, plugins, rel_name, resource_base):
                 plugins=plugins,
                 error_code=19,
                 partial_error_message="Relationship '{0}'".format(rel_name),
-                resource_base=resource_base)
+                resource_base=resource_base,
+                existence_cache=existence_cache)
@@ -35,8 +35,12 @@ class Type(Element):
 
     @staticmethod
     def fix_properties(value):
-        for key, value in value['properties'].iteritems():
-            value.pop('initial_default', None)
+        # property schemas are shared element values, replace rather than
+        # modify them
+        value['properties'] = dict(
+            (key, dict((k, v) for k, v in prop.iteritems()
+                       if k != 'initial_default'))
+            for key, prop in value['properties'].iteritems())
 
 
 class DerivedFrom(Element):
@@ -74,8 +78,12 @@ class DataTypeDerivedFrom(DerivedFrom):
 
 
 def derived_from_predicate(source, target):
+    return target.name in derived_from_keys(source)
+
+
+def derived_from_keys(source):
     try:
         derived_from = source.child(DerivedFrom).initial_value
-        return derived_from and derived_from == target.name
     except exceptions.DSLParsingElementMatchException:
-        return False
+        return []
+    return [derived_from] if derived_from else []
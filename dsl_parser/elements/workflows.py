@@ -40,11 +40,12 @@ class Workflow(Element):
         }
     ]
     requires = {
-        'inputs': [Requirement('resource_base', required=False)],
+        'inputs': [Requirement('resource_base', required=False),
+                   Requirement('existence_cache', required=False)],
         _plugins.Plugins: [Value('plugins')]
     }
 
-    def parse(self, plugins, resource_base):
+    def parse(self, plugins, resource_base, existence_cache):
         if isinstance(self.initial_value, str):
             operation_content = {'mapping': self.initial_value,
                                  'parameters': {}}
@@ -57,7 +58,8 @@ class Workflow(Element):
             error_code=21,
             partial_error_message='',
             resource_base=resource_base,
-            is_workflows=True)
+            is_workflows=True,
+            existence_cache=existence_cache)
 
 
 class Workflows(DictElement):
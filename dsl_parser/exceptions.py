@@ -63,6 +63,15 @@ class DSLParsingFormatException(DSLParsingException):
     pass
 
 
+class DSLParsingDeadlineException(DSLParsingException):
+    """
+    An error raised when a parse exceeds its deadline or is cancelled
+    """
+    def __init__(self, *args):
+        super(DSLParsingDeadlineException, self).__init__(
+            ERROR_CODE_DEADLINE_EXCEEDED, *args)
+
+
 class DSLParsingElementMatchException(DSLParsingException):
     """
     An error raised when element child/ancestor lookup fails (element not
@@ -84,3 +93,6 @@ ERROR_CODE_DSL_DEFINITIONS_VERSION_MISMATCH = 102
 ERROR_UNKNOWN_TYPE = 103
 ERROR_INVALID_TYPE_NAME = 104
 ERROR_VALUE_DOES_NOT_MATCH_TYPE = 105
+ERROR_CODE_SHARED_VALUE_MODIFIED = 106
+ERROR_CODE_DEADLINE_EXCEEDED = 107
+ERROR_CODE_LIMIT_EXCEEDED = 108
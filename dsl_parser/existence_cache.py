@@ -0,0 +1,221 @@
+########
+# Copyright (c) 2015 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+import contextlib
+import os
+import posixpath
+import stat
+import threading
+import time
+import urllib
+import urllib2
+import urlparse
+
+import requests
+
+from dsl_parser import (deadline as _deadline,
+                        exceptions,
+                        limits as _limits)
+from dsl_parser.import_resolver.abstract_import_resolver import \
+    read_content
+
+DEFAULT_REQUEST_TIMEOUT = 10
+
+# responses of servers that do not support HEAD requests
+_HEAD_NOT_SUPPORTED = set([405, 501])
+
+
+class ExistenceCache(object):
+    """
+    Remembers which URLs exist, for locating relative imports and for
+    telling operation mappings that are scripts of the blueprint from
+    plugin operations.
+
+    ``file:`` URLs are checked with ``os.stat``, http(s) URLs with a HEAD
+    request through ``session`` (or a GET request if the server does not
+    support HEAD) and any other URL by opening it. When a check downloads
+    the content of the URL, the content is kept once, for ``content``,
+    unless it is over the document size limit of the current parse.
+
+    A parse uses its own cache unless one is given to it. A cache can be
+    shared by several parses, in which case ``ttl`` bounds how many
+    seconds a check is remembered for (forever if it is None).
+
+    URLs under the base URL of a manifest added with ``add_manifest``
+    are not checked, they exist if the manifest lists them, and neither
+    are URLs added with ``add_known``.
+    """
+
+    def __init__(self, ttl=None, session=None,
+                 timeout=DEFAULT_REQUEST_TIMEOUT):
+        self.ttl = ttl
+        self.session = session
+        self.timeout = timeout
+        # url -> (exists, content, time checked or None if known)
+        self._entries = {}
+        # base url prefix -> set of the relative paths under it
+        self._manifests = {}
+        self._lock = threading.Lock()
+
+    def add_manifest(self, base_url, paths):
+        """
+        Sets ``paths``, relative to ``base_url``, as all the resources
+        under ``base_url`` (e.g. the files of a blueprint archive),
+        replacing a manifest previously added for it.
+        """
+        prefix = _normalized(base_url).rstrip('/') + '/'
+        paths = frozenset(_normalized(path).lstrip('/') for path in paths)
+        with self._lock:
+            self._manifests[prefix] = paths
+
+    def add_known(self, existence):
+        """
+        Adds ``existence``, a dict of whether URLs exist, e.g. as
+        recorded in an imports lockfile. These URLs are never checked.
+        """
+        with self._lock:
+            for url, exists in existence.iteritems():
+                self._entries[url] = (exists, None, None)
+
+    def exists(self, url):
+        with self._lock:
+            in_manifest = self._in_manifest(url)
+            if in_manifest is not None:
+                return in_manifest
+            entry = self._entries.get(url)
+        if entry is not None and not self._expired(entry):
+            return entry[0]
+        exists, content = self._check(url)
+        if exists is None:
+            # the check failed (e.g. a network error or a 5xx response),
+            # which is not remembered as the URL missing
+            return False
+        with self._lock:
+            self._entries[url] = (exists, content, time.time())
+        return exists
+
+    def content(self, url):
+        """
+        Returns the content the check of ``url`` downloaded, or None if
+        it did not download it. The content is returned only once.
+        """
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is None or entry[1] is None:
+                return None
+            exists, content, checked = entry
+            self._entries[url] = (exists, None, checked)
+            return content
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __contains__(self, url):
+        with self._lock:
+            entry = self._entries.get(url)
+        return entry is not None and not self._expired(entry)
+
+    def _in_manifest(self, url):
+        if not self._manifests:
+            return None
+        url = _normalized(url)
+        prefixes = [prefix for prefix in self._manifests
+                    if url.startswith(prefix)]
+        if not prefixes:
+            return None
+        prefix = max(prefixes, key=len)
+        return url[len(prefix):] in self._manifests[prefix]
+
+    def _expired(self, entry):
+        return self.ttl is not None and entry[2] is not None and \
+            time.time() - entry[2] >= self.ttl
+
+    def _check(self, url):
+        scheme = url.split(':')[0]
+        if scheme == 'file':
+            return _file_exists(url), None
+        if scheme in ['http', 'https']:
+            return self._http_exists(url)
+        return _url_exists(url)
+
+    def _http_exists(self, url):
+        """Returns whether ``url`` exists and its content if it was
+        downloaded, or None for whether it exists unless the server
+        answered with a 2xx or 4xx status"""
+        session = self.session or requests
+        try:
+            response = session.head(
+                url, allow_redirects=True,
+                timeout=_deadline.request_timeout(self.timeout))
+            if response.status_code not in _HEAD_NOT_SUPPORTED:
+                return _answer(response.status_code), None
+            stream = _limits.max_document_bytes() is not None
+            get_kwargs = {'stream': True} if stream else {}
+            response = session.get(
+                url, timeout=_deadline.request_timeout(self.timeout),
+                **get_kwargs)
+            if stream and 200 <= response.status_code < 300:
+                try:
+                    read_content(response, url)
+                except exceptions.DSLParsingFormatException:
+                    # raised again by the fetch of the url
+                    return True, None
+        except requests.RequestException:
+            # raised instead if the check timed out as the deadline of the
+            # parse passed
+            _deadline.check()
+            return None, None
+        exists = _answer(response.status_code)
+        if exists:
+            return True, response.text
+        return exists, None
+
+
+def _answer(status_code):
+    if 200 <= status_code < 300:
+        return True
+    if 400 <= status_code < 500:
+        return False
+    return None
+
+
+def _normalized(url):
+    scheme, colon, path = url.partition(':')
+    if not colon or '/' in scheme:
+        scheme, colon, path = '', '', url
+    if not path:
+        return url
+    return scheme + colon + posixpath.normpath(path)
+
+
+def _file_exists(url):
+    path = urllib.url2pathname(urlparse.urlparse(url).path)
+    try:
+        return not stat.S_ISDIR(os.stat(path).st_mode)
+    except OSError:
+        return False
+
+
+def _url_exists(url):
+    try:
+        with contextlib.closing(urllib2.urlopen(url)) as f:
+            try:
+                return True, _limits.read_document(f, url)
+            except exceptions.DSLParsingFormatException:
+                # raised again by the fetch of the url
+                return True, None
+    except (urllib2.URLError, IOError):
+        return False, None
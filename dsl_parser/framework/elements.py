@@ -14,6 +14,7 @@
 #    * limitations under the License.
 
 import copy
+import os
 from StringIO import StringIO
 
 from dsl_parser import exceptions
@@ -21,6 +22,40 @@ from dsl_parser import holder
 from dsl_parser import version as _version
 
 
+# Element values (initial_value, value and provided) are shared by all
+# readers and are not copied on access, so element code must copy a value
+# before modifying it. In debug mode the framework parser snapshots the
+# values and fails the parse if any of them was modified.
+DEBUG_SHARED_VALUES_ENV = 'DSL_PARSER_DEBUG_SHARED_VALUES'
+debug_shared_values = os.environ.get(DEBUG_SHARED_VALUES_ENV, '').lower() \
+    in ('1', 'true', 'yes')
+
+
+_IMMUTABLE_TYPES = (basestring, bool, int, long, float)
+
+
+def copy_value(value):
+    """Returns a deep copy of an element value in which no two places
+    share the same dict, list or set, even if they did in ``value``"""
+    if isinstance(value, holder.Holder):
+        # holders are parser input, they are not modified once loaded
+        return value
+    if isinstance(value, dict):
+        result = copy.copy(value)
+        for key, item in value.iteritems():
+            result[key] = copy_value(item)
+        return result
+    if isinstance(value, list):
+        result = copy.copy(value)
+        result[:] = [copy_value(item) for item in value]
+        return result
+    if isinstance(value, (set, frozenset)):
+        return type(value)(copy_value(item) for item in value)
+    if value is None or isinstance(value, _IMMUTABLE_TYPES):
+        return value
+    return copy.deepcopy(value)
+
+
 class Unparsed(object):
     pass
 UNPARSED = Unparsed()
@@ -57,7 +92,6 @@ class Element(object):
         self.context = context
         initial_value = holder.Holder.of(initial_value)
         self.initial_value_holder = initial_value
-        self._initial_value = initial_value.restore()
         self.start_line = initial_value.start_line
         self.start_column = initial_value.start_column
         self.end_line = initial_value.end_line
@@ -71,6 +105,7 @@ class Element(object):
         self.name_end_column = name.end_column
         self._parsed_value = UNPARSED
         self._provided = None
+        self.element_id = None
 
     def __str__(self):
         message = StringIO()
@@ -99,17 +134,24 @@ class Element(object):
         """Alias name for list based elements"""
         return self.name
 
+    @property
+    def _initial_value(self):
+        # restored lazily, once per parse
+        if self.context is None:
+            return self.initial_value_holder.restore()
+        return self.context.restore(self.initial_value_holder)
+
     @property
     def initial_value(self):
-        return copy.deepcopy(self._initial_value)
+        return self._initial_value
 
     @property
     def value(self):
-        if self._parsed_value == UNPARSED:
+        if self._parsed_value is UNPARSED:
             raise exceptions.DSLParsingSchemaAPIException(
                 exceptions.ERROR_CODE_ILLEGAL_VALUE_ACCESS,
                 'Cannot access element value before parsing')
-        return copy.deepcopy(self._parsed_value)
+        return self._parsed_value
 
     @value.setter
     def value(self, val):
@@ -120,7 +162,7 @@ class Element(object):
 
     @property
     def provided(self):
-        return copy.deepcopy(self._provided)
+        return self._provided
 
     @provided.setter
     def provided(self, value):
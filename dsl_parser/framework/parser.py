@@ -13,39 +13,82 @@
 #    * See the License for the specific language governing permissions and
 #    * limitations under the License.
 
-import networkx as nx
+import itertools
 
-from dsl_parser import exceptions
+from dsl_parser import (deadline as _deadline,
+                        exceptions)
 from dsl_parser.framework import elements
 from dsl_parser.framework.requirements import Requirement
 
 
+# traversal steps of a schema plan
+_TRAVERSE_DICT_SCHEMA = 0
+_TRAVERSE_DICT = 1
+_TRAVERSE_LIST = 2
+
+
+class SchemaPlan(object):
+    """
+    The compiled form of an element class schema.
+
+    ``traversal`` holds the steps used to create child elements, each one
+    a (step, payload) tuple: a dict schema is compiled to its (name,
+    element class) slots and Dict/List schemas to their element class.
+    ``validations`` holds the alternative value checks of the schema, each
+    one a (expects_dict, schema_keys, expects_list, leaf_type) tuple. A
+    value is valid if it passes one of them.
+    """
+
+    def __init__(self, schema):
+        self.schema = schema
+        self.traversal = []
+        self.validations = []
+
+
 class SchemaAPIValidator(object):
+    """
+    Validates element class schemas and compiles them to schema plans.
+    Plans are cached per class and recompiled if the class schema is
+    replaced.
+    """
+
+    def __init__(self):
+        self._plans = {}
 
     def validate(self, element_cls):
-        self._traverse_element_cls(element_cls)
+        self.plan(element_cls)
 
-    def _traverse_element_cls(self, element_cls):
+    def plan(self, element_cls):
         try:
             if not issubclass(element_cls, elements.Element):
                 raise exceptions.DSLParsingSchemaAPIException(1)
         except TypeError:
             raise exceptions.DSLParsingSchemaAPIException(1)
-        self._traverse_schema(element_cls.schema)
-
-    def _traverse_schema(self, schema, list_nesting=0):
+        schema = element_cls.schema
+        plan = self._plans.get(element_cls)
+        if plan is None or plan.schema is not schema:
+            plan = SchemaPlan(schema)
+            self._compile_schema(schema, plan)
+            self._plans[element_cls] = plan
+        return plan
+
+    def _compile_schema(self, schema, plan, list_nesting=0):
         if isinstance(schema, dict):
+            slots = []
             for key, value in schema.items():
                 if not isinstance(key, basestring):
                     raise exceptions.DSLParsingSchemaAPIException(1)
-                self._traverse_element_cls(value)
+                self.plan(value)
+                slots.append((key, value))
+            plan.traversal.append((_TRAVERSE_DICT_SCHEMA, slots))
+            plan.validations.append((True, schema, False, None))
         elif isinstance(schema, list):
             if list_nesting > 0:
                 raise exceptions.DSLParsingSchemaAPIException(1)
             if len(schema) == 0:
                 raise exceptions.DSLParsingSchemaAPIException(1)
             for value in schema:
-                self._traverse_schema(value, list_nesting+1)
+                self._compile_schema(value, plan, list_nesting+1)
         elif isinstance(schema, elements.ElementType):
             if isinstance(schema, elements.Leaf):
                 if not isinstance(schema.type, (type, list, tuple)):
@@ -54,57 +97,151 @@ class SchemaAPIValidator(object):
                     (not schema.type or
                      not all([isinstance(i, type) for i in schema.type]))):
                     raise exceptions.DSLParsingSchemaAPIException(1)
+                plan.validations.append((False, None, False, schema.type))
             elif isinstance(schema, elements.Dict):
-                self._traverse_element_cls(schema.type)
+                self.plan(schema.type)
+                plan.traversal.append((_TRAVERSE_DICT, schema.type))
+                plan.validations.append((True, None, False, None))
             elif isinstance(schema, elements.List):
-                self._traverse_element_cls(schema.type)
+                self.plan(schema.type)
+                plan.traversal.append((_TRAVERSE_LIST, schema.type))
+                plan.validations.append((False, None, True, None))
             else:
                 raise exceptions.DSLParsingSchemaAPIException(1)
+        elif isinstance(schema, elements.UnknownSchema):
+            plan.validations.append((False, None, False, None))
         else:
             raise exceptions.DSLParsingSchemaAPIException(1)
 _schema_validator = SchemaAPIValidator()
 
 
+class Prelinked(object):
+    """
+    The value and provided values of an element that were calculated by
+    an earlier parse. A prelinked element is added to the element tree
+    with these values, and is not traversed, validated or processed.
+    """
+
+    def __init__(self, value, provided):
+        self.value = value
+        self.provided = provided
+
+
+class ElementTree(object):
+    """
+    The element tree of a single parse. Elements are identified by
+    consecutive integer ids, each element keeps a pointer to its parent
+    and an ordered list of its children.
+    """
+
+    def __init__(self):
+        self.elements = []
+        self._parents = []
+        self._children = []
+
+    def add(self, element, parent=None):
+        element_id = len(self.elements)
+        element.element_id = element_id
+        self.elements.append(element)
+        self._children.append([])
+        if parent is None:
+            self._parents.append(None)
+        else:
+            self._parents.append(parent.element_id)
+            self._children[parent.element_id].append(element_id)
+        return element_id
+
+    def parent(self, element):
+        parent_id = self._parents[element.element_id]
+        return None if parent_id is None else self.elements[parent_id]
+
+    def children(self, element):
+        return [self.elements[child_id]
+                for child_id in self._children[element.element_id]]
+
+    def children_ids(self, element_id):
+        return self._children[element_id]
+
+    def descendants(self, element):
+        result = []
+        stack = list(reversed(self._children[element.element_id]))
+        while stack:
+            element_id = stack.pop()
+            result.append(self.elements[element_id])
+            stack.extend(reversed(self._children[element_id]))
+        return result
+
+    def __len__(self):
+        return len(self.elements)
+
+
 class Context(object):
 
     def __init__(self,
                  value,
                  element_cls,
                  element_name,
-                 inputs):
+                 inputs,
+                 prelinked=None,
+                 limits=None):
         self.inputs = inputs or {}
+        self.limits = limits
         self.element_type_to_elements = {}
         self._root_element = None
-        self._element_tree = nx.DiGraph()
-        self._element_graph = nx.DiGraph()
+        self._element_tree = ElementTree()
+        # requirement edges only, element id -> ids of the elements it
+        # depends on. an element implicitly depends on its children.
+        self._dependencies = {}
+        # (required type, target key extractor) -> {key: [elements]}
+        self._requirement_indexes = {}
+        # ids of the elements that were added with prelinked values
+        self._prelinked_ids = set()
+        # restored values of the holders of the elements, see restore
+        self._restored = {}
         self._traverse_element_cls(element_cls=element_cls,
                                    name=element_name,
                                    value=value,
-                                   parent_element=None)
+                                   parent_element=None,
+                                   prelinked=prelinked)
         self._calculate_element_graph()
+        # element id -> copies of the element values, debug mode only
+        self._snapshots = None
+        if elements.debug_shared_values:
+            self._snapshots = {}
+            for element in self._element_tree.elements:
+                self._snapshots[element.element_id] = (
+                    _snapshot(element._initial_value), None, None)
+                if self.is_prelinked(element):
+                    self.snapshot_values(element)
 
     @property
     def parsed_value(self):
-        return self._root_element.value if self._root_element else None
+        if not self._root_element:
+            return None
+        # element values are shared, the result is handed out as a copy
+        return elements.copy_value(self._root_element.value)
 
     def child_elements_iter(self, element):
-        return self._element_tree.successors_iter(element)
+        return iter(self._element_tree.children(element))
 
     def ancestors_iter(self, element):
-        current_element = element
-        while True:
-            predecessors = self._element_tree.predecessors(current_element)
-            if not predecessors:
-                return
-            if len(predecessors) > 1:
-                raise exceptions.DSLParsingFormatException(
-                    1, 'More than 1 parent found for {0}'
-                       .format(element))
-            current_element = predecessors[0]
+        current_element = self._element_tree.parent(element)
+        while current_element is not None:
             yield current_element
+            current_element = self._element_tree.parent(current_element)
 
     def descendants(self, element):
-        return nx.descendants(self._element_tree, element)
+        return self._element_tree.descendants(element)
+
+    def restore(self, value_holder):
+        """Returns the restored value of ``value_holder``. Values are
+        restored once per parse and shared by the elements of the parse,
+        which must not modify them. The holders are not modified during
+        a parse."""
+        return value_holder.restore(self._restored)
+
+    def is_prelinked(self, element):
+        return element.element_id in self._prelinked_ids
 
     def _add_element(self, element, parent=None):
         element_type = type(element)
@@ -112,57 +249,77 @@ class Context(object):
             self.element_type_to_elements[element_type] = []
         self.element_type_to_elements[element_type].append(element)
 
-        self._element_tree.add_node(element)
-        if parent:
-            self._element_tree.add_edge(parent, element)
-        else:
+        self._element_tree.add(element, parent=parent)
+        if self.limits is not None:
+            self.limits.check_elements(len(self._element_tree))
+        if not parent:
             self._root_element = element
 
+    def _add_dependency(self, element, dependency):
+        dependencies = self._dependencies.get(element.element_id)
+        if dependencies is None:
+            dependencies = self._dependencies[element.element_id] = set()
+        dependencies.add(dependency.element_id)
+
+    def _element_dependencies(self, element_id):
+        dependencies = self._element_tree.children_ids(element_id)
+        requirements = self._dependencies.get(element_id)
+        if requirements:
+            dependencies = itertools.chain(dependencies, requirements)
+        return dependencies
+
     def _traverse_element_cls(self,
                               element_cls,
                               name,
                               value,
-                              parent_element):
+                              parent_element,
+                              prelinked=None):
         element = element_cls(name=name,
                               initial_value=value,
                               context=self)
         self._add_element(element, parent=parent_element)
-        self._traverse_schema(schema=element_cls.schema,
-                              parent_element=element)
+        if isinstance(prelinked, Prelinked):
+            element.value = prelinked.value
+            element.provided = prelinked.provided
+            self._prelinked_ids.add(element.element_id)
+            return
+        for step, payload in _schema_validator.plan(element_cls).traversal:
+            if step == _TRAVERSE_DICT_SCHEMA:
+                self._traverse_dict_schema(slots=payload,
+                                           parent_element=element,
+                                           prelinked=prelinked)
+            elif step == _TRAVERSE_DICT:
+                self._traverse_dict(element_cls=payload,
+                                    parent_element=element,
+                                    prelinked=prelinked)
+            else:
+                self._traverse_list(element_cls=payload,
+                                    parent_element=element)
 
-    def _traverse_schema(self, schema, parent_element):
-        if isinstance(schema, dict):
-            self._traverse_dict_schema(schema=schema,
-                                       parent_element=parent_element)
-        elif isinstance(schema, elements.ElementType):
-            self._traverse_element_type_schema(
-                schema=schema,
-                parent_element=parent_element)
-        elif isinstance(schema, list):
-            self._traverse_list_schema(schema=schema,
-                                       parent_element=parent_element)
-        elif isinstance(schema, elements.UnknownSchema):
-            pass
-        else:
-            raise ValueError('Illegal state should have been identified'
-                             ' by schema API validation')
+    @staticmethod
+    def _child_prelinked(prelinked, name):
+        if not prelinked or not isinstance(name, basestring):
+            return None
+        return prelinked.get(name)
 
-    def _traverse_dict_schema(self, schema,  parent_element):
-        if not isinstance(parent_element.initial_value, dict):
+    def _traverse_dict_schema(self, slots, parent_element, prelinked=None):
+        if not isinstance(parent_element.initial_value_holder.value, dict):
             return
 
         parsed_names = set()
-        for name, element_cls in schema.items():
-            if name not in parent_element.initial_value_holder:
-                value = None
+        for slot_name, element_cls in slots:
+            if slot_name not in parent_element.initial_value_holder:
+                name, value = slot_name, None
             else:
                 name, value = \
-                    parent_element.initial_value_holder.get_item(name)
+                    parent_element.initial_value_holder.get_item(slot_name)
                 parsed_names.add(name.value)
-            self._traverse_element_cls(element_cls=element_cls,
-                                       name=name,
-                                       value=value,
-                                       parent_element=parent_element)
+            self._traverse_element_cls(
+                element_cls=element_cls,
+                name=name,
+                value=value,
+                parent_element=parent_element,
+                prelinked=self._child_prelinked(prelinked, slot_name))
         for k_holder, v_holder in parent_element.initial_value_holder.value.\
                 iteritems():
             if k_holder.value not in parsed_names:
@@ -170,41 +327,78 @@ class Context(object):
                                            name=k_holder, value=v_holder,
                                            parent_element=parent_element)
 
-    def _traverse_element_type_schema(self, schema, parent_element):
-        if isinstance(schema, elements.Leaf):
+    def _traverse_dict(self, element_cls, parent_element, prelinked=None):
+        if not isinstance(parent_element.initial_value_holder.value, dict):
             return
+        for name_holder, value_holder in parent_element.\
+                initial_value_holder.value.items():
+            self._traverse_element_cls(
+                element_cls=element_cls,
+                name=name_holder,
+                value=value_holder,
+                parent_element=parent_element,
+                prelinked=self._child_prelinked(prelinked,
+                                                name_holder.value))
+
+    def _traverse_list(self, element_cls, parent_element):
+        if not isinstance(parent_element.initial_value_holder.value, list):
+            return
+        for index, value_holder in enumerate(
+                parent_element.initial_value_holder.value):
+            self._traverse_element_cls(element_cls=element_cls,
+                                       name=index,
+                                       value=value_holder,
+                                       parent_element=parent_element)
 
-        element_cls = schema.type
-        if isinstance(schema, elements.Dict):
-            if not isinstance(parent_element.initial_value, dict):
-                return
-            for name_holder, value_holder in parent_element.\
-                    initial_value_holder.value.items():
-                self._traverse_element_cls(element_cls=element_cls,
-                                           name=name_holder,
-                                           value=value_holder,
-                                           parent_element=parent_element)
-        elif isinstance(schema, elements.List):
-            if not isinstance(parent_element.initial_value, list):
-                return
-            for index, value_holder in enumerate(
-                    parent_element.initial_value_holder.value):
-                self._traverse_element_cls(element_cls=element_cls,
-                                           name=index,
-                                           value=value_holder,
-                                           parent_element=parent_element)
+    def snapshot_values(self, element):
+        """Records copies of the values of a processed element, so later
+        modifications of them are detected (debug mode only)"""
+        if self._snapshots is None:
+            return
+        initial_value = self._snapshots[element.element_id][0]
+        self._snapshots[element.element_id] = (
+            initial_value,
+            _snapshot(element.value),
+            _snapshot(element.provided))
+
+    def verify_values(self, processed_element=None):
+        """Verifies (debug mode only) that no element value was modified
+        since it was recorded. When ``processed_element`` is given, only
+        the values it had access to through its children and requirements
+        are verified."""
+        if self._snapshots is None:
+            return
+        if processed_element is None:
+            element_ids = range(len(self._element_tree))
         else:
-            raise ValueError('Illegal state should have been identified'
-                             ' by schema API validation')
-
-    def _traverse_list_schema(self, schema, parent_element):
-        for schema_item in schema:
-            self._traverse_schema(schema=schema_item,
-                                  parent_element=parent_element)
+            element_ids = itertools.chain(
+                [processed_element.element_id],
+                self._element_dependencies(processed_element.element_id))
+        for element_id in element_ids:
+            element = self._element_tree.elements[element_id]
+            initial_value, value, provided = self._snapshots[element_id]
+            modified = None
+            if _snapshot(element._initial_value) != initial_value:
+                modified = 'initial value'
+            elif element._parsed_value is not elements.UNPARSED and (
+                    _snapshot(element.value) != value or
+                    _snapshot(element.provided) != provided):
+                modified = 'value'
+            if modified:
+                message = "Shared {0} of '{1}' was modified".format(
+                    modified, element.path)
+                if processed_element is not None:
+                    message += " while processing '{0}'".format(
+                        processed_element.path)
+                raise exceptions.DSLParsingSchemaAPIException(
+                    exceptions.ERROR_CODE_SHARED_VALUE_MODIFIED, message)
 
     def _calculate_element_graph(self):
-        self.element_graph = nx.DiGraph(self._element_tree)
         for element_type, _elements in self.element_type_to_elements.items():
+            if self._prelinked_ids:
+                # prelinked elements are not processed, they need nothing
+                _elements = [e for e in _elements
+                             if e.element_id not in self._prelinked_ids]
             requires = element_type.requires
             for requirement, requirement_values in requires.items():
                 requirement_values = [
@@ -216,34 +410,109 @@ class Context(object):
                     requirement = element_type
                 dependencies = self.element_type_to_elements.get(
                     requirement, [])
-                for dependency in dependencies:
+                if not dependencies:
+                    continue
+                narrowing = [r for r in requirement_values if r.narrowing]
+                keyed = [r for r in narrowing if r.keyed]
+                if keyed:
+                    # join on the first keyed requirement, the rest only
+                    # have to be checked for the matched pairs
+                    join = keyed[0]
+                    narrowing.remove(join)
                     for element in _elements:
-                        predicates = [r.predicate for r in requirement_values
-                                      if r.predicate is not None]
-                        add_dependency = not predicates or all([
-                            predicate(element, dependency)
-                            for predicate in predicates])
-                        if add_dependency:
-                            self.element_graph.add_edge(element, dependency)
-        # we reverse the graph because only netorkx 1.9.1 has the reverse
-        # flag in the topological sort function, it is only used by it
-        # so this should be good
-        self.element_graph.reverse(copy=False)
+                        for dependency in self.required_elements(
+                                element, requirement, join):
+                            if all(r.matches(element, dependency)
+                                   for r in narrowing):
+                                self._add_dependency(element, dependency)
+                else:
+                    for dependency in dependencies:
+                        for element in _elements:
+                            if all(r.matches(element, dependency)
+                                   for r in narrowing):
+                                self._add_dependency(element, dependency)
+
+    def required_elements(self, element, required_type, requirement):
+        """Returns the elements of ``required_type`` that satisfy
+        ``requirement`` of ``element``, in the order they were added"""
+        candidates = self.element_type_to_elements.get(required_type, [])
+        if requirement.keyed:
+            index = self._requirement_index(required_type, requirement)
+            matches = set()
+            for key in requirement.source_keys(element):
+                try:
+                    matches.update(index.get(key, ()))
+                except TypeError:
+                    # unhashable keys cannot match any target key, the
+                    # schema validation of the element will reject them
+                    continue
+            candidates = sorted(matches, key=lambda e: e.element_id)
+        if requirement.predicate is not None:
+            candidates = [e for e in candidates
+                          if requirement.predicate(element, e)]
+        return candidates
+
+    def _requirement_index(self, required_type, requirement):
+        index_key = (required_type, requirement.target_key)
+        index = self._requirement_indexes.get(index_key)
+        if index is None:
+            index = {}
+            for target in self.element_type_to_elements.get(
+                    required_type, []):
+                try:
+                    index.setdefault(requirement.target_key(target),
+                                     []).append(target)
+                except TypeError:
+                    continue
+            self._requirement_indexes[index_key] = index
+        return index
 
     def elements_graph_topological_sort(self):
-        try:
-            return nx.topological_sort(self.element_graph)
-        except nx.NetworkXUnfeasible:
-            # Cycle detected
-            cycle = nx.recursive_simple_cycles(self.element_graph)[0]
-            names = [str(e.name) for e in cycle]
-            names.append(str(names[0]))
-            ex = exceptions.DSLParsingLogicException(
-                exceptions.ERROR_CODE_CYCLE,
-                'Parsing failed. Circular dependency detected: {0}'
-                .format(' --> '.join(names)))
-            ex.circular_dependency = names
-            raise ex
+        """Returns all elements, each one after the elements it depends on
+        (its children and its requirements)"""
+        unvisited, visiting, visited = 0, 1, 2
+        state = [unvisited] * len(self._element_tree)
+        result = []
+        for root_id in xrange(len(self._element_tree)):
+            if state[root_id] != unvisited:
+                continue
+            state[root_id] = visiting
+            stack = [(root_id, iter(self._element_dependencies(root_id)))]
+            while stack:
+                element_id, dependencies = stack[-1]
+                for dependency_id in dependencies:
+                    if state[dependency_id] == unvisited:
+                        state[dependency_id] = visiting
+                        stack.append((dependency_id, iter(
+                            self._element_dependencies(dependency_id))))
+                        break
+                    elif state[dependency_id] == visiting:
+                        # the stack holds the dependency path from the
+                        # element being visited to this element
+                        self._raise_circular_dependency(
+                            [entry[0] for entry in stack], dependency_id)
+                else:
+                    stack.pop()
+                    state[element_id] = visited
+                    result.append(self._element_tree.elements[element_id])
+        return result
+
+    def _raise_circular_dependency(self, path, dependency_id):
+        """Raises the cycle closed by a dependency of the last element of
+        ``path`` on ``dependency_id``, an element found earlier on
+        ``path``"""
+        cycle = path[path.index(dependency_id):]
+        # report the cycle as "dependency --> dependent"
+        cycle.reverse()
+        names = [str(self._element_tree.elements[element_id].name)
+                 for element_id in cycle]
+        names.append(str(names[0]))
+        ex = exceptions.DSLParsingLogicException(
+            exceptions.ERROR_CODE_CYCLE,
+            'Parsing failed. Circular dependency detected: {0}'
+            .format(' --> '.join(names)))
+        ex.circular_dependency = names
+        raise ex
 
 
 class Parser(object):
@@ -253,13 +522,24 @@ class Parser(object):
               element_cls,
               element_name='root',
               inputs=None,
-              strict=True):
+              strict=True,
+              prelinked=None,
+              deadline=None,
+              limits=None):
         context = Context(
             value=value,
             element_cls=element_cls,
             element_name=element_name,
-            inputs=inputs)
+            inputs=inputs,
+            prelinked=prelinked,
+            limits=limits)
+        if deadline is None:
+            deadline = _deadline.current()
         for element in context.elements_graph_topological_sort():
+            if context.is_prelinked(element):
+                continue
+            if deadline is not None:
+                deadline.check()
             try:
                 self._validate_element_schema(element, strict=strict)
                 self._process_element(element)
@@ -267,6 +547,7 @@ class Parser(object):
                 if not e.element:
                     e.element = element
                 raise
+        context.verify_values()
         return context.parsed_value
 
     @staticmethod
@@ -276,9 +557,12 @@ class Parser(object):
             raise exceptions.DSLParsingFormatException(
                 1, "'{0}' key is required but it is currently missing"
                    .format(element.name))
+        if value is None:
+            return
 
-        def validate_schema(schema):
-            if isinstance(schema, (dict, elements.Dict)):
+        def validate_schema(expects_dict, schema_keys, expects_list,
+                            leaf_type):
+            if expects_dict:
                 if not isinstance(value, dict):
                     raise exceptions.DSLParsingFormatException(
                         1, _expected_type_message(value, dict))
@@ -289,54 +573,48 @@ class Parser(object):
                                " found '{0}' of type '{1}'"
                                .format(key, _py_type_to_user_type(type(key))))
 
-            if strict and isinstance(schema, dict):
+            if strict and schema_keys is not None:
                 for key in value.keys():
-                    if key not in schema:
+                    if key not in schema_keys:
                         ex = exceptions.DSLParsingFormatException(
                             1, "'{0}' is not in schema. "
                                "Valid schema values: {1}"
-                               .format(key, schema.keys()))
+                               .format(key, schema_keys.keys()))
                         for child_element in element.children():
                             if child_element.name == key:
                                 ex.element = child_element
                                 break
                         raise ex
 
-            if (isinstance(schema, elements.List) and
-                    not isinstance(value, list)):
+            if expects_list and not isinstance(value, list):
                 raise exceptions.DSLParsingFormatException(
                     1, _expected_type_message(value, list))
 
-            if (isinstance(schema, elements.Leaf) and
-                    not isinstance(value, schema.type)):
+            if leaf_type is not None and not isinstance(value, leaf_type):
                 raise exceptions.DSLParsingFormatException(
-                    1, _expected_type_message(value, schema.type))
-        if value is not None:
-            if isinstance(element.schema, list):
-                validated = False
-                last_error = None
-                for schema_item in element.schema:
-                    try:
-                        validate_schema(schema_item)
-                    except exceptions.DSLParsingFormatException as e:
-                        last_error = e
-                    else:
-                        validated = True
-                        break
-                if not validated:
-                    if not last_error:
-                        raise ValueError('Illegal state should have been '
-                                         'identified by schema API validation')
-                    else:
-                        raise last_error
+                    1, _expected_type_message(value, leaf_type))
+
+        validations = _schema_validator.plan(type(element)).validations
+        if len(validations) == 1:
+            validate_schema(*validations[0])
+            return
+        last_error = None
+        for validation in validations:
+            try:
+                validate_schema(*validation)
+            except exceptions.DSLParsingFormatException as e:
+                last_error = e
             else:
-                validate_schema(element.schema)
+                return
+        raise last_error
 
     def _process_element(self, element):
         required_args = self._extract_element_requirements(element)
         element.validate(**required_args)
         element.value = element.parse(**required_args)
         element.provided = element.calculate_provided(**required_args)
+        element.context.snapshot_values(element)
+        element.context.verify_values(processed_element=element)
 
     @staticmethod
     def _extract_element_requirements(element):
@@ -359,14 +637,10 @@ class Parser(object):
             else:
                 if required_type == 'self':
                     required_type = type(element)
-                required_type_elements = context.element_type_to_elements.get(
-                    required_type, [])
                 for requirement in requirements:
                     result = []
-                    for required_element in required_type_elements:
-                        if requirement.predicate and not requirement.predicate(
-                                element, required_element):
-                            continue
+                    for required_element in context.required_elements(
+                            element, required_type, requirement):
                         if requirement.parsed:
                             result.append(required_element.value)
                         else:
@@ -415,13 +689,49 @@ def parse(value,
           element_cls,
           element_name='root',
           inputs=None,
-          strict=True):
+          strict=True,
+          prelinked=None,
+          deadline=None,
+          limits=None):
+    """Parses ``value`` as an ``element_cls`` element.
+
+    ``prelinked`` optionally maps the names of child elements to Prelinked
+    values or, for deeper elements, to such mappings of their own children
+    (e.g. {'node_types': {'type': Prelinked(value, provided)}}).
+
+    ``deadline`` (a deadline.Deadline, the current deadline of the thread
+    by default) is checked before each element is processed.
+
+    ``limits`` (a limits.ParsingLimits) bounds the number of elements
+    built for ``value``.
+    """
     validate_schema_api(element_cls)
     return _parser.parse(value=value,
                          element_cls=element_cls,
                          element_name=element_name,
                          inputs=inputs,
-                         strict=strict)
+                         strict=strict,
+                         prelinked=prelinked,
+                         deadline=deadline,
+                         limits=limits)
+
+
+def _snapshot(value):
+    """Returns a comparable record of the structure of a value: its
+    containers are copied, any other object is recorded by identity
+    (or by value, for primitives)"""
+    if isinstance(value, dict):
+        return type(value), dict((key, _snapshot(item))
+                                 for key, item in value.iteritems())
+    if isinstance(value, (list, tuple)):
+        return type(value), [_snapshot(item) for item in value]
+    if isinstance(value, (set, frozenset)):
+        return type(value), frozenset(value)
+    if isinstance(value, float):
+        return float, repr(value)
+    if value is None or isinstance(value, (basestring, bool, int, long)):
+        return value
+    return type(value), id(value)
 
 
 def _expected_type_message(value, expected_type):
@@ -15,18 +15,51 @@
 
 
 class Requirement(object):
+    """
+    A requirement of an element on elements of another type.
+
+    Which elements of the required type satisfy the requirement may be
+    narrowed with ``predicate(source, target)``, which the framework has
+    to evaluate for every (source, target) pair, or with a pair of key
+    extractors: ``source_keys(source)`` returns the keys a source element
+    matches and ``target_key(target)`` returns the key of a target
+    element. Keyed requirements are resolved by a hash lookup. When both
+    forms are given, a target has to satisfy both.
+    """
 
     def __init__(self,
                  name,
                  parsed=False,
                  multiple_results=False,
                  required=True,
-                 predicate=None):
+                 predicate=None,
+                 source_keys=None,
+                 target_key=None):
+        if (source_keys is None) != (target_key is None):
+            raise ValueError('source_keys and target_key must be '
+                             'specified together')
         self.name = name
         self.parsed = parsed
         self.multiple_results = multiple_results
         self.required = required
         self.predicate = predicate
+        self.source_keys = source_keys
+        self.target_key = target_key
+
+    @property
+    def keyed(self):
+        return self.source_keys is not None
+
+    @property
+    def narrowing(self):
+        return self.keyed or self.predicate is not None
+
+    def matches(self, source, target):
+        if self.predicate is not None and not self.predicate(source, target):
+            return False
+        if self.keyed:
+            return self.target_key(target) in list(self.source_keys(source))
+        return True
 
 
 class Value(Requirement):
@@ -35,13 +68,29 @@ class Value(Requirement):
                  name,
                  multiple_results=False,
                  required=True,
-                 predicate=None):
+                 predicate=None,
+                 source_keys=None,
+                 target_key=None):
         super(Value, self).__init__(name,
                                     parsed=True,
                                     multiple_results=multiple_results,
                                     required=required,
-                                    predicate=predicate)
+                                    predicate=predicate,
+                                    source_keys=source_keys,
+                                    target_key=target_key)
 
 
 def sibling_predicate(source, target):
     return source.parent() == target.parent()
+
+
+def parent_keys(element):
+    return [element.parent()]
+
+
+def parent_key(element):
+    return element.parent()
+
+
+def element_name_key(element):
+    return element.name
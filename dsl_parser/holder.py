@@ -14,8 +14,40 @@
 #    * limitations under the License.
 
 
+# start/end marks are packed into a single int: line << 32 | column
+_COLUMN_BITS = 32
+_COLUMN_MASK = (1 << _COLUMN_BITS) - 1
+
+
+def _pack(line, column):
+    if line is None and column is None:
+        return None
+    if (isinstance(line, int) and isinstance(column, int) and
+            line >= 0 and 0 <= column <= _COLUMN_MASK):
+        return (line << _COLUMN_BITS) | column
+    return line, column
+
+
+def _unpack(mark):
+    if mark is None:
+        return None, None
+    if isinstance(mark, tuple):
+        return mark
+    return mark >> _COLUMN_BITS, mark & _COLUMN_MASK
+
+
+def intern_filename(filename):
+    """Returns the interned filename so all holders of a document share a
+    single filename string"""
+    if type(filename) is str:
+        return intern(filename)
+    return filename
+
+
 class Holder(object):
 
+    __slots__ = ('value', 'filename', '_start', '_end', '_index')
+
     def __init__(self,
                  value,
                  start_line=None,
@@ -24,11 +56,42 @@ class Holder(object):
                  end_column=None,
                  filename=None):
         self.value = value
-        self.start_line = start_line
-        self.start_column = start_column
-        self.end_line = end_line
-        self.end_column = end_column
+        self._start = _pack(start_line, start_column)
+        self._end = _pack(end_line, end_column)
         self.filename = filename
+        self._index = None
+
+    @property
+    def start_line(self):
+        return _unpack(self._start)[0]
+
+    @start_line.setter
+    def start_line(self, start_line):
+        self._start = _pack(start_line, self.start_column)
+
+    @property
+    def start_column(self):
+        return _unpack(self._start)[1]
+
+    @start_column.setter
+    def start_column(self, start_column):
+        self._start = _pack(self.start_line, start_column)
+
+    @property
+    def end_line(self):
+        return _unpack(self._end)[0]
+
+    @end_line.setter
+    def end_line(self, end_line):
+        self._end = _pack(end_line, self.end_column)
+
+    @property
+    def end_column(self):
+        return _unpack(self._end)[1]
+
+    @end_column.setter
+    def end_column(self, end_column):
+        self._end = _pack(self.end_line, end_column)
 
     def __str__(self):
         return '{0}<{1}.{2}-{3}.{4} [{5}]>'.format(
@@ -51,26 +114,81 @@ class Holder(object):
             raise ValueError('Value is expected to be of type dict while it'
                              'is in fact of type {0}'
                              .format(type(self.value).__name__))
-        for key_holder, value_holder in self.value.iteritems():
-            if key_holder.value == key:
-                return key_holder, value_holder
-        return None, None
+        try:
+            return self._key_index().get(key, (None, None))
+        except TypeError:
+            # unhashable key
+            for key_holder, value_holder in self.value.iteritems():
+                if key_holder.value == key:
+                    return key_holder, value_holder
+            return None, None
+
+    def set_item(self, key_holder, value_holder):
+        """Sets value_holder under key_holder, replacing an existing item
+        with the same key value, and keeps the key index up to date"""
+        existing_key_holder, _ = self.get_item(key_holder.value)
+        if existing_key_holder is not None:
+            del self.value[existing_key_holder]
+        self.value[key_holder] = value_holder
+        self._index[2][key_holder.value] = (key_holder, value_holder)
+        self._index = (self.value, len(self.value), self._index[2])
+
+    def _key_index(self):
+        # the index maps a plain key to its (key_holder, value_holder).
+        # it is rebuilt if the value dict was replaced or modified
+        # directly, items added through set_item keep it up to date.
+        index = self._index
+        if (index is None or
+                index[0] is not self.value or
+                index[1] != len(self.value)):
+            items = {}
+            for key_holder, value_holder in self.value.iteritems():
+                try:
+                    items.setdefault(key_holder.value,
+                                     (key_holder, value_holder))
+                except TypeError:
+                    # unhashable keys (e.g. complex yaml keys) never match
+                    # a hashable key so they are not indexed
+                    pass
+            index = (self.value, len(self.value), items)
+            self._index = index
+        return index[2]
+
+    def restore(self, memo=None):
+        """Returns the plain value of this holder.
 
-    def restore(self):
+        ``memo`` optionally maps the ids of holders to their restored
+        values, so the holders shared by several restored values (e.g. the
+        values of nested elements) are restored once. Results found in it
+        are shared between callers, and holders must not be modified while
+        it is in use. Without it a new value is returned."""
+        if memo is not None:
+            restored = memo.get(id(self))
+            if restored is not None:
+                return restored[1]
         if isinstance(self.value, dict):
-            return dict((key_holder.restore(), value_holder.restore())
-                        for key_holder, value_holder in self.value.iteritems())
+            result = dict((key_holder.restore(memo),
+                           value_holder.restore(memo))
+                          for key_holder, value_holder
+                          in self.value.iteritems())
         elif isinstance(self.value, list):
-            return [value_holder.restore() for value_holder in self.value]
+            result = [value_holder.restore(memo)
+                      for value_holder in self.value]
         elif isinstance(self.value, set):
-            return set((value_holder.restore() for value_holder in self.value))
+            result = set((value_holder.restore(memo)
+                          for value_holder in self.value))
         else:
             return self.value
+        if memo is not None:
+            # the holder is kept so its id is not reused
+            memo[id(self)] = (self, result)
+        return result
 
     @staticmethod
     def of(obj, filename=None):
         if isinstance(obj, Holder):
             return obj
+        filename = intern_filename(filename)
         if isinstance(obj, dict):
             result = dict((Holder.of(key, filename=filename),
                            Holder.of(value, filename=filename))
@@ -84,9 +202,8 @@ class Holder(object):
         return Holder(result, filename=filename)
 
     def copy(self):
-        return Holder(value=self.value,
-                      start_line=self.start_line,
-                      start_column=self.start_column,
-                      end_line=self.end_line,
-                      end_column=self.end_column,
-                      filename=self.filename)
+        result = Holder(value=self.value, filename=self.filename)
+        result._start = self._start
+        result._end = self._end
+        result._index = self._index
+        return result
@@ -0,0 +1,141 @@
+########
+# Copyright (c) 2015 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+"""
+Imports lockfiles.
+
+``lock_imports`` resolves all the imports of a blueprint, recursively,
+once, copies them to a local directory and writes a lockfile listing the
+URL, sha256 hash, size and local copy of each of them. Blueprints parsed
+with a LockfileImportResolver of that lockfile read their imports from
+the local copies, verified against the lockfile, and make no network
+calls for them.
+"""
+
+import hashlib
+import json
+import os
+
+from dsl_parser import existence_cache as _existence_cache
+from dsl_parser.elements import imports
+from dsl_parser.import_resolver.default_import_resolver import \
+    DefaultImportResolver
+
+LOCKFILE_NAME = 'imports.lock'
+LOCKFILE_VERSION = 1
+
+
+def lock_imports(dsl_file_path,
+                 vendor_dir,
+                 lockfile_path=None,
+                 resources_base_url=None,
+                 resolver=None):
+    """Resolves the imports of the blueprint ``dsl_file_path``, copies
+    them to ``vendor_dir``, by their hash, and writes the lockfile
+    ``lockfile_path`` (``vendor_dir``/imports.lock by default).
+
+    Imports are fetched by ``resolver`` (a default resolver if it is not
+    given), and are listed in the lockfile by the URL they are imported
+    from, in the order they are merged, followed by the other URLs the
+    same imports were reached by. Returns the lockfile's content.
+    """
+    if resolver is None:
+        with DefaultImportResolver() as default_resolver:
+            return lock_imports(dsl_file_path,
+                                vendor_dir,
+                                lockfile_path=lockfile_path,
+                                resources_base_url=resources_base_url,
+                                resolver=default_resolver)
+    if lockfile_path is None:
+        lockfile_path = os.path.join(vendor_dir, LOCKFILE_NAME)
+    with open(dsl_file_path) as f:
+        dsl_string = f.read()
+
+    recorder = _RecordingResolver(resolver)
+    existence_cache = _RecordingExistenceCache(
+        session=getattr(resolver, 'session', None))
+    imports_graph = imports.resolve_imports(
+        dsl_string=dsl_string,
+        dsl_location=dsl_file_path,
+        resources_base_url=resources_base_url,
+        resolver=recorder,
+        existence_cache=existence_cache)
+    dsl_location = imports_graph.root
+
+    lockfile_dir = os.path.dirname(os.path.abspath(lockfile_path))
+    for directory in [vendor_dir, lockfile_dir]:
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+    # imports reached by other URLs too (found to be the same import by
+    # their content) are locked by all of them
+    import_urls = [imported['import']
+                   for imported in imports_graph.topological_sort()
+                   if imported['import'] != dsl_location]
+    import_urls.extend(sorted(imports_graph.aliases()))
+    locked_imports = []
+    for import_url in import_urls:
+        content = recorder.contents[import_url]
+        if isinstance(content, unicode):
+            content = content.encode('utf-8')
+        sha256 = hashlib.sha256(content).hexdigest()
+        path = os.path.join(vendor_dir, '{0}.yaml'.format(sha256))
+        with open(path, 'wb') as f:
+            f.write(content)
+        locked_imports.append({
+            'url': import_url,
+            'sha256': sha256,
+            'size': len(content),
+            'path': os.path.relpath(os.path.abspath(path), lockfile_dir)
+        })
+    lock = {
+        'version': LOCKFILE_VERSION,
+        'blueprint': dsl_location,
+        'imports': locked_imports,
+        'existence': existence_cache.checks
+    }
+    with open(lockfile_path, 'w') as f:
+        json.dump(lock, f, indent=2, sort_keys=True)
+    return lock
+
+
+class _RecordingResolver(object):
+    """
+    Fetches imports by ``resolver`` and keeps their contents.
+    """
+
+    def __init__(self, resolver):
+        self.resolver = resolver
+        self.contents = {}
+        self.max_concurrent_imports = getattr(
+            resolver, 'max_concurrent_imports', 1)
+        self.max_concurrent_imports_per_host = getattr(
+            resolver, 'max_concurrent_imports_per_host', 1)
+
+    def fetch_import(self, import_url):
+        content = self.resolver.fetch_import(import_url)
+        self.contents[import_url] = content
+        return content
+
+
+class _RecordingExistenceCache(_existence_cache.ExistenceCache):
+
+    def __init__(self, **kwargs):
+        super(_RecordingExistenceCache, self).__init__(**kwargs)
+        self.checks = {}
+
+    def exists(self, url):
+        exists = super(_RecordingExistenceCache, self).exists(url)
+        self.checks[url] = exists
+        return exists
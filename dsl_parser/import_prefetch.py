@@ -0,0 +1,281 @@
+########
+# Copyright (c) 2015 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+"""
+Speculative prefetching of imports.
+
+Prefetching is opt-in: a parse given ``import_manifests`` (an
+ImportManifests) records the imports it fetched and the candidate
+locations of relative imports it checked in them, by the location of the
+blueprint. When a parse given the same manifests parses that location
+again, they are all fetched and checked concurrently as soon as the
+parse starts, before the blueprint itself is loaded. Parses without
+manifests fetch only the imports of the blueprint, as they find them.
+
+The imports stage still discovers the imports from the actual imports
+of the blueprint and of its imports, and takes the prefetched contents
+instead of fetching them again. Imports added since are fetched on
+demand and prefetched imports that are no longer imported are discarded.
+"""
+
+import contextlib
+import json
+import os
+import sys
+import tempfile
+import threading
+import urlparse
+from multiprocessing.pool import ThreadPool
+
+try:
+    import fcntl
+except ImportError:
+    # not a POSIX platform, a manifests file must have a single writer
+    fcntl = None
+
+from dsl_parser import (cache,
+                        deadline as _deadline,
+                        limits as _limits)
+from dsl_parser.elements import imports
+
+DEFAULT_IMPORT_MANIFESTS_CACHE_SIZE = 256
+
+
+class ImportManifests(object):
+    """
+    The imports recorded by the location of the blueprint importing them,
+    for up to ``max_size`` locations. Manifests are kept in memory, and
+    also in the JSON file ``path`` if it is given, so they are used by
+    other processes too: each save re-reads the file and merges the
+    manifests other processes saved since, under a lock on
+    ``path + '.lock'``. Where file locks are not available (no fcntl),
+    ``path`` must have a single writer.
+    """
+
+    def __init__(self, path=None,
+                 max_size=DEFAULT_IMPORT_MANIFESTS_CACHE_SIZE):
+        self.path = path
+        self._manifests = cache.LRUCache(max_size)
+        self._lock = threading.Lock()
+        if path is not None:
+            self._load()
+
+    def get(self, blueprint_location):
+        return self._manifests.get(blueprint_location)
+
+    def put(self, blueprint_location, manifest):
+        self._manifests.put(blueprint_location, manifest)
+        if self.path is not None:
+            self._save({blueprint_location: manifest})
+
+    def clear(self):
+        """Clears the manifests, of all processes if saved in ``path``."""
+        self._manifests.clear()
+        if self.path is not None:
+            self._save(None)
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                manifests = json.load(f)
+        except (IOError, ValueError):
+            # missing or corrupt, manifests are recorded again
+            return
+        for blueprint_location, manifest in manifests:
+            self._manifests.put(blueprint_location, manifest)
+
+    def _save(self, changes):
+        """Saves the manifests with ``changes`` (blueprint location to
+        manifest) merged over the manifests in ``path``, or no manifests
+        at all if ``changes`` is None."""
+        with self._lock:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            if not os.path.isdir(directory):
+                os.makedirs(directory)
+            with _file_lock(self.path + '.lock'):
+                if changes is not None:
+                    # manifests saved by other processes since ours were
+                    # loaded, with the changes of this one most recent
+                    self._load()
+                    for blueprint_location, manifest in changes.items():
+                        self._manifests.put(blueprint_location, manifest)
+                fd, temp_path = tempfile.mkstemp(dir=directory)
+                with os.fdopen(fd, 'w') as f:
+                    json.dump(self._manifests.items(), f)
+                os.rename(temp_path, self.path)
+
+
+@contextlib.contextmanager
+def _file_lock(lock_path):
+    """Holds an exclusive lock on the file ``lock_path``, if fcntl is
+    available."""
+    if fcntl is None:
+        yield
+        return
+    with open(lock_path, 'a') as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def start(dsl_location, resources_base_url, resolver, existence_cache,
+          import_manifests=None):
+    """Starts prefetching the imports of the blueprint location
+    ``dsl_location`` recorded in ``import_manifests``. Returns the
+    SpeculativePrefetch for the imports stage, or None if there are no
+    manifests or the blueprint has no location."""
+    if import_manifests is None or dsl_location is None:
+        return None
+    blueprint_location = imports._get_resource_location(dsl_location,
+                                                        resources_base_url)
+    if blueprint_location is None:
+        return None
+    manifest = import_manifests.get(blueprint_location)
+    max_imports = getattr(resolver, 'max_concurrent_imports', 1)
+    if manifest is None or max_imports <= 1:
+        # nothing to prefetch, or imports are fetched one at a time
+        manifest = {'imports': [], 'checks': []}
+    return SpeculativePrefetch(
+        blueprint_location,
+        manifest,
+        resolver,
+        existence_cache,
+        import_manifests,
+        max_imports=max_imports,
+        max_imports_per_host=getattr(resolver,
+                                     'max_concurrent_imports_per_host', 1))
+
+
+class SpeculativePrefetch(object):
+    """
+    Fetches the imports and checks the URLs of ``manifest`` in the
+    background, by up to ``max_imports`` threads and by up to
+    ``max_imports_per_host`` threads from the same host, and records the
+    imports and checks the parse actually makes in ``import_manifests``,
+    for the next parse.
+    """
+
+    def __init__(self, blueprint_location, manifest, resolver,
+                 existence_cache, import_manifests, max_imports,
+                 max_imports_per_host):
+        self.blueprint_location = blueprint_location
+        self.resolver = resolver
+        self.import_manifests = import_manifests
+        self.max_imports_per_host = max_imports_per_host
+        self._existence_cache = existence_cache
+        self._fetched = []
+        self._checked = []
+        self._discarded = False
+        self._host_semaphores = {}
+        self._lock = threading.Lock()
+        self._pool = None
+        # url -> AsyncResult
+        self._fetches = {}
+        self._checks = {}
+        if not manifest['imports'] and not manifest['checks']:
+            return
+        self._pool = ThreadPool(max_imports)
+        # prefetches run with the deadline of the parse
+        run = _deadline.propagated(_limits.propagated(self._run))
+        # checks first, they locate imports that are fetched after them
+        for url in manifest['checks']:
+            self._checks[url] = self._pool.apply_async(
+                run, (existence_cache.exists, url))
+        for url in manifest['imports']:
+            self._fetches[url] = self._pool.apply_async(
+                run, (resolver.fetch_import, url))
+
+    def existence_cache(self, existence_cache):
+        """Returns ``existence_cache`` for locating imports, waiting for
+        the prefetched checks of the URLs it is asked about."""
+        return _PrefetchedExistenceCache(self, existence_cache)
+
+    def fetch(self, import_url):
+        """Returns the prefetched content of ``import_url``, or None if it
+        was not prefetched, or failed to, in which case it is fetched
+        again by the caller."""
+        with self._lock:
+            self._fetched.append(import_url)
+            result = self._fetches.pop(import_url, None)
+        if result is None:
+            return None
+        content, exc_info = result.get()
+        return content if exc_info is None else None
+
+    def wait_checked(self, url):
+        with self._lock:
+            self._checked.append(url)
+            result = self._checks.pop(url, None)
+        if result is not None:
+            result.wait()
+
+    def record(self):
+        """Records the imports the parse fetched and checked, for the next
+        parse of the blueprint location."""
+        with self._lock:
+            manifest = {'imports': imports._unique(self._fetched),
+                        'checks': imports._unique(self._checked)}
+        self.import_manifests.put(self.blueprint_location, manifest)
+
+    def discard(self):
+        """Discards the prefetches the parse did not take. Prefetches that
+        have not started yet are not made, and those in progress are
+        waited for, so none of them uses the resolver once the parse is
+        over."""
+        with self._lock:
+            self._discarded = True
+            self._fetches.clear()
+            self._checks.clear()
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+
+    def _run(self, func, url):
+        if self._discarded:
+            return None, None
+        with self._host_semaphore(url):
+            if self._discarded:
+                return None, None
+            try:
+                return func(url), None
+            except Exception:
+                return None, sys.exc_info()
+
+    def _host_semaphore(self, url):
+        host = urlparse.urlparse(url).netloc
+        with self._lock:
+            semaphore = self._host_semaphores.get(host)
+            if semaphore is None:
+                semaphore = threading.BoundedSemaphore(
+                    self.max_imports_per_host)
+                self._host_semaphores[host] = semaphore
+            return semaphore
+
+
+class _PrefetchedExistenceCache(object):
+
+    def __init__(self, prefetch, existence_cache):
+        self.prefetch = prefetch
+        self.existence_cache = existence_cache
+
+    def exists(self, url):
+        self.prefetch.wait_checked(url)
+        return self.existence_cache.exists(url)
+
+    def content(self, url):
+        return self.existence_cache.content(url)
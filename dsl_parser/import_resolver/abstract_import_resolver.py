@@ -15,16 +15,24 @@
 
 import abc
 import contextlib
+import threading
 import urllib2
 
 import requests
-from retrying import retry
+from requests.adapters import HTTPAdapter
+from retrying import (retry,
+                      RetryError)
 
-from dsl_parser import exceptions
+from dsl_parser import (deadline as _deadline,
+                        exceptions,
+                        limits as _limits)
 
 DEFAULT_RETRY_DELAY = 1
 MAX_NUMBER_RETRIES = 5
 DEFAULT_REQUEST_TIMEOUT = 10
+DEFAULT_POOL_CONNECTIONS = 10
+DEFAULT_POOL_MAXSIZE = 10
+READ_CHUNK_SIZE = 64 * 1024
 
 
 class AbstractImportResolver(object):
@@ -33,27 +41,124 @@ class AbstractImportResolver(object):
     implementations of import resolver.
     The only mandatory implementation is of resolve, which is expected
     to open the import url and return its data.
+
+    Resolvers fetch http(s) imports through ``session``, a requests session
+    that keeps connections alive between imports. Call ``close`` (or use
+    the resolver as a context manager) to close its connections.
     """
 
     __metaclass__ = abc.ABCMeta
 
+    # How many imports may be fetched at the same time while the imports
+    # graph is built, in total and from a single host. Resolvers are not
+    # expected to be thread safe, so imports are fetched one at a time
+    # unless a resolver says otherwise.
+    max_concurrent_imports = 1
+    max_concurrent_imports_per_host = 1
+
+    # Sizes of the session's connection pools: for how many hosts
+    # connections are kept, and how many connections are kept per host.
+    pool_connections = DEFAULT_POOL_CONNECTIONS
+    pool_maxsize = DEFAULT_POOL_MAXSIZE
+
+    _session = None
+    _owns_session = False
+    _session_lock = threading.Lock()
+
     @abc.abstractmethod
     def resolve(self, import_url):
         raise NotImplementedError
 
+    @property
+    def session(self):
+        """
+        The session imports are fetched with, created on first use unless
+        one was given to the resolver. It may be used by several threads.
+        """
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    self._session = create_session(
+                        pool_connections=self.pool_connections,
+                        pool_maxsize=self.pool_maxsize)
+                    self._owns_session = True
+        return self._session
+
+    def close(self):
+        """
+        Closes the connections of the session the resolver created,
+        a session given to the resolver is left open.
+        """
+        with self._session_lock:
+            session = self._session
+            owns_session = self._owns_session
+            self._session = None
+            self._owns_session = False
+        if session is not None and owns_session:
+            session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
     def fetch_import(self, import_url):
         url_parts = import_url.split(':')
         if url_parts[0] in ['http', 'https', 'ftp']:
             return self.resolve(import_url)
         return read_import(import_url)
 
+    def reads_as_is(self, import_url):
+        """
+        Whether ``fetch_import`` reads ``import_url`` itself rather than
+        a URL the resolver maps it to, so content already read from
+        ``import_url`` may be used instead of fetching it.
+        """
+        return import_url.split(':')[0] not in ['http', 'https', 'ftp']
+
+
+def create_session(pool_connections=DEFAULT_POOL_CONNECTIONS,
+                   pool_maxsize=DEFAULT_POOL_MAXSIZE):
+    """
+    Creates a requests session for fetching imports. The session can be
+    given to resolvers (e.g. through the ``session`` parameter of the
+    default resolver) to share its connections between them.
+    """
+    session = requests.Session()
+    for prefix in ['http://', 'https://']:
+        session.mount(prefix, HTTPAdapter(pool_connections=pool_connections,
+                                          pool_maxsize=pool_maxsize))
+    return session
+
+
+def read_content(response, import_url):
+    """
+    Reads the body of ``response``, requested with ``stream=True``,
+    within the document size limit of the current parse, so ``text`` and
+    ``content`` may then be used.
+    """
+    try:
+        response._content = _limits.read_chunks(
+            response.iter_content(READ_CHUNK_SIZE), import_url)
+    except exceptions.DSLParsingException:
+        response.close()
+        raise
+    response._content_consumed = True
+    return response.content
+
 
-def read_import(import_url):
+def read_import(import_url, session=None):
     error_str = 'Import failed: Unable to open import url'
+    deadline = _deadline.current()
+    if deadline is not None:
+        deadline.check()
     if import_url.startswith('file:'):
         try:
             with contextlib.closing(urllib2.urlopen(import_url)) as f:
-                return f.read()
+                return _limits.read_document(f, import_url)
+        except exceptions.DSLParsingException:
+            raise
         except Exception, ex:
             ex = exceptions.DSLParsingLogicException(
                 13, '{0} {1}; {2}'.format(error_str, import_url, ex))
@@ -69,15 +174,31 @@ def read_import(import_url):
         def _is_internal_error(result):
             return hasattr(result, 'status_code') and result.status_code >= 500
 
-        @retry(stop_max_attempt_number=number_of_attempts,
+        # Stops retrying after the last attempt, or once the deadline of
+        # the parse passed.
+        def _stop(attempt_number, delay_since_first_attempt_ms):
+            return attempt_number >= number_of_attempts or \
+                (deadline is not None and deadline.expired())
+
+        @retry(stop_func=_stop,
                wait_fixed=DEFAULT_RETRY_DELAY,
                retry_on_exception=_is_recoverable_error,
                retry_on_result=_is_internal_error)
         def get_import():
-            response = requests.get(import_url,
-                                    timeout=DEFAULT_REQUEST_TIMEOUT)
+            timeout = DEFAULT_REQUEST_TIMEOUT
+            if deadline is not None:
+                # no longer than the time remaining
+                timeout = deadline.request_timeout(timeout)
+            # the body is streamed if its size is limited, so it is not read
+            # further than the limit
+            stream = _limits.max_document_bytes() is not None
+            get_kwargs = {'stream': True} if stream else {}
+            response = (session or requests).get(import_url, timeout=timeout,
+                                                 **get_kwargs)
             # The response is a valid one, and the content should be returned
             if 200 <= response.status_code < 300:
+                if stream:
+                    read_content(response, import_url)
                 return response.text
             # If the response status code is above 500, an internal server
             # error has occurred. The return value would be caught by
@@ -89,10 +210,17 @@ def read_import(import_url):
                 invalid_url_err = exceptions.DSLParsingLogicException(
                     13, '{0} {1}; status code: {2}'.format(
                         error_str, import_url, response.status_code))
+                invalid_url_err.status_code = response.status_code
                 raise invalid_url_err
 
         try:
-            import_result = get_import()
+            try:
+                import_result = get_import()
+            except RetryError, err:
+                # internal server errors on all the attempts
+                if deadline is not None:
+                    deadline.check()
+                import_result = err.last_attempt.value
             # If the error is an internal error only. A custom exception should
             # be raised.
             if _is_internal_error(import_result):
@@ -104,6 +232,8 @@ def read_import(import_url):
         # after the retrying mechanism, a custom exception will be raised.
         except (requests.ConnectionError, requests.Timeout,
                 requests.URLRequired) as err:
-
+            if deadline is not None:
+                # e.g. timed out as the deadline passed
+                deadline.check()
             raise exceptions.DSLParsingLogicException(
                 13, '{0} {1}; {2}'.format(error_str, import_url, err))
@@ -0,0 +1,171 @@
+#########
+# Copyright (c) 2015 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#  * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  * See the License for the specific language governing permissions and
+#  * limitations under the License.
+
+import os
+import posixpath
+import tarfile
+import threading
+import urllib
+import zipfile
+
+from dsl_parser import (exceptions,
+                        limits as _limits)
+from dsl_parser.import_resolver.abstract_import_resolver import \
+    AbstractImportResolver
+from dsl_parser.import_resolver.default_import_resolver import \
+    DefaultImportResolver
+
+DEFAULT_BLUEPRINT_FILENAME = 'blueprint.yaml'
+
+
+class ArchiveImportResolver(AbstractImportResolver):
+    """
+    An import resolver reading the files of a .zip or .tar (optionally
+    gzip or bzip2 compressed) blueprint archive, without extracting it.
+
+    The members of the archive are indexed once, when it is opened, and
+    are located by URLs under ``base_url``, the file URL of the archive
+    (e.g. file:/tmp/blueprint.zip/blueprint/types.yaml). Imports under
+    ``base_url`` are read from the archive, any other import is fetched
+    by ``resolver`` (a new default resolver if it is not given).
+
+    ``members`` lists the paths of the files in the archive, e.g. to add
+    as the manifest of ``base_url`` to an existence cache, so operation
+    scripts are looked up in the index as well.
+    """
+
+    def __init__(self, archive_path, resolver=None):
+        self.archive_path = archive_path
+        self._owns_resolver = resolver is None
+        self.resolver = resolver or DefaultImportResolver()
+        self.base_url = 'file:' + urllib.pathname2url(
+            os.path.abspath(archive_path))
+        self._lock = threading.Lock()
+        self._archive, self._index = _open_archive(archive_path)
+
+    @property
+    def members(self):
+        return sorted(self._index)
+
+    @property
+    def session(self):
+        return self.resolver.session
+
+    @property
+    def max_concurrent_imports(self):
+        return getattr(self.resolver, 'max_concurrent_imports', 1)
+
+    @property
+    def max_concurrent_imports_per_host(self):
+        return getattr(self.resolver, 'max_concurrent_imports_per_host', 1)
+
+    def blueprint_url(self, blueprint_filename=DEFAULT_BLUEPRINT_FILENAME):
+        """
+        Returns the URL of ``blueprint_filename`` in the archive: the
+        member of that path, or else the least nested member of that
+        name, e.g. the blueprint in the top level directory of the archive.
+        """
+        name = _normalized(blueprint_filename)
+        if name not in self._index:
+            candidates = [member for member in self._index
+                          if posixpath.basename(member) == name]
+            depths = [member.count('/') for member in candidates]
+            candidates = [member for member, depth in zip(candidates, depths)
+                          if depth == min(depths)]
+            if len(candidates) != 1:
+                raise exceptions.DSLParsingLogicException(
+                    30, "Failed locating blueprint '{0}' in archive "
+                        "'{1}': {2}".format(
+                            blueprint_filename, self.archive_path,
+                            'ambiguous, found {0}'.format(sorted(candidates))
+                            if candidates else 'not found'))
+            name = candidates[0]
+        return '{0}/{1}'.format(self.base_url, name)
+
+    def resolve(self, import_url):
+        return self.resolver.resolve(import_url)
+
+    def fetch_import(self, import_url):
+        name = self._member_name(import_url)
+        if name is None:
+            return self.resolver.fetch_import(import_url)
+        member = self._index.get(name)
+        if member is None:
+            raise exceptions.DSLParsingLogicException(
+                13, 'Import failed: Unable to open import url {0}; '
+                    'not found in archive {1}'
+                    .format(import_url, self.archive_path))
+        # members are decompressed no further than the document size limit
+        with self._lock:
+            if isinstance(self._archive, zipfile.ZipFile):
+                f = self._archive.open(member)
+            else:
+                f = self._archive.extractfile(member)
+            try:
+                return _limits.read_document(f, import_url)
+            finally:
+                # zip members cannot be closed on python 2.6
+                if hasattr(f, 'close'):
+                    f.close()
+
+    def reads_as_is(self, import_url):
+        if self._member_name(import_url) is not None:
+            return True
+        reads_as_is = getattr(self.resolver, 'reads_as_is', None)
+        return reads_as_is is not None and reads_as_is(import_url)
+
+    def close(self):
+        with self._lock:
+            self._archive.close()
+        if self._owns_resolver:
+            self.resolver.close()
+
+    def _member_name(self, import_url):
+        prefix = self.base_url + '/'
+        if not import_url.startswith(prefix):
+            return None
+        return _normalized(import_url[len(prefix):])
+
+
+def _open_archive(archive_path):
+    try:
+        if zipfile.is_zipfile(archive_path):
+            archive = zipfile.ZipFile(archive_path)
+            members = [info for info in archive.infolist()
+                       if not info.filename.endswith('/')]
+            names = [info.filename for info in members]
+        elif tarfile.is_tarfile(archive_path):
+            archive = tarfile.open(archive_path)
+            members = [info for info in archive.getmembers()
+                       if info.isfile()]
+            names = [info.name for info in members]
+        else:
+            raise exceptions.DSLParsingLogicException(
+                30, "Failed reading blueprint archive '{0}': not a .zip "
+                    "or .tar archive".format(archive_path))
+    except (IOError, zipfile.BadZipfile, tarfile.TarError), ex:
+        raise exceptions.DSLParsingLogicException(
+            30, "Failed reading blueprint archive '{0}': {1}"
+                .format(archive_path, ex))
+    index = {}
+    for name, member in zip(names, members):
+        name = _normalized(name)
+        if not name.startswith('../'):
+            index[name] = member
+    return archive, index
+
+
+def _normalized(name):
+    return posixpath.normpath(name).lstrip('/')
@@ -0,0 +1,370 @@
+#########
+# Copyright (c) 2015 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#  * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  * See the License for the specific language governing permissions and
+#  * limitations under the License.
+
+import hashlib
+import json
+import os
+import stat
+import tempfile
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from dsl_parser import utils
+from dsl_parser.constants import RESLOVER_PARAMETERS_KEY
+from dsl_parser.import_resolver.abstract_import_resolver import (
+    AbstractImportResolver,
+    DEFAULT_POOL_CONNECTIONS,
+    DEFAULT_POOL_MAXSIZE,
+    read_content)
+
+DEFAULT_MAX_AGE = 300
+DEFAULT_MAX_SIZE = 100 * 1024 * 1024
+
+_METADATA_SUFFIX = '.json'
+
+
+class CachingImportResolver(AbstractImportResolver):
+    """
+    An import resolver that keeps the http(s) imports fetched by another
+    resolver in a directory, and revalidates them with conditional
+    requests.
+
+    The wrapped resolver is configured by ``resolver``, a resolver
+    configuration as given to ``utils.create_import_resolver``
+    (the default resolver if it is not given). It is given the session of
+    the caching resolver as its ``session`` parameter, instead of any
+    session in the configuration, and is expected to fetch imports
+    through it. Only that session, which the caching resolver creates
+    and closes, serves imports from the cache.
+
+    A cached import is served without a request for ``max_age`` seconds
+    after it was fetched or revalidated. After that it is requested
+    again with its ETag and Last-Modified headers, and a 304 response
+    serves it again. With ``stale_if_error``, a cached import is also
+    served, however old, when requesting it fails (a connection error,
+    a timeout or a 5xx response), e.g. while offline.
+
+    Imports are kept in ``cache_dir`` by URL, up to ``max_size`` bytes,
+    after which the least recently used are removed. The cache directory
+    is private to the user (``default_cache_dir()`` by default), see
+    ``ImportsCache``.
+
+    For example, the resolver configuration:
+        {
+            'implementation': 'dsl_parser.import_resolver.'
+                              'caching_import_resolver:'
+                              'CachingImportResolver',
+            'parameters': {
+                'cache_dir': '/var/cache/imports',
+                'max_age': 3600,
+                'stale_if_error': True,
+                'resolver': {
+                    'parameters': {
+                        'rules': [{'http://www.getcloudify.org/spec':
+                                   'http://mirror/spec'}]
+                    }
+                }
+            }
+        }
+    """
+
+    def __init__(self,
+                 cache_dir=None,
+                 max_age=DEFAULT_MAX_AGE,
+                 stale_if_error=False,
+                 max_size=DEFAULT_MAX_SIZE,
+                 resolver=None):
+        if cache_dir is None:
+            cache_dir = default_cache_dir()
+        self.cache = ImportsCache(cache_dir, max_size=max_size)
+        self.max_age = max_age
+        self.stale_if_error = stale_if_error
+        resolver = dict(resolver or {})
+        parameters = dict(resolver.get(RESLOVER_PARAMETERS_KEY) or {})
+        self.pool_connections = parameters.get('pool_connections',
+                                               DEFAULT_POOL_CONNECTIONS)
+        self.pool_maxsize = parameters.get('pool_maxsize',
+                                           DEFAULT_POOL_MAXSIZE)
+        self._session = requests.Session()
+        self._owns_session = True
+        for prefix in ['http://', 'https://']:
+            self._session.mount(prefix, CachingHTTPAdapter(
+                cache=self.cache,
+                max_age=max_age,
+                stale_if_error=stale_if_error,
+                pool_connections=self.pool_connections,
+                pool_maxsize=self.pool_maxsize))
+        parameters['session'] = self._session
+        resolver[RESLOVER_PARAMETERS_KEY] = parameters
+        try:
+            self.resolver = utils.create_import_resolver(resolver)
+        except Exception:
+            self._session.close()
+            raise
+        self.max_concurrent_imports = self.resolver.max_concurrent_imports
+        self.max_concurrent_imports_per_host = \
+            self.resolver.max_concurrent_imports_per_host
+
+    def resolve(self, import_url):
+        return self.resolver.resolve(import_url)
+
+    def fetch_import(self, import_url):
+        return self.resolver.fetch_import(import_url)
+
+    def reads_as_is(self, import_url):
+        return self.resolver.reads_as_is(import_url)
+
+    def close(self):
+        self.resolver.close()
+        super(CachingImportResolver, self).close()
+
+
+class CachingHTTPAdapter(HTTPAdapter):
+    """
+    A transport adapter serving GET requests from an ``ImportsCache``,
+    see ``CachingImportResolver``.
+    """
+
+    def __init__(self, cache, max_age=DEFAULT_MAX_AGE, stale_if_error=False,
+                 **kwargs):
+        super(CachingHTTPAdapter, self).__init__(**kwargs)
+        self.cache = cache
+        self.max_age = max_age
+        self.stale_if_error = stale_if_error
+
+    def send(self, request, **kwargs):
+        if request.method != 'GET':
+            return super(CachingHTTPAdapter, self).send(request, **kwargs)
+        url = request.url
+        entry = self.cache.get(url)
+        if entry is None:
+            return self._fetch(request, kwargs)
+        if time.time() - entry['validated'] < self.max_age:
+            return self._cached_response(request, entry)
+
+        if entry.get('etag'):
+            request.headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            request.headers['If-Modified-Since'] = entry['last_modified']
+        try:
+            response = self._fetch(request, kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            if not self.stale_if_error:
+                raise
+            return self._cached_response(request, entry)
+        if response.status_code == 304:
+            response.close()
+            entry = self.cache.revalidate(url, response.headers) or entry
+            return self._cached_response(request, entry)
+        if response.status_code >= 500 and self.stale_if_error:
+            response.close()
+            return self._cached_response(request, entry)
+        return response
+
+    def _fetch(self, request, kwargs):
+        response = super(CachingHTTPAdapter, self).send(request, **kwargs)
+        if response.status_code == 200:
+            # not cached if it is over the document size limit
+            content = read_content(response, request.url)
+            self.cache.put(request.url, content, response.headers,
+                           encoding=response.encoding)
+        return response
+
+    def _cached_response(self, request, entry):
+        response = requests.Response()
+        response.status_code = 200
+        response.reason = 'OK'
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        response.headers = CaseInsensitiveDict(entry['headers'])
+        response.encoding = entry['encoding']
+        response._content = entry['content']
+        response._content_consumed = True
+        return response
+
+
+class ImportsCache(object):
+    """
+    Bodies and validators of fetched imports, kept in ``directory`` by URL.
+    Once more than ``max_size`` bytes are kept, the least recently used
+    imports are removed.
+
+    Cached imports are served as is, so ``directory`` is created readable
+    only by the user, and a directory that another user owns or may write
+    to is refused with ImportsCacheDirectoryException.
+    """
+
+    def __init__(self, directory, max_size=DEFAULT_MAX_SIZE):
+        self.directory = directory
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        if not os.path.isdir(directory):
+            try:
+                os.makedirs(directory, 0700)
+            except OSError:
+                if not os.path.isdir(directory):
+                    raise
+        _check_private(directory)
+        # key -> [size, last access time]
+        self._entries = {}
+        for name in os.listdir(directory):
+            if name.endswith(_METADATA_SUFFIX):
+                key = name[:-len(_METADATA_SUFFIX)]
+                body_path = self._path(key)
+                if os.path.isfile(body_path):
+                    stat = os.stat(body_path)
+                    self._entries[key] = [stat.st_size, stat.st_mtime]
+
+    def get(self, url):
+        """
+        Returns the cached import of ``url`` as a dict with its
+        ``content``, ``headers``, ``encoding``, ``etag``, ``last_modified``
+        and the time it was last ``validated``, or None.
+        """
+        key = _key(url)
+        with self._lock:
+            if key not in self._entries:
+                return None
+            try:
+                with open(self._path(key) + _METADATA_SUFFIX) as f:
+                    entry = json.load(f)
+                with open(self._path(key), 'rb') as f:
+                    entry['content'] = f.read()
+            except (IOError, ValueError):
+                self._remove(key)
+                return None
+            self._touch(key)
+        return entry
+
+    def put(self, url, content, headers, encoding=None):
+        key = _key(url)
+        metadata = {
+            'url': url,
+            'headers': dict(headers),
+            'encoding': encoding,
+            'etag': headers.get('ETag'),
+            'last_modified': headers.get('Last-Modified'),
+            'validated': time.time()
+        }
+        with self._lock:
+            self._write(key, content, metadata)
+            self._entries[key] = [len(content), time.time()]
+            self._evict()
+
+    def revalidate(self, url, headers):
+        """
+        Records that the cached import of ``url`` was revalidated now,
+        updating its validators from ``headers``, and returns it.
+        """
+        entry = self.get(url)
+        if entry is None:
+            return None
+        content = entry.pop('content')
+        for header, name in [('ETag', 'etag'),
+                             ('Last-Modified', 'last_modified')]:
+            if headers.get(header):
+                entry[name] = headers[header]
+        entry['validated'] = time.time()
+        with self._lock:
+            self._write(_key(url), None, entry)
+        entry['content'] = content
+        return entry
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._entries):
+                self._remove(key)
+
+    def _write(self, key, content, metadata):
+        path = self._path(key)
+        files = [(path + _METADATA_SUFFIX, json.dumps(metadata))]
+        if content is not None:
+            files.insert(0, (path, content))
+        for file_path, data in files:
+            fd, temp_path = tempfile.mkstemp(dir=self.directory)
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.rename(temp_path, file_path)
+
+    def _touch(self, key):
+        now = time.time()
+        self._entries[key][1] = now
+        try:
+            os.utime(self._path(key), (now, now))
+        except OSError:
+            pass
+
+    def _evict(self):
+        size = sum(s for s, _ in self._entries.itervalues())
+        by_access = sorted(self._entries,
+                           key=lambda k: self._entries[k][1])
+        for key in by_access:
+            if size <= self.max_size:
+                break
+            size -= self._entries[key][0]
+            self._remove(key)
+
+    def _remove(self, key):
+        self._entries.pop(key, None)
+        for path in [self._path(key), self._path(key) + _METADATA_SUFFIX]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _path(self, key):
+        return os.path.join(self.directory, key)
+
+    def __contains__(self, url):
+        return _key(url) in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class ImportsCacheDirectoryException(Exception):
+    pass
+
+
+def default_cache_dir():
+    """The imports directory in the cache directory of the user,
+    $XDG_CACHE_HOME or ~/.cache."""
+    cache_home = os.environ.get('XDG_CACHE_HOME') or \
+        os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(cache_home, 'dsl_parser', 'imports')
+
+
+def _check_private(directory):
+    if not hasattr(os, 'getuid'):
+        # no file ownership to check, e.g. on windows
+        return
+    directory_stat = os.stat(directory)
+    if directory_stat.st_uid != os.getuid():
+        raise ImportsCacheDirectoryException(
+            'Imports cache directory {0} is owned by another user'
+            .format(directory))
+    if directory_stat.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+        raise ImportsCacheDirectoryException(
+            'Imports cache directory {0} is writable by other users'
+            .format(directory))
+
+
+def _key(url):
+    return hashlib.sha1(url.encode('utf-8')).hexdigest()
@@ -12,13 +12,25 @@
 #  * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 #  * See the License for the specific language governing permissions and
 #  * limitations under the License.
+import collections
+import threading
+import time
+import urlparse
+
 from dsl_parser.exceptions import DSLParsingLogicException
 
-from dsl_parser.import_resolver.abstract_import_resolver \
-    import AbstractImportResolver, read_import
+from dsl_parser.import_resolver.abstract_import_resolver import (
+    AbstractImportResolver,
+    read_import,
+    DEFAULT_POOL_CONNECTIONS,
+    DEFAULT_POOL_MAXSIZE)
 
 DEFAULT_RULES = []
 DEFAULT_RESLOVER_RULES_KEY = 'rules'
+DEFAULT_MAX_CONCURRENT_IMPORTS = 8
+DEFAULT_MAX_CONCURRENT_IMPORTS_PER_HOST = 4
+DEFAULT_MIRROR_FAILURE_TTL = 60
+DEFAULT_MIRROR_HOST_FAILURE_THRESHOLD = 1
 
 
 class DefaultResolverValidationException(Exception):
@@ -70,41 +82,88 @@ class DefaultImportResolver(AbstractImportResolver):
 
         In case that all the resolve attempts will fail,
         a DSLParsingLogicException will be raise.
+
+    Imports of the same level in the imports graph are fetched
+    concurrently, by up to ``max_concurrent_imports`` threads, and by up to
+    ``max_concurrent_imports_per_host`` threads from the same host.
+    Setting ``max_concurrent_imports`` to 1 fetches the imports one
+    at a time.
+
+    Imports are fetched through a session that keeps ``pool_maxsize``
+    connections alive for each of up to ``pool_connections`` hosts.
+    An existing session can be given as ``session`` to share its
+    connections, e.g. between the resolvers of all the blueprints parsed
+    by a process. Such a session is not closed by ``close``.
+
+    The rules are compiled to a prefix trie when the resolver is created,
+    so the rules matching a url are found without going over all of them.
+    URLs replaced by the rules that failed recently are not tried again
+    for a while, and neither are other URLs of their host when the host
+    failed to respond, see ``MirrorFailures``. The failures are shared by
+    all the default resolvers of the process (``mirror_failures``),
+    unless other ``MirrorFailures`` are given to the resolver.
+    How many imports were resolved by each rule, failed or were skipped
+    is counted in ``stats``.
     """
 
-    def __init__(self, rules=None):
+    def __init__(self, rules=None,
+                 max_concurrent_imports=DEFAULT_MAX_CONCURRENT_IMPORTS,
+                 max_concurrent_imports_per_host=(
+                     DEFAULT_MAX_CONCURRENT_IMPORTS_PER_HOST),
+                 pool_connections=DEFAULT_POOL_CONNECTIONS,
+                 pool_maxsize=DEFAULT_POOL_MAXSIZE,
+                 session=None,
+                 failures=None):
         # set the rules
         self.rules = rules
         if self.rules is None:
             self.rules = DEFAULT_RULES
         self._validate_rules()
+        self._rules_trie = _RulesTrie(self.rules)
+        self.failures = failures or mirror_failures
+        self.stats = ResolverStats()
+        self.max_concurrent_imports = max_concurrent_imports
+        self.max_concurrent_imports_per_host = max_concurrent_imports_per_host
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self._validate_limits()
+        self._session = session
 
     def resolve(self, import_url):
         failed_urls = {}
-        # trying to find a matching rule that can resolve this url
-        for rule in self.rules:
-            key = rule.keys()[0]
-            value = rule.values()[0]
-            prefix = key
-            prefix_len = len(key)
-            if prefix == import_url[:prefix_len]:
-                # found a matching rule
-                url_to_resolve = value + import_url[prefix_len:]
-                # trying to resolve the resolved_url
-                if url_to_resolve not in failed_urls.keys():
-                    # there is no point to try to resolve the same url twice
-                    try:
-                        return read_import(url_to_resolve)
-                    except DSLParsingLogicException, ex:
-                        # failed to resolve current rule,
-                        # continue to the next one
-                        failed_urls[url_to_resolve] = str(ex)
+        # trying the rules matching this url, in the order of the rules
+        for rule in self._rules_trie.matches(import_url):
+            prefix, value = rule
+            url_to_resolve = value + import_url[len(prefix):]
+            # there is no point to try to resolve the same url twice
+            if url_to_resolve in failed_urls:
+                continue
+            skip_reason = self.failures.skip_reason(url_to_resolve)
+            if skip_reason:
+                self.stats.count('skipped', rule)
+                failed_urls[url_to_resolve] = skip_reason
+                continue
+            try:
+                result = read_import(url_to_resolve, session=self.session)
+            except DSLParsingLogicException, ex:
+                # failed to resolve current rule,
+                # continue to the next one
+                self.failures.failed(url_to_resolve, ex)
+                self.stats.count('failures', rule)
+                failed_urls[url_to_resolve] = str(ex)
+            else:
+                self.failures.succeeded(url_to_resolve)
+                self.stats.count('hits', rule)
+                return result
 
         # failed to resolve the url using the rules
         # trying to open the original url
         try:
-            return read_import(import_url)
+            result = read_import(import_url, session=self.session)
+            self.stats.count('hits', None)
+            return result
         except DSLParsingLogicException, ex:
+            self.stats.count('failures', None)
             if not self.rules:
                 raise
             if not failed_urls:
@@ -121,6 +180,24 @@ class DefaultImportResolver(AbstractImportResolver):
             ex.failed_import = import_url
             raise ex
 
+    def reads_as_is(self, import_url):
+        if super(DefaultImportResolver, self).reads_as_is(import_url):
+            return True
+        return not self._rules_trie.matches(import_url)
+
+    def _validate_limits(self):
+        for name in ['max_concurrent_imports',
+                     'max_concurrent_imports_per_host',
+                     'pool_connections',
+                     'pool_maxsize']:
+            value = getattr(self, name)
+            if isinstance(value, bool) or not isinstance(value, int) \
+                    or value < 1:
+                raise DefaultResolverValidationException(
+                    'Invalid parameters supplied for the default resolver: '
+                    'The `{0}` parameter must be a positive integer but it '
+                    'is {1}.'.format(name, value))
+
     def _validate_rules(self):
         if not isinstance(self.rules, list):
             raise DefaultResolverValidationException(
@@ -143,3 +220,122 @@ class DefaultImportResolver(AbstractImportResolver):
                     'Each rule must be a dictionary with one (key,value) pair '
                     'but the rule [{0}] has {1} keys.'
                     .format(rule, len(keys)))
+
+
+class _RulesTrie(object):
+    """
+    The rules by their prefixes, character by character. ``matches``
+    returns the (prefix, value) of the rules matching a url in the order
+    of the rules.
+    """
+
+    def __init__(self, rules):
+        self._root = {}
+        for index, rule in enumerate(rules):
+            prefix, value = rule.items()[0]
+            node = self._root
+            for char in prefix:
+                node = node.setdefault(char, {})
+            # None is not a character, it keys the rules ending here
+            node.setdefault(None, []).append((index, prefix, value))
+
+    def matches(self, url):
+        node = self._root
+        matches = list(node.get(None, []))
+        for char in url:
+            node = node.get(char)
+            if node is None:
+                break
+            matches.extend(node.get(None, []))
+        return [(prefix, value) for _, prefix, value in sorted(matches)]
+
+
+class MirrorFailures(object):
+    """
+    URLs that rules replaced an import url with, and their hosts, that
+    failed in the last ``ttl`` seconds.
+
+    A failed URL is skipped until ``ttl`` seconds passed since it failed.
+    A host that failed to respond (a connection error, a timeout or a 5xx
+    response, as opposed to e.g. a missing file) ``host_failure_threshold``
+    times in a row is skipped altogether until ``ttl`` seconds passed
+    since its last failure, after which it is tried again.
+    """
+
+    def __init__(self,
+                 ttl=DEFAULT_MIRROR_FAILURE_TTL,
+                 host_failure_threshold=DEFAULT_MIRROR_HOST_FAILURE_THRESHOLD):
+        self.ttl = ttl
+        self.host_failure_threshold = host_failure_threshold
+        # url -> (time failed, error)
+        self._urls = {}
+        # host -> [failures in a row, time of last failure, error]
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def skip_reason(self, url):
+        """
+        Returns why ``url`` should not be tried now, or None if it should.
+        """
+        now = time.time()
+        host = _host(url)
+        with self._lock:
+            failed_url = self._urls.get(url)
+            if failed_url is not None:
+                if now - failed_url[0] < self.ttl:
+                    return 'Skipped, failed {0:.0f} seconds ago: {1}'.format(
+                        now - failed_url[0], failed_url[1])
+                del self._urls[url]
+            failed_host = self._hosts.get(host)
+            if failed_host is not None and \
+                    failed_host[0] >= self.host_failure_threshold and \
+                    now - failed_host[1] < self.ttl:
+                return "Skipped, host '{0}' failed {1:.0f} seconds " \
+                       "ago: {2}".format(host, now - failed_host[1],
+                                         failed_host[2])
+        return None
+
+    def failed(self, url, error):
+        now = time.time()
+        host = _host(url)
+        with self._lock:
+            self._urls[url] = (now, str(error))
+            if host and getattr(error, 'status_code', None) is None:
+                failures = self._hosts.get(host, [0])[0] + 1
+                self._hosts[host] = [failures, now, str(error)]
+
+    def succeeded(self, url):
+        with self._lock:
+            self._urls.pop(url, None)
+            self._hosts.pop(_host(url), None)
+
+    def clear(self):
+        with self._lock:
+            self._urls.clear()
+            self._hosts.clear()
+
+
+class ResolverStats(object):
+    """
+    How many imports each rule resolved (``hits``), failed to resolve
+    (``failures``) and skipped as it failed recently (``skipped``), by the
+    (prefix, value) of the rule, or by None for the original url.
+    """
+
+    def __init__(self):
+        self.hits = collections.defaultdict(int)
+        self.failures = collections.defaultdict(int)
+        self.skipped = collections.defaultdict(int)
+        self._lock = threading.Lock()
+
+    def count(self, name, rule):
+        with self._lock:
+            getattr(self, name)[rule] += 1
+
+
+def _host(url):
+    return urlparse.urlparse(url).netloc
+
+
+# the failures shared by the default resolvers of the process
+mirror_failures = MirrorFailures()
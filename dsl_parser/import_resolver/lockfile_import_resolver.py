@@ -0,0 +1,86 @@
+#########
+# Copyright (c) 2015 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#  * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  * See the License for the specific language governing permissions and
+#  * limitations under the License.
+
+import hashlib
+import json
+import os
+
+from dsl_parser import (exceptions,
+                        limits as _limits)
+from dsl_parser.import_resolver.abstract_import_resolver import \
+    AbstractImportResolver
+
+
+class LockfileImportResolver(AbstractImportResolver):
+    """
+    An import resolver reading imports from the files vendored by
+    ``import_lock.lock_imports``, as listed in the lockfile
+    ``lockfile_path``, without any network calls.
+
+    Every vendored file is verified against the size and sha256 hash
+    the lockfile has for it. Imports that are not in the lockfile are
+    fetched by ``resolver`` if it is given, and fail otherwise.
+
+    ``existence`` has the existence of the URLs that were checked for
+    locating relative imports when the lockfile was written, so they are
+    located again without checking them.
+    """
+
+    def __init__(self, lockfile_path, resolver=None):
+        self.lockfile_path = lockfile_path
+        self.resolver = resolver
+        try:
+            with open(lockfile_path) as f:
+                lock = json.load(f)
+        except (IOError, ValueError), ex:
+            raise exceptions.DSLParsingLogicException(
+                13, "Failed reading imports lockfile '{0}': {1}"
+                    .format(lockfile_path, ex))
+        self.imports = dict((entry['url'], entry)
+                            for entry in lock['imports'])
+        self.existence = lock.get('existence', {})
+        self._directory = os.path.dirname(os.path.abspath(lockfile_path))
+
+    def resolve(self, import_url):
+        return self.fetch_import(import_url)
+
+    def fetch_import(self, import_url):
+        entry = self.imports.get(import_url)
+        if entry is None:
+            if self.resolver is not None:
+                return self.resolver.fetch_import(import_url)
+            raise exceptions.DSLParsingLogicException(
+                13, "Import failed: {0} is not in the imports lockfile "
+                    "'{1}'".format(import_url, self.lockfile_path))
+        path = os.path.join(self._directory, entry['path'])
+        try:
+            with open(path, 'rb') as f:
+                content = _limits.read_document(f, import_url)
+        except IOError, ex:
+            raise exceptions.DSLParsingLogicException(
+                13, 'Import failed: Unable to open vendored import {0} of '
+                    '{1}; {2}'.format(path, import_url, ex))
+        if len(content) != entry['size'] or \
+                hashlib.sha256(content).hexdigest() != entry['sha256']:
+            raise exceptions.DSLParsingLogicException(
+                13, 'Import failed: vendored import {0} of {1} does not '
+                    "match its size and hash in the imports lockfile '{2}'"
+                    .format(path, import_url, self.lockfile_path))
+        return content
+
+    def reads_as_is(self, import_url):
+        # vendored imports are always read from the vendored files, so
+        # they are verified
+        return False
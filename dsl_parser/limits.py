@@ -0,0 +1,273 @@
+########
+# Copyright (c) 2015 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+"""
+Limits of the size and complexity of blueprints.
+
+Blueprints uploaded by users may be crafted to be expensive to parse,
+e.g. a YAML alias bomb, whose few aliases expand to billions of nodes,
+or a list of millions of items. A parse given ParsingLimits rejects such
+a blueprint with a DSLParsingFormatException as soon as one of the
+limits is exceeded, so rejecting it costs about as much as parsing a
+blueprint at the limit:
+
+    parser.parse(dsl_string, limits=ParsingLimits(max_document_bytes=...))
+
+The size of documents (the blueprint and each of its imports) is
+checked while they are read, their alias expansions and nesting depth
+while they are composed, the element count while the element tree is
+built and the import count before each import is fetched.
+
+Documents are read no further than ``max_document_bytes`` + 1 bytes.
+Resolvers read imports with ``read_document`` or ``read_chunks``, which
+apply the limits of the parse running in the thread, as set by
+``activated``.
+"""
+
+import contextlib
+import functools
+import threading
+
+from dsl_parser import exceptions
+
+_local = threading.local()
+
+
+class ParsingLimits(object):
+    """
+    Every limit is unlimited if it is None.
+
+    :param max_document_bytes: the size of the blueprint and of each of
+        its imports.
+    :param max_alias_expansions: the number of YAML nodes the aliases of
+        a document add to it when they are expanded, in total.
+    :param max_nesting_depth: how deep collections may be nested in a
+        document, with aliases expanded.
+    :param max_elements: the number of elements built by each stage of a
+        parse, e.g. for the merged blueprint.
+    :param max_imports: the number of imports fetched for a blueprint,
+        directly or not (each URL once).
+    """
+
+    def __init__(self,
+                 max_document_bytes=None,
+                 max_alias_expansions=None,
+                 max_nesting_depth=None,
+                 max_elements=None,
+                 max_imports=None):
+        self.max_document_bytes = max_document_bytes
+        self.max_alias_expansions = max_alias_expansions
+        self.max_nesting_depth = max_nesting_depth
+        self.max_elements = max_elements
+        self.max_imports = max_imports
+
+    def check_document_bytes(self, raw_yaml, filename):
+        if self.max_document_bytes is None or \
+                not isinstance(raw_yaml, basestring):
+            return
+        if isinstance(raw_yaml, unicode):
+            raw_yaml = raw_yaml.encode('utf-8')
+        if len(raw_yaml) > self.max_document_bytes:
+            raise _limit_exceeded(
+                "Document '{0}' is larger than the limit of {1} bytes"
+                .format(filename, self.max_document_bytes))
+
+    def read_document(self, f, filename):
+        """Reads the file object ``f`` to its end, raising as soon as more
+        than ``max_document_bytes`` were read"""
+        if self.max_document_bytes is None:
+            return f.read()
+        content = []
+        remaining = self.max_document_bytes + 1
+        while remaining > 0:
+            chunk = f.read(remaining)
+            if not chunk:
+                break
+            content.append(chunk)
+            remaining -= len(chunk)
+        content = ''.join(content)
+        self.check_document_bytes(content, filename)
+        return content
+
+    def read_chunks(self, chunks, filename):
+        """Joins the byte strings ``chunks``, raising as soon as more than
+        ``max_document_bytes`` were read"""
+        content = []
+        size = 0
+        for chunk in chunks:
+            content.append(chunk)
+            size += len(chunk)
+            if self.max_document_bytes is not None and \
+                    size > self.max_document_bytes:
+                self.check_document_bytes(''.join(content), filename)
+        return ''.join(content)
+
+    def checks_nodes(self):
+        """Whether the YAML nodes of documents are checked, which the
+        yaml_loader then does while it composes them."""
+        return self.max_alias_expansions is not None or \
+            self.max_nesting_depth is not None
+
+    def check_alias_expansions(self, alias_expansions, filename):
+        if self.max_alias_expansions is not None and \
+                alias_expansions > self.max_alias_expansions:
+            raise _limit_exceeded(
+                "The YAML aliases of document '{0}' expand to more than the "
+                "limit of {1} nodes".format(filename,
+                                            self.max_alias_expansions))
+
+    def check_nesting_depth(self, depth, filename):
+        if self.max_nesting_depth is not None and \
+                depth > self.max_nesting_depth:
+            raise _limit_exceeded(
+                "Document '{0}' is nested deeper than the limit of {1} "
+                "levels".format(filename, self.max_nesting_depth))
+
+    def recursive_alias(self, filename):
+        return _limit_exceeded(
+            "Document '{0}' has a recursive YAML alias".format(filename))
+
+    def check_document(self, dsl_holder, filename):
+        """Checks the alias expansions and the nesting depth of the loaded
+        document ``dsl_holder``, e.g. of a cached document. The holders of
+        aliased nodes are shared, so the document is walked without
+        expanding its aliases."""
+        if not self.checks_nodes():
+            return
+        # id of holder -> (size with aliases expanded, depth)
+        expanded = {}
+        in_progress = set()
+        stack = [(dsl_holder, False)]
+        while stack:
+            current, children_done = stack.pop()
+            key = id(current)
+            if children_done:
+                children = [expanded[id(child)]
+                            for child in _children(current)]
+                size = 1 + sum(child[0] for child in children)
+                depth = 0
+                if isinstance(current.value, _COLLECTIONS):
+                    depth = 1 + max([child[1] for child in children] or [0])
+                expanded[key] = (size, depth)
+                in_progress.discard(key)
+                self._check_expanded(size, depth, len(expanded), filename)
+                continue
+            if key in expanded:
+                continue
+            if key in in_progress:
+                raise self.recursive_alias(filename)
+            in_progress.add(key)
+            stack.append((current, True))
+            for child in _children(current):
+                if id(child) not in expanded:
+                    stack.append((child, False))
+
+    def _check_expanded(self, size, depth, distinct_nodes, filename):
+        # the expansions of a part of the document are at least its
+        # expanded size less the distinct nodes seen so far
+        self.check_alias_expansions(size - distinct_nodes, filename)
+        self.check_nesting_depth(depth, filename)
+
+    def check_elements(self, elements_count):
+        if self.max_elements is not None and \
+                elements_count > self.max_elements:
+            raise _limit_exceeded(
+                'Blueprint has more than the limit of {0} elements'
+                .format(self.max_elements))
+
+    def check_imports(self, imports_count):
+        if self.max_imports is not None and \
+                imports_count > self.max_imports:
+            raise _limit_exceeded(
+                'Blueprint has more than the limit of {0} imports'
+                .format(self.max_imports))
+
+
+def current():
+    """Returns the limits of the parse running in this thread, or None"""
+    return getattr(_local, 'limits', None)
+
+
+def read_document(f, filename):
+    """Reads the file object ``f`` within the current limits, if any"""
+    limits = current()
+    if limits is None:
+        return f.read()
+    return limits.read_document(f, filename)
+
+
+def read_chunks(chunks, filename):
+    """Joins the byte strings ``chunks`` within the current limits, if
+    any"""
+    limits = current()
+    if limits is None:
+        return ''.join(chunks)
+    return limits.read_chunks(chunks, filename)
+
+
+def max_document_bytes():
+    """Returns the document size limit of the current limits, or None"""
+    limits = current()
+    return limits.max_document_bytes if limits is not None else None
+
+
+@contextlib.contextmanager
+def activated(limits):
+    """Makes ``limits`` (if it is not None) the current limits of this
+    thread in the context"""
+    if limits is None:
+        yield
+        return
+    previous = current()
+    _local.limits = limits
+    try:
+        yield
+    finally:
+        _local.limits = previous
+
+
+def propagated(func):
+    """Returns ``func`` to run with the current limits of this thread,
+    e.g. by a thread pool"""
+    limits = current()
+    if limits is None:
+        return func
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with activated(limits):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+_COLLECTIONS = (dict, list, set)
+
+
+def _children(dsl_holder):
+    value = dsl_holder.value
+    if isinstance(value, dict):
+        result = []
+        for key_holder, value_holder in value.iteritems():
+            result.append(key_holder)
+            result.append(value_holder)
+        return result
+    if isinstance(value, (list, set)):
+        return list(value)
+    return []
+
+
+def _limit_exceeded(message):
+    return exceptions.DSLParsingFormatException(
+        exceptions.ERROR_CODE_LIMIT_EXCEEDED, message)
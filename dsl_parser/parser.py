@@ -14,12 +14,24 @@
 #    * limitations under the License.
 
 import contextlib
+import socket
 import urllib2
 
-from dsl_parser import (functions,
-                        utils)
+from dsl_parser import (constants,
+                        deadline as _deadline,
+                        existence_cache as _existence_cache,
+                        functions,
+                        holder,
+                        import_prefetch as _import_prefetch,
+                        limits as _limits,
+                        type_library,
+                        utils,
+                        version as _version)
 from dsl_parser.framework import parser
 from dsl_parser.elements import blueprint
+from dsl_parser.import_resolver.archive_import_resolver import (
+    ArchiveImportResolver,
+    DEFAULT_BLUEPRINT_FILENAME)
 from dsl_parser.import_resolver.default_import_resolver import \
     DefaultImportResolver
 
@@ -27,23 +39,69 @@ from dsl_parser.import_resolver.default_import_resolver import \
 def parse_from_path(dsl_file_path,
                     resources_base_url=None,
                     resolver=None,
-                    validate_version=True):
-    with open(dsl_file_path, 'r') as f:
-        dsl_string = f.read()
-    return _parse(dsl_string,
-                  resources_base_url=resources_base_url,
-                  dsl_location=dsl_file_path,
-                  resolver=resolver,
-                  validate_version=validate_version)
+                    validate_version=True,
+                    existence_cache=None,
+                    resource_manifest=None,
+                    deadline=None,
+                    limits=None,
+                    import_manifests=None):
+    """Parses the blueprint file ``dsl_file_path`` to a plan.
+
+    ``resource_manifest`` optionally lists the paths of all the files in
+    the directory of the blueprint (relative to it), e.g. as uploaded in
+    a blueprint archive. Relative imports and operation scripts are then
+    looked up in it rather than checked on the file system.
+
+    ``import_manifests`` (an import_prefetch.ImportManifests) records the
+    imports of the blueprint's location, and prefetches those an earlier
+    parse recorded in it, see the import_prefetch module. Imports are not
+    prefetched without it.
+    """
+    with _deadline.activated(deadline):
+        with _limits.activated(limits):
+            with open(dsl_file_path, 'r') as f:
+                dsl_string = _limits.read_document(f, dsl_file_path)
+            return _parse(dsl_string,
+                          resources_base_url=resources_base_url,
+                          dsl_location=dsl_file_path,
+                          resolver=resolver,
+                          validate_version=validate_version,
+                          existence_cache=existence_cache,
+                          resource_manifest=resource_manifest,
+                          limits=limits,
+                          import_manifests=import_manifests)
 
 
 def parse_from_url(dsl_url,
                    resources_base_url=None,
                    resolver=None,
-                   validate_version=True):
+                   validate_version=True,
+                   existence_cache=None,
+                   resource_manifest=None,
+                   deadline=None,
+                   limits=None,
+                   import_manifests=None):
+    """Parses the blueprint at ``dsl_url`` to a plan.
+
+    ``deadline`` (a deadline.Deadline) bounds the time the parse may
+    take, including fetching the blueprint and its imports, and can
+    cancel it. DSLParsingDeadlineException is raised once it passed.
+
+    Neither the blueprint nor its imports are read further than the
+    ``max_document_bytes`` of ``limits``.
+    """
+    urlopen_kwargs = {}
+    if deadline is not None:
+        deadline.check()
+        if deadline.remaining() is not None:
+            urlopen_kwargs['timeout'] = deadline.remaining()
     try:
-        with contextlib.closing(urllib2.urlopen(dsl_url)) as f:
-            dsl_string = f.read()
+        with contextlib.closing(urllib2.urlopen(dsl_url,
+                                                **urlopen_kwargs)) as f:
+            if limits is not None:
+                dsl_string = limits.read_document(f, dsl_url)
+            else:
+                dsl_string = f.read()
     except urllib2.HTTPError as e:
         if e.code == 404:
             # HTTPError.__str__ uses the 'msg'.
@@ -52,38 +110,199 @@ def parse_from_url(dsl_url,
             # that specifies the missing url.
             e.msg = '{0} not found'.format(e.filename)
         raise
-    return _parse(dsl_string,
-                  resources_base_url=resources_base_url,
-                  dsl_location=dsl_url,
-                  resolver=resolver,
-                  validate_version=validate_version)
+    except (urllib2.URLError, socket.timeout):
+        if deadline is not None:
+            deadline.check()
+        raise
+    with _deadline.activated(deadline):
+        with _limits.activated(limits):
+            return _parse(dsl_string,
+                          resources_base_url=resources_base_url,
+                          dsl_location=dsl_url,
+                          resolver=resolver,
+                          validate_version=validate_version,
+                          existence_cache=existence_cache,
+                          resource_manifest=resource_manifest,
+                          limits=limits,
+                          import_manifests=import_manifests)
+
+
+def parse_from_archive(archive_path,
+                       blueprint_filename=DEFAULT_BLUEPRINT_FILENAME,
+                       resources_base_url=None,
+                       resolver=None,
+                       validate_version=True,
+                       existence_cache=None,
+                       deadline=None,
+                       limits=None,
+                       import_manifests=None):
+    """Parses the blueprint ``blueprint_filename`` of the .zip or .tar
+    (optionally compressed) blueprint archive ``archive_path`` to a plan,
+    without extracting the archive.
+
+    Imports and operation scripts in the archive are read and looked up
+    in an index of its members, other imports are resolved by
+    ``resolver``. See archive_import_resolver.ArchiveImportResolver.
+    """
+    with _deadline.activated(deadline):
+        with _limits.activated(limits):
+            with ArchiveImportResolver(archive_path,
+                                       resolver=resolver) as archive_resolver:
+                if existence_cache is None:
+                    existence_cache = _existence_cache.ExistenceCache(
+                        session=archive_resolver.session)
+                existence_cache.add_manifest(archive_resolver.base_url,
+                                             archive_resolver.members)
+                dsl_location = archive_resolver.blueprint_url(
+                    blueprint_filename)
+                return _parse(archive_resolver.fetch_import(dsl_location),
+                              resources_base_url=resources_base_url,
+                              dsl_location=dsl_location,
+                              resolver=archive_resolver,
+                              validate_version=validate_version,
+                              existence_cache=existence_cache,
+                              limits=limits,
+                              import_manifests=import_manifests)
 
 
 def parse(dsl_string,
           resources_base_url=None,
           resolver=None,
-          validate_version=True):
-    return _parse(dsl_string,
-                  resources_base_url=resources_base_url,
-                  resolver=resolver,
-                  validate_version=validate_version)
+          validate_version=True,
+          existence_cache=None,
+          resource_manifest=None,
+          deadline=None,
+          limits=None):
+    """Parses the blueprint ``dsl_string`` to a plan.
+
+    ``existence_cache`` (an existence_cache.ExistenceCache) remembers
+    which relative imports and operation scripts exist. Each parse uses
+    its own cache unless one is given, e.g. to share it, with a ttl,
+    between parses.
+
+    ``resource_manifest`` optionally lists the paths of all the files
+    under ``resources_base_url`` (relative to it), see
+    ``parse_from_path``.
+
+    ``deadline`` (a deadline.Deadline) bounds the time the parse may
+    take and can cancel it, see the deadline module.
+
+    ``limits`` (a limits.ParsingLimits) bounds the size and complexity of
+    the blueprint and its imports, e.g. of untrusted blueprints, see the
+    limits module.
+    """
+    with _deadline.activated(deadline):
+        with _limits.activated(limits):
+            return _parse(dsl_string,
+                          resources_base_url=resources_base_url,
+                          resolver=resolver,
+                          validate_version=validate_version,
+                          existence_cache=existence_cache,
+                          resource_manifest=resource_manifest,
+                          limits=limits)
+
+
+def parse_dsl_header(dsl_string,
+                     dsl_location=None,
+                     validate_version=True):
+    """Reads only the top level ``tosca_definitions_version`` and
+    ``imports`` of a blueprint from the YAML event stream and stops there,
+    without composing the rest of the document.
+
+    Returns a dict with the ``version`` of the blueprint and the
+    ``tosca_definitions_version`` and ``imports`` holders (None if
+    missing), which carry the positions of the values.
+    Raises the same exceptions as ``parse`` for a missing or unsupported
+    version."""
+    header_holder = utils.load_yaml_header(
+        raw_yaml=dsl_string,
+        error_message='Failed to parse DSL',
+        keys=[_version.VERSION, constants.IMPORTS],
+        filename=dsl_location)
+    result = parser.parse(
+        _top_level_holder(header_holder,
+                          blueprint.BlueprintVersionExtractor),
+        element_cls=blueprint.BlueprintVersionExtractor,
+        inputs={
+            'validate_version': validate_version
+        },
+        strict=False)
+    header = {'version': result['plan_version']}
+    for key in [_version.VERSION, constants.IMPORTS]:
+        _, header[key] = header_holder.get_item(key)
+    return header
 
 
 def _parse(dsl_string,
            resources_base_url,
            dsl_location=None,
            resolver=None,
-           validate_version=True):
+           validate_version=True,
+           existence_cache=None,
+           resource_manifest=None,
+           limits=None,
+           import_manifests=None):
+    if not resolver:
+        # the default resolver's connections are closed once parsed
+        with DefaultImportResolver() as default_resolver:
+            return _parse(dsl_string,
+                          resources_base_url=resources_base_url,
+                          dsl_location=dsl_location,
+                          resolver=default_resolver,
+                          validate_version=validate_version,
+                          existence_cache=existence_cache,
+                          resource_manifest=resource_manifest,
+                          limits=limits,
+                          import_manifests=import_manifests)
+    if existence_cache is None:
+        existence_cache = _existence_cache.ExistenceCache(
+            session=getattr(resolver, 'session', None))
+    # e.g. the existence checks recorded in an imports lockfile
+    known_existence = getattr(resolver, 'existence', None)
+    if known_existence:
+        existence_cache.add_known(known_existence)
+
+    # the imports of the previous parse of the blueprint's location are
+    # fetched while the blueprint is loaded
+    import_prefetch = _import_prefetch.start(
+        dsl_location=dsl_location,
+        resources_base_url=resources_base_url,
+        resolver=resolver,
+        existence_cache=existence_cache,
+        import_manifests=import_manifests)
+    try:
+        return _parse_blueprint(dsl_string,
+                                resources_base_url=resources_base_url,
+                                dsl_location=dsl_location,
+                                resolver=resolver,
+                                validate_version=validate_version,
+                                existence_cache=existence_cache,
+                                resource_manifest=resource_manifest,
+                                import_prefetch=import_prefetch,
+                                limits=limits)
+    finally:
+        if import_prefetch is not None:
+            import_prefetch.discard()
+
+
+def _parse_blueprint(dsl_string,
+                     resources_base_url,
+                     dsl_location,
+                     resolver,
+                     validate_version,
+                     existence_cache,
+                     resource_manifest,
+                     import_prefetch,
+                     limits):
     parsed_dsl_holder = utils.load_yaml(raw_yaml=dsl_string,
                                         error_message='Failed to parse DSL',
-                                        filename=dsl_location)
-
-    if not resolver:
-        resolver = DefaultImportResolver()
+                                        filename=dsl_location,
+                                        limits=limits)
 
     # validate version schema and extract actual version used
     result = parser.parse(
-        parsed_dsl_holder,
+        _top_level_holder(parsed_dsl_holder,
+                          blueprint.BlueprintVersionExtractor),
         element_cls=blueprint.BlueprintVersionExtractor,
         inputs={
             'validate_version': validate_version
@@ -93,28 +312,66 @@ def _parse(dsl_string,
 
     # handle imports
     result = parser.parse(
-        value=parsed_dsl_holder,
+        value=_top_level_holder(parsed_dsl_holder,
+                                blueprint.BlueprintImporter),
         inputs={
             'main_blueprint_holder': parsed_dsl_holder,
             'resources_base_url': resources_base_url,
             'blueprint_location': dsl_location,
             'version': version,
             'resolver': resolver,
-            'validate_version': validate_version
+            'validate_version': validate_version,
+            'existence_cache': existence_cache,
+            'resource_manifest': resource_manifest,
+            'import_prefetch': import_prefetch,
+            'limits': limits
         },
         element_cls=blueprint.BlueprintImporter,
-        strict=False)
+        strict=False,
+        limits=limits)
     resource_base = result['resource_base']
     merged_blueprint_holder = result['merged_blueprint']
 
+    # types of the imports, parsed once for all blueprints importing them
+    prelinked = type_library.prelinked_types(
+        imported_blueprints=result['imported_blueprints'],
+        blueprint_holder=merged_blueprint_holder,
+        resource_base=resource_base,
+        validate_version=validate_version,
+        existence_cache=existence_cache,
+        limits=limits)
+
     # parse blueprint
     plan = parser.parse(
         value=merged_blueprint_holder,
         inputs={
             'resource_base': resource_base,
-            'validate_version': validate_version
+            'validate_version': validate_version,
+            'existence_cache': existence_cache
         },
-        element_cls=blueprint.Blueprint)
+        element_cls=blueprint.Blueprint,
+        prelinked=prelinked,
+        limits=limits)
 
     functions.validate_functions(plan)
     return plan
+
+
+def _top_level_holder(dsl_holder, element_cls):
+    """Returns a holder of only the top level keys of the blueprint that
+    the schema of ``element_cls`` reads. The version and imports stages
+    use it so they do not build elements for the rest of the blueprint,
+    which is parsed once, after the imports are merged."""
+    if not isinstance(dsl_holder.value, dict):
+        return dsl_holder
+    return holder.Holder(
+        value=dict((key_holder, value_holder)
+                   for key_holder, value_holder
+                   in dsl_holder.value.iteritems()
+                   if isinstance(key_holder.value, basestring) and
+                   key_holder.value in element_cls.schema),
+        start_line=dsl_holder.start_line,
+        start_column=dsl_holder.start_column,
+        end_line=dsl_holder.end_line,
+        end_column=dsl_holder.end_column,
+        filename=dsl_holder.filename)
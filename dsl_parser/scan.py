@@ -13,6 +13,7 @@
 #    * See the License for the specific language governing permissions and
 #    * limitations under the License.
 
+from dsl_parser import deadline as _deadline
 
 NODE_TEMPLATE_SCOPE = 'node_template'
 NODE_TEMPLATE_RELATIONSHIP_SCOPE = 'node_template_relationship'
@@ -112,6 +113,7 @@ def scan_node_operation_properties(node_template, handler, replace=False):
 
 def scan_service_template(plan, handler, replace=False):
     for node_template in plan.node_templates:
+        _deadline.check()
         scan_properties(node_template['properties'],
                         handler,
                         scope=NODE_TEMPLATE_SCOPE,
@@ -14,7 +14,8 @@
 #    * limitations under the License.
 
 
-from dsl_parser import (functions,
+from dsl_parser import (deadline as _deadline,
+                        functions,
                         exceptions,
                         scan,
                         parser,
@@ -24,11 +25,13 @@ from dsl_parser import (functions,
 def parse_dsl(dsl_location,
               resources_base_url,
               resolver=None,
-              validate_version=True):
+              validate_version=True,
+              deadline=None):
     return parser.parse_from_url(dsl_url=dsl_location,
                                  resources_base_url=resources_base_url,
                                  resolver=resolver,
-                                 validate_version=validate_version)
+                                 validate_version=validate_version,
+                                 deadline=deadline)
 
 
 def _set_plan_inputs(plan, inputs=None):
@@ -57,14 +60,20 @@ def _process_functions(plan):
     scan.scan_service_template(plan, handler, replace=True)
 
 
-def prepare_deployment_plan(plan, inputs=None, **kwargs):
+def prepare_deployment_plan(plan, inputs=None, deadline=None, **kwargs):
     """
     Prepare a plan for deployment
+
+    ``deadline`` (a deadline.Deadline) is checked between the stages and
+    while the functions of each node template are processed.
     """
-    plan = multi_instance.create_deployment_plan(plan)
-    _set_plan_inputs(plan, inputs)
-    _process_functions(plan)
-    return plan
+    with _deadline.activated(deadline):
+        _deadline.check()
+        plan = multi_instance.create_deployment_plan(plan)
+        _deadline.check()
+        _set_plan_inputs(plan, inputs)
+        _process_functions(plan)
+        return plan
 
 
 def modify_deployment(nodes, previous_node_instances, modified_nodes):
@@ -0,0 +1,171 @@
+########
+# Copyright (c) 2014 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+import BaseHTTPServer
+import SocketServer
+import collections
+import hashlib
+import socket
+import sys
+import threading
+import time
+
+
+class _ThreadingHTTPServer(SocketServer.ThreadingMixIn,
+                           BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+    # concurrent connections beyond the listen backlog would be retried
+    # by the clients after a second
+    request_queue_size = 64
+
+    def handle_error(self, request, client_address):
+        # clients that gave up waiting (e.g. timed out) closed the connection
+        if not isinstance(sys.exc_info()[1], socket.error):
+            BaseHTTPServer.HTTPServer.handle_error(self, request,
+                                                   client_address)
+
+
+class ImportsServer(object):
+    """
+    Serves blueprint files from memory on a local port, delaying every
+    response by ``latency`` seconds and recording how many requests were
+    served concurrently, in total and per requested host, and the client
+    connections they were served on.
+
+    Files are served with an ETag when ``etag`` is set and with
+    ``last_modified`` as their Last-Modified header when it is given,
+    and conditional requests matching them are answered with 304.
+    While ``status`` is set, every request is answered with it.
+    HEAD requests are recorded in ``head_requests``, and answered with
+    405 unless ``head`` is set.
+    """
+
+    def __init__(self, files, latency=0.1, etag=False, last_modified=None,
+                 head=True):
+        self.files = files
+        self.latency = latency
+        self.etag = etag
+        self.last_modified = last_modified
+        self.head = head
+        self.status = None
+        self.not_modified = 0
+        self.requests = []
+        self.head_requests = []
+        self.connections = set()
+        self.max_in_flight = 0
+        self.max_in_flight_per_host = collections.defaultdict(int)
+        self._in_flight = collections.defaultdict(int)
+        self._sockets = []
+        self._lock = threading.Lock()
+        self._server = _ThreadingHTTPServer(('127.0.0.1', 0),
+                                            self._handler_class())
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        kwargs={'poll_interval': 0.01})
+        self._thread.daemon = True
+
+    def url(self, path, host='127.0.0.1'):
+        return 'http://{0}:{1}/{2}'.format(host, self.port, path)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+        # connections kept alive would otherwise wait for their next request
+        for sock in self._sockets:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except socket.error:
+                pass
+
+    def _serve(self, handler, head=False):
+        host = handler.headers.get('Host', '').split(':')[0]
+        with self._lock:
+            if head:
+                self.head_requests.append(handler.path)
+            else:
+                self.requests.append(handler.path)
+            self.connections.add(handler.client_address)
+            self._in_flight[host] += 1
+            self.max_in_flight = max(self.max_in_flight,
+                                     sum(self._in_flight.values()))
+            self.max_in_flight_per_host[host] = max(
+                self.max_in_flight_per_host[host], self._in_flight[host])
+        try:
+            time.sleep(self.latency)
+            content = self.files.get(handler.path.lstrip('/'))
+            if head and not self.head:
+                self._send(handler, 405)
+                return
+            if self.status is not None or content is None:
+                self._send(handler, self.status or 404)
+                return
+            headers = {}
+            if self.etag:
+                headers['ETag'] = '"{0}"'.format(
+                    hashlib.md5(content).hexdigest())
+            if self.last_modified:
+                headers['Last-Modified'] = self.last_modified
+            if headers and all(handler.headers.get(request_header) == value
+                               for request_header, value in [
+                                   ('If-None-Match', headers.get('ETag')),
+                                   ('If-Modified-Since',
+                                    headers.get('Last-Modified'))]
+                               if value):
+                with self._lock:
+                    self.not_modified += 1
+                self._send(handler, 304, headers=headers)
+                return
+            self._send(handler, 200, content, headers, head=head)
+        finally:
+            with self._lock:
+                self._in_flight[host] -= 1
+
+    @staticmethod
+    def _send(handler, status, content='', headers=None, head=False):
+        handler.send_response(status)
+        for header, value in (headers or {}).iteritems():
+            handler.send_header(header, value)
+        handler.send_header('Content-Length', str(len(content)))
+        handler.end_headers()
+        if not head:
+            handler.wfile.write(content)
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+            protocol_version = 'HTTP/1.1'
+
+            def setup(self):
+                BaseHTTPServer.BaseHTTPRequestHandler.setup(self)
+                with server._lock:
+                    server._sockets.append(self.connection)
+
+            def do_GET(self):
+                server._serve(self)
+
+            def do_HEAD(self):
+                server._serve(self, head=True)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
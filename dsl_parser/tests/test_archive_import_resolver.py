@@ -0,0 +1,231 @@
+########
+# Copyright (c) 2015 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+import os
+import shutil
+import StringIO
+import tarfile
+import tempfile
+import urllib
+import zipfile
+
+import testtools
+from mock import patch
+
+from dsl_parser import (constants,
+                        existence_cache)
+from dsl_parser.exceptions import DSLParsingLogicException
+from dsl_parser.import_resolver.archive_import_resolver import \
+    ArchiveImportResolver
+from dsl_parser.parser import (parse,
+                               parse_from_archive,
+                               parse_from_path)
+
+BLUEPRINT = """
+tosca_definitions_version: cloudify_dsl_1_0
+imports:
+    -   types/types.yaml
+plugins:
+    script:
+        executor: central_deployment_agent
+        install: false
+node_templates:
+    node:
+        type: type
+        interfaces:
+            test:
+                other: scripts/other.sh
+"""
+
+TYPES = """
+node_types:
+    type:
+        interfaces:
+            test:
+                op: scripts/op.sh
+"""
+
+
+class TestArchiveImportResolver(testtools.TestCase):
+
+    def setUp(self):
+        super(TestArchiveImportResolver, self).setUp()
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir)
+        self.files = {
+            'app/blueprint.yaml': BLUEPRINT,
+            'app/types/types.yaml': TYPES,
+            'app/scripts/op.sh': 'echo op',
+            'app/scripts/other.sh': 'echo other'
+        }
+
+    def _zip(self, files=None):
+        path = os.path.join(self.temp_dir, 'blueprint.zip')
+        with zipfile.ZipFile(path, 'w') as archive:
+            for name, content in sorted((files or self.files).items()):
+                archive.writestr(name, content)
+        return path
+
+    def _tar(self, files=None):
+        path = os.path.join(self.temp_dir, 'blueprint.tar.gz')
+        archive = tarfile.open(path, 'w:gz')
+        try:
+            for name, content in sorted((files or self.files).items()):
+                info = tarfile.TarInfo('./' + name)
+                info.size = len(content)
+                archive.addfile(info, StringIO.StringIO(content))
+        finally:
+            archive.close()
+        return path
+
+    def _assert_plan(self, plan):
+        node = plan[constants.NODES][0]
+        for operation in ['op', 'other']:
+            self.assertEqual(constants.SCRIPT_PLUGIN_RUN_TASK,
+                             node['operations'][operation]['operation'])
+        self.assertEqual('scripts/op.sh',
+                         node['operations']['op']['inputs']['script_path'])
+
+    def test_parse_zip_archive(self):
+        with patch.object(existence_cache, '_file_exists') as file_exists:
+            self._assert_plan(parse_from_archive(self._zip()))
+        self.assertFalse(file_exists.called)
+
+    def test_parse_tar_archive(self):
+        self._assert_plan(parse_from_archive(self._tar()))
+
+    def test_member_index(self):
+        with ArchiveImportResolver(self._tar()) as resolver:
+            self.assertEqual(sorted(self.files), resolver.members)
+            url = resolver.blueprint_url()
+            self.assertEqual(resolver.base_url + '/app/blueprint.yaml', url)
+            self.assertEqual(BLUEPRINT, resolver.fetch_import(url))
+            self.assertEqual(TYPES, resolver.fetch_import(
+                resolver.base_url + '/app/scripts/../types/types.yaml'))
+            ex = self.assertRaises(DSLParsingLogicException,
+                                   resolver.fetch_import,
+                                   resolver.base_url + '/app/missing.yaml')
+            self.assertEqual(13, ex.err_code)
+
+    def test_blueprint_location(self):
+        self.files['other/blueprint.yaml'] = BLUEPRINT
+        with ArchiveImportResolver(self._zip()) as resolver:
+            ex = self.assertRaises(DSLParsingLogicException,
+                                   resolver.blueprint_url)
+            self.assertEqual(30, ex.err_code)
+            self.assertIn('ambiguous', str(ex))
+            self.assertEqual(resolver.base_url + '/other/blueprint.yaml',
+                             resolver.blueprint_url('other/blueprint.yaml'))
+            ex = self.assertRaises(DSLParsingLogicException,
+                                   resolver.blueprint_url, 'missing.yaml')
+            self.assertIn('not found', str(ex))
+
+    def test_imports_outside_of_archive(self):
+        outside = os.path.join(self.temp_dir, 'outside.yaml')
+        with open(outside, 'w') as f:
+            f.write(TYPES)
+        self.files['app/blueprint.yaml'] = BLUEPRINT.replace(
+            'types/types.yaml', outside)
+        self._assert_plan(parse_from_archive(self._zip()))
+
+    def test_invalid_archive(self):
+        path = os.path.join(self.temp_dir, 'blueprint.yaml')
+        with open(path, 'w') as f:
+            f.write(BLUEPRINT)
+        ex = self.assertRaises(DSLParsingLogicException,
+                               ArchiveImportResolver, path)
+        self.assertEqual(30, ex.err_code)
+
+    def test_parse_from_path_with_resource_manifest(self):
+        # the scripts are only listed in the manifest
+        blueprint_dir = os.path.join(self.temp_dir, 'app')
+        os.makedirs(os.path.join(blueprint_dir, 'types'))
+        for name in ['blueprint.yaml', 'types/types.yaml']:
+            with open(os.path.join(blueprint_dir, name), 'w') as f:
+                f.write(self.files['app/' + name])
+        blueprint_path = os.path.join(blueprint_dir, 'blueprint.yaml')
+        self._assert_plan(parse_from_path(
+            blueprint_path,
+            resource_manifest=['blueprint.yaml',
+                               'types/types.yaml',
+                               'scripts/op.sh',
+                               './scripts/other.sh']))
+        ex = self.assertRaises(DSLParsingLogicException,
+                               parse_from_path, blueprint_path)
+        self.assertEqual(10, ex.err_code)
+
+    def test_parse_with_resource_manifest(self):
+        # the relative import of types.yaml is looked up in the manifest,
+        # which only lists the relationships at the top of the directory
+        files = {
+            'types/types.yaml': 'imports: [relationships.yaml]\n'
+                                'node_types: {type: {}}',
+            'types/relationships.yaml': 'relationships: {nested: {}}',
+            'relationships.yaml': 'relationships: {top: {}}'
+        }
+        blueprint_dir = os.path.join(self.temp_dir, 'app')
+        os.makedirs(os.path.join(blueprint_dir, 'types'))
+        for name, content in files.items():
+            with open(os.path.join(blueprint_dir, name), 'w') as f:
+                f.write(content)
+        dsl_string = """
+tosca_definitions_version: cloudify_dsl_1_2
+imports: [types/types.yaml]
+node_templates:
+    node:
+        type: type
+"""
+        resources_base_url = 'file:{0}/'.format(
+            urllib.pathname2url(blueprint_dir))
+        plan = parse(dsl_string,
+                     resources_base_url=resources_base_url,
+                     resource_manifest=['types/types.yaml',
+                                        'relationships.yaml'])
+        self.assertEqual(['top'], plan[constants.RELATIONSHIPS].keys())
+        plan = parse(dsl_string, resources_base_url=resources_base_url)
+        self.assertEqual(['nested'], plan[constants.RELATIONSHIPS].keys())
+
+    def test_types_are_parsed_again_when_scripts_change(self):
+        blueprint_path = os.path.join(self.temp_dir, 'blueprint.yaml')
+        with open(blueprint_path, 'w') as f:
+            f.write("""
+tosca_definitions_version: cloudify_dsl_1_0
+imports:
+    -   types.yaml
+node_templates:
+    node:
+        type: root
+""")
+        with open(os.path.join(self.temp_dir, 'types.yaml'), 'w') as f:
+            f.write("""
+plugins:
+    script:
+        executor: central_deployment_agent
+        install: false
+node_types:
+    root: {}
+relationships:
+    relationship:
+        source_interfaces:
+            test:
+                op: scripts/op.sh
+""")
+        manifest = ['blueprint.yaml', 'types.yaml', 'scripts/op.sh']
+        parse_from_path(blueprint_path, resource_manifest=manifest)
+        # the relationship type was parsed with scripts/op.sh
+        ex = self.assertRaises(DSLParsingLogicException,
+                               parse_from_path, blueprint_path)
+        self.assertEqual(19, ex.err_code)
+        parse_from_path(blueprint_path, resource_manifest=manifest)
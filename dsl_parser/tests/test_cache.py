@@ -0,0 +1,53 @@
+########
+# Copyright (c) 2015 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+import testtools
+
+from dsl_parser.cache import LRUCache
+
+
+class TestLRUCache(testtools.TestCase):
+
+    def test_get_put(self):
+        cache = LRUCache(max_size=2)
+        self.assertIsNone(cache.get('a'))
+        cache.put('a', 1)
+        self.assertEqual(1, cache.get('a'))
+        self.assertEqual({'size': 1, 'max_size': 2, 'hits': 1, 'misses': 1},
+                         cache.stats())
+
+    def test_least_recently_used_evicted(self):
+        cache = LRUCache(max_size=2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        cache.get('a')
+        cache.put('c', 3)
+        self.assertIn('a', cache)
+        self.assertNotIn('b', cache)
+        self.assertIn('c', cache)
+        self.assertEqual(2, len(cache))
+
+    def test_disabled(self):
+        cache = LRUCache(max_size=0)
+        cache.put('a', 1)
+        self.assertNotIn('a', cache)
+
+    def test_clear(self):
+        cache = LRUCache(max_size=2)
+        cache.put('a', 1)
+        cache.get('a')
+        cache.clear()
+        self.assertEqual({'size': 0, 'max_size': 2, 'hits': 0, 'misses': 0},
+                         cache.stats())
@@ -0,0 +1,185 @@
+########
+# Copyright (c) 2015 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+import os
+import shutil
+import stat
+import tempfile
+
+import testtools
+from mock import patch
+
+from dsl_parser import utils
+from dsl_parser.constants import (RESOLVER_IMPLEMENTATION_KEY,
+                                  RESLOVER_PARAMETERS_KEY)
+from dsl_parser.exceptions import DSLParsingLogicException
+from dsl_parser.import_resolver.abstract_import_resolver import \
+    create_session
+from dsl_parser.import_resolver.caching_import_resolver import (
+    CachingHTTPAdapter,
+    CachingImportResolver,
+    ImportsCache,
+    ImportsCacheDirectoryException)
+from dsl_parser.tests.imports_server import ImportsServer
+
+caching_resolver_class_path = '{0}:{1}'.format(
+    CachingImportResolver.__module__, CachingImportResolver.__name__)
+
+LAST_MODIFIED = 'Thu, 01 Jan 2015 00:00:00 GMT'
+
+
+class TestCachingImportResolver(testtools.TestCase):
+
+    def setUp(self):
+        super(TestCachingImportResolver, self).setUp()
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir)
+        self.files = {
+            'types.yaml': 'node_types: {a: {}}',
+            'plugin.yaml': 'plugins: {p: {}}',
+            'other.yaml': 'node_types: {b: {}}'
+        }
+
+    def _resolver(self, **parameters):
+        parameters.setdefault('cache_dir', self.cache_dir)
+        resolver = utils.create_import_resolver({
+            RESOLVER_IMPLEMENTATION_KEY: caching_resolver_class_path,
+            RESLOVER_PARAMETERS_KEY: parameters
+        })
+        self.addCleanup(resolver.close)
+        return resolver
+
+    def test_created_from_configuration(self):
+        resolver = self._resolver(
+            max_age=10,
+            resolver={RESLOVER_PARAMETERS_KEY: {
+                'rules': [{'http://a': 'http://b'}],
+                'max_concurrent_imports': 3}})
+        self.assertIsInstance(resolver, CachingImportResolver)
+        self.assertEqual([{'http://a': 'http://b'}], resolver.resolver.rules)
+        self.assertEqual(3, resolver.max_concurrent_imports)
+
+    def test_fresh_import_is_not_requested(self):
+        with ImportsServer(self.files, latency=0, etag=True) as server:
+            resolver = self._resolver(max_age=60)
+            for _ in range(3):
+                self.assertEqual(self.files['types.yaml'],
+                                 resolver.fetch_import(
+                                     server.url('types.yaml')))
+        self.assertEqual(['/types.yaml'], server.requests)
+
+    def test_revalidation_with_etag(self):
+        with ImportsServer(self.files, latency=0, etag=True) as server:
+            resolver = self._resolver(max_age=0)
+            url = server.url('types.yaml')
+            self.assertEqual(self.files['types.yaml'],
+                             resolver.fetch_import(url))
+            self.assertEqual(self.files['types.yaml'],
+                             resolver.fetch_import(url))
+            self.assertEqual(1, server.not_modified)
+            self.files['types.yaml'] = 'node_types: {changed: {}}'
+            self.assertEqual(self.files['types.yaml'],
+                             resolver.fetch_import(url))
+            self.assertEqual(1, server.not_modified)
+        self.assertEqual(3, len(server.requests))
+
+    def test_revalidation_with_last_modified(self):
+        with ImportsServer(self.files, latency=0,
+                           last_modified=LAST_MODIFIED) as server:
+            resolver = self._resolver(max_age=0)
+            url = server.url('types.yaml')
+            resolver.fetch_import(url)
+            self.assertEqual(self.files['types.yaml'],
+                             resolver.fetch_import(url))
+        self.assertEqual(1, server.not_modified)
+
+    def test_cache_is_persisted(self):
+        with ImportsServer(self.files, latency=0, etag=True) as server:
+            url = server.url('types.yaml')
+            self._resolver(max_age=60).fetch_import(url)
+            self.assertEqual(self.files['types.yaml'],
+                             self._resolver(max_age=60).fetch_import(url))
+            self.assertEqual(self.files['types.yaml'],
+                             self._resolver(max_age=0).fetch_import(url))
+        self.assertEqual(2, len(server.requests))
+        self.assertEqual(1, server.not_modified)
+
+    def test_stale_if_error(self):
+        with ImportsServer(self.files, latency=0, etag=True) as server:
+            url = server.url('types.yaml')
+            self._resolver().fetch_import(url)
+            server.status = 503
+            self.assertEqual(
+                self.files['types.yaml'],
+                self._resolver(max_age=0,
+                               stale_if_error=True).fetch_import(url))
+        # offline
+        self.assertEqual(
+            self.files['types.yaml'],
+            self._resolver(max_age=0, stale_if_error=True).fetch_import(url))
+        ex = self.assertRaises(DSLParsingLogicException,
+                               self._resolver(max_age=0).fetch_import, url)
+        self.assertEqual(13, ex.err_code)
+
+    def test_size_cap_evicts_least_recently_used(self):
+        max_size = len(self.files['types.yaml']) + \
+            len(self.files['other.yaml'])
+        with ImportsServer(self.files, latency=0) as server:
+            resolver = self._resolver(max_size=max_size, max_age=60)
+            resolver.fetch_import(server.url('types.yaml'))
+            resolver.fetch_import(server.url('plugin.yaml'))
+            resolver.fetch_import(server.url('types.yaml'))
+            resolver.fetch_import(server.url('other.yaml'))
+            cache = resolver.cache
+            self.assertIn(server.url('types.yaml'), cache)
+            self.assertNotIn(server.url('plugin.yaml'), cache)
+            self.assertIn(server.url('other.yaml'), cache)
+        self.assertEqual(4, len(os.listdir(self.cache_dir)))
+
+    def test_default_cache_dir_is_private(self):
+        with patch.dict(os.environ, {'XDG_CACHE_HOME': self.cache_dir}):
+            resolver = CachingImportResolver()
+            self.addCleanup(resolver.close)
+        directory = os.path.join(self.cache_dir, 'dsl_parser', 'imports')
+        self.assertEqual(directory, resolver.cache.directory)
+        self.assertEqual(0700, stat.S_IMODE(os.stat(directory).st_mode))
+
+    def test_cache_dir_of_other_users_is_refused(self):
+        os.chmod(self.cache_dir, 0777)
+        ex = self.assertRaises(ImportsCacheDirectoryException,
+                               ImportsCache, self.cache_dir)
+        self.assertIn('writable by other users', str(ex))
+        os.chmod(self.cache_dir, 0700)
+        with patch('os.getuid', return_value=os.getuid() + 1):
+            ex = self.assertRaises(ImportsCacheDirectoryException,
+                                   ImportsCache, self.cache_dir)
+        self.assertIn('owned by another user', str(ex))
+
+    def test_given_session_is_not_modified(self):
+        session = create_session()
+        self.addCleanup(session.close)
+        adapters = dict(session.adapters)
+        resolver = self._resolver(
+            resolver={RESLOVER_PARAMETERS_KEY: {'session': session}})
+        self.assertEqual(adapters, dict(session.adapters))
+        self.assertIsNot(session, resolver.session)
+        self.assertIs(resolver.session, resolver.resolver.session)
+        self.assertIsInstance(resolver.session.get_adapter('http://a'),
+                              CachingHTTPAdapter)
+        with ImportsServer(self.files, latency=0, etag=True) as server:
+            resolver.fetch_import(server.url('types.yaml'))
+            session.get(server.url('types.yaml'))
+        self.assertEqual(2, len(server.requests))
+        self.assertEqual(1, len(resolver.cache))
@@ -0,0 +1,166 @@
+########
+# Copyright (c) 2015 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+import time
+
+from mock import patch
+
+from dsl_parser import (exceptions,
+                        utils,
+                        yaml_loader)
+from dsl_parser.elements import imports
+from dsl_parser.import_resolver.default_import_resolver import \
+    DefaultImportResolver
+from dsl_parser.tests.abstract_test_parser import AbstractTestParser
+from dsl_parser.tests.imports_server import ImportsServer
+
+
+def _types(name):
+    return """
+node_types:
+    {0}: {{}}
+""".format(name)
+
+
+class TestConcurrentImports(AbstractTestParser):
+
+    def _sequential_resolver(self):
+        return DefaultImportResolver(max_concurrent_imports=1)
+
+    def _blueprint(self, import_urls):
+        return self.BASIC_VERSION_SECTION_DSL_1_0 + """
+node_types:
+    root: {}
+node_templates:
+    node:
+        type: root
+imports:
+""" + ''.join('    -   {0}\n'.format(url) for url in import_urls)
+
+    def _ordered_imports(self, blueprint, resolver):
+        ordered = imports._build_ordered_imports(
+            parsed_dsl_holder=utils.load_yaml(blueprint, 'error'),
+            dsl_location=None,
+            resources_base_url=None,
+            resolver=resolver)
+        return [(i['import'], i['parsed'].filename, i['parsed'].restore())
+                for i in ordered]
+
+    def test_same_graph_and_order_as_sequential(self):
+        files = {
+            'a.yaml': 'imports: [c.yaml, d.yaml]' + _types('a'),
+            'b.yaml': 'imports: [d.yaml, e.yaml]' + _types('b'),
+            'c.yaml': 'imports: [e.yaml]' + _types('c'),
+            'd.yaml': _types('d'),
+            'e.yaml': 'imports: [f.yaml]' + _types('e'),
+            'f.yaml': _types('f')
+        }
+        with ImportsServer(files, latency=0.01) as server:
+            blueprint = self._blueprint([server.url('a.yaml'),
+                                         server.url('b.yaml'),
+                                         server.url('f.yaml')])
+            sequential = self._ordered_imports(blueprint,
+                                               self._sequential_resolver())
+            concurrent = self._ordered_imports(blueprint,
+                                               DefaultImportResolver())
+            self.assertEqual(sequential, concurrent)
+            self.assertEqual(
+                self.parse(blueprint, resolver=self._sequential_resolver()),
+                self.parse(blueprint, resolver=DefaultImportResolver()))
+
+    def test_sibling_imports_are_fetched_concurrently(self):
+        files = dict(('{0}.yaml'.format(i), _types('t{0}'.format(i)))
+                     for i in range(6))
+        with ImportsServer(files, latency=0.3) as server:
+            blueprint = self._blueprint(server.url(name)
+                                        for name in sorted(files))
+            started = time.time()
+            self.parse(blueprint, resolver=DefaultImportResolver(
+                max_concurrent_imports=8,
+                max_concurrent_imports_per_host=3))
+            elapsed = time.time() - started
+        self.assertEqual(3, server.max_in_flight)
+        self.assertLess(elapsed, 6 * server.latency)
+
+    def test_sequential_resolver_fetches_one_at_a_time(self):
+        files = dict(('{0}.yaml'.format(i), _types('t{0}'.format(i)))
+                     for i in range(3))
+        with ImportsServer(files, latency=0.05) as server:
+            self.parse(self._blueprint(server.url(name)
+                                       for name in sorted(files)),
+                       resolver=self._sequential_resolver())
+        self.assertEqual(1, server.max_in_flight)
+
+    def test_per_host_limit(self):
+        files = dict(('{0}.yaml'.format(i), _types('t{0}'.format(i)))
+                     for i in range(8))
+        with ImportsServer(files, latency=0.3) as server:
+            hosts = ['127.0.0.1', 'localhost']
+            blueprint = self._blueprint(
+                server.url(name, host=hosts[i % 2])
+                for i, name in enumerate(sorted(files)))
+            self.parse(blueprint, resolver=DefaultImportResolver(
+                max_concurrent_imports=8,
+                max_concurrent_imports_per_host=2))
+        self.assertEqual({'127.0.0.1': 2, 'localhost': 2},
+                         dict(server.max_in_flight_per_host))
+        self.assertEqual(4, server.max_in_flight)
+
+    def test_failures_are_raised_in_traversal_order(self):
+        files = {}
+        with ImportsServer(files, latency=0.01) as server:
+            # missing.yaml is fetched first, but the traversal gets to
+            # missing_via_a.yaml before it
+            files['a.yaml'] = 'imports: [{0}]'.format(
+                server.url('missing_via_a.yaml')) + _types('a')
+            blueprint = self._blueprint([server.url('a.yaml'),
+                                         server.url('missing.yaml')])
+            ex = self.assertRaises(exceptions.DSLParsingLogicException,
+                                   self.parse, blueprint,
+                                   resolver=DefaultImportResolver())
+            self.assertEqual(13, ex.err_code)
+            self.assertIn('missing_via_a.yaml', str(ex))
+            self.assertIn('/missing.yaml', server.requests)
+
+    def test_imports_are_loaded_once(self):
+        files = {
+            'a.yaml': 'imports: [c.yaml]' + _types('a'),
+            'b.yaml': 'imports: [c.yaml]' + _types('b'),
+            'c.yaml': _types('c')
+        }
+        loaded = []
+        original_load = yaml_loader.load
+        original_load_header = yaml_loader.load_header
+
+        def recording_load(stream, filename, *args, **kwargs):
+            loaded.append(filename)
+            return original_load(stream, filename, *args, **kwargs)
+
+        def recording_load_header(stream, filename, *args, **kwargs):
+            loaded.append(filename)
+            return original_load_header(stream, filename, *args, **kwargs)
+        yaml_loader.holders_cache.clear()
+        with ImportsServer(files, latency=0) as server:
+            blueprint = self._blueprint([server.url('a.yaml'),
+                                         server.url('b.yaml')])
+            with patch.object(yaml_loader, 'load', recording_load):
+                with patch.object(yaml_loader, 'load_header',
+                                  recording_load_header):
+                    self.parse(blueprint, resolver=DefaultImportResolver())
+        self.assertEqual(sorted([None,
+                                 server.url('a.yaml'),
+                                 server.url('b.yaml'),
+                                 'c.yaml']),
+                         sorted(loaded))
@@ -0,0 +1,124 @@
+########
+# Copyright (c) 2015 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+import time
+
+import testtools
+
+from dsl_parser import (exceptions,
+                        parser,
+                        tasks)
+from dsl_parser.deadline import Deadline
+from dsl_parser.import_resolver.default_import_resolver import \
+    DefaultImportResolver
+from dsl_parser.tests.imports_server import ImportsServer
+
+BLUEPRINT = """
+tosca_definitions_version: cloudify_dsl_1_0
+imports:
+{0}
+node_types:
+    type:
+        properties:
+            prop: {{}}
+node_templates:
+    node:
+        type: type
+        properties:
+            prop: {{get_input: input}}
+inputs:
+    input: {{}}
+"""
+
+
+def _blueprint(*import_urls):
+    return BLUEPRINT.format(''.join('    -   {0}\n'.format(url)
+                                    for url in import_urls) or '    []')
+
+
+class TestDeadline(testtools.TestCase):
+
+    def _assert_deadline_exceeded(self, func, *args, **kwargs):
+        ex = self.assertRaises(exceptions.DSLParsingDeadlineException,
+                               func, *args, **kwargs)
+        self.assertEqual(exceptions.ERROR_CODE_DEADLINE_EXCEEDED, ex.err_code)
+        return ex
+
+    def test_deadline(self):
+        deadline = Deadline(0.2)
+        self.assertFalse(deadline.expired())
+        self.assertEqual(0.1, deadline.request_timeout(0.1))
+        self.assertLessEqual(deadline.request_timeout(10), 0.2)
+        time.sleep(0.2)
+        self.assertTrue(deadline.expired())
+        self.assertEqual(0, deadline.remaining())
+        ex = self._assert_deadline_exceeded(deadline.check)
+        self.assertIn('exceeded its deadline of 0.2 seconds', str(ex))
+
+        deadline = Deadline()
+        self.assertIsNone(deadline.remaining())
+        self.assertEqual(10, deadline.request_timeout(10))
+        deadline.cancel()
+        ex = self._assert_deadline_exceeded(deadline.check)
+        self.assertIn('cancelled', str(ex))
+
+    def test_slow_import(self):
+        files = {'types.yaml': 'node_types: {other: {}}'}
+        with ImportsServer(files, latency=3) as server:
+            started = time.time()
+            self._assert_deadline_exceeded(
+                parser.parse, _blueprint(server.url('types.yaml')),
+                resolver=DefaultImportResolver(),
+                deadline=Deadline(0.3))
+        self.assertLess(time.time() - started, 1)
+
+    def test_retries_stop_at_deadline(self):
+        files = {'types.yaml': 'node_types: {other: {}}'}
+        with ImportsServer(files, latency=0.1) as server:
+            server.status = 500
+            started = time.time()
+            self._assert_deadline_exceeded(
+                parser.parse, _blueprint(server.url('types.yaml')),
+                resolver=DefaultImportResolver(max_concurrent_imports=1),
+                deadline=Deadline(0.35))
+        self.assertLess(time.time() - started, 1)
+        self.assertLess(len(server.requests), 5)
+
+    def test_slow_blueprint_url(self):
+        with ImportsServer({'blueprint.yaml': _blueprint()},
+                           latency=3) as server:
+            started = time.time()
+            self._assert_deadline_exceeded(
+                parser.parse_from_url, server.url('blueprint.yaml'),
+                deadline=Deadline(0.3))
+        self.assertLess(time.time() - started, 1)
+
+    def test_cancelled_parse(self):
+        deadline = Deadline()
+        deadline.cancel()
+        self._assert_deadline_exceeded(parser.parse, _blueprint(),
+                                       deadline=deadline)
+
+    def test_parse_within_deadline(self):
+        deadline = Deadline(60)
+        plan = parser.parse(_blueprint(), deadline=deadline)
+        plan = tasks.prepare_deployment_plan(plan, inputs={'input': 1},
+                                             deadline=deadline)
+        self.assertEqual(1, plan['nodes'][0]['properties']['prop'])
+        deadline.cancel()
+        self._assert_deadline_exceeded(tasks.prepare_deployment_plan,
+                                       parser.parse(_blueprint()),
+                                       inputs={'input': 1},
+                                       deadline=deadline)
@@ -13,16 +13,22 @@
 #    * See the License for the specific language governing permissions and
 #    * limitations under the License.
 
+import time
+
 import mock
 import requests
 
 import testtools
 
+from dsl_parser import utils
+from dsl_parser.constants import RESLOVER_PARAMETERS_KEY
 from dsl_parser.exceptions import DSLParsingLogicException
+from dsl_parser.import_resolver import default_import_resolver
 from dsl_parser.import_resolver.default_import_resolver import \
     DefaultImportResolver, DefaultResolverValidationException
 from dsl_parser.import_resolver.abstract_import_resolver import \
-    MAX_NUMBER_RETRIES
+    MAX_NUMBER_RETRIES, create_session
+from dsl_parser.tests.imports_server import ImportsServer
 
 ORIGINAL_V1_URL = 'http://www.original_v1.org/cloudify/types.yaml'
 ORIGINAL_V1_PREFIX = 'http://www.original_v1.org'
@@ -48,6 +54,11 @@ RETRY_DELAY = 0
 
 class TestDefaultResolver(testtools.TestCase):
 
+    def setUp(self):
+        super(TestDefaultResolver, self).setUp()
+        # failures of the mirrors of previous tests
+        default_import_resolver.mirror_failures.clear()
+
     def test_several_matching_rules(self):
         rules = [
             {'some_other_prefix': VALID_V2_PREFIX},
@@ -214,7 +225,7 @@ class TestDefaultResolver(testtools.TestCase):
                         return None
 
         resolver = DefaultImportResolver(rules=rules)
-        with mock.patch('requests.get', new=mock_requests_get,
+        with mock.patch('requests.Session.get', new=mock_requests_get,
                         create=True):
             with mock.patch(
                     'dsl_parser.import_resolver.abstract_import_resolver.'
@@ -244,6 +255,147 @@ class TestDefaultResolver(testtools.TestCase):
             self.assertEqual(MAX_NUMBER_RETRIES + 1, len(number_of_attempts))
 
 
+class TestDefaultResolverSession(testtools.TestCase):
+
+    def test_connections_are_reused(self):
+        files = dict(('{0}.yaml'.format(i), 'key: {0}'.format(i))
+                     for i in range(5))
+        with ImportsServer(files, latency=0) as server:
+            with DefaultImportResolver(
+                    rules=[{'http://mirror': server.url('')[:-1]}]) \
+                    as resolver:
+                for name in sorted(files):
+                    self.assertEqual(files[name], resolver.fetch_import(
+                        'http://mirror/{0}'.format(name)))
+        self.assertEqual(5, len(server.requests))
+        self.assertEqual(1, len(server.connections))
+
+    def test_pool_sizes(self):
+        resolver = DefaultImportResolver(pool_connections=3, pool_maxsize=7)
+        adapter = resolver.session.get_adapter('https://host')
+        self.assertEqual(3, adapter._pool_connections)
+        self.assertEqual(7, adapter._pool_maxsize)
+
+    def test_close(self):
+        resolver = DefaultImportResolver()
+        session = resolver.session
+        self.assertIs(session, resolver.session)
+        with mock.patch.object(session, 'close') as close:
+            resolver.close()
+        close.assert_called_once_with()
+        self.assertIsNot(session, resolver.session)
+
+    def test_injected_session(self):
+        session = create_session()
+        resolver = utils.create_import_resolver({
+            RESLOVER_PARAMETERS_KEY: {'session': session}
+        })
+        self.assertIs(session, resolver.session)
+        with mock.patch.object(session, 'close') as close:
+            resolver.close()
+        self.assertFalse(close.called)
+
+
+class TestDefaultResolverMirrors(testtools.TestCase):
+
+    def setUp(self):
+        super(TestDefaultResolverMirrors, self).setUp()
+        self.files = {'types.yaml': 'node_types: {}',
+                      'plugin.yaml': 'plugins: {}'}
+        self.mirror = ImportsServer(self.files, latency=0)
+        self.origin = ImportsServer(self.files, latency=0)
+        for server in [self.mirror, self.origin]:
+            server.__enter__()
+            self.addCleanup(server.__exit__)
+        self.failures = default_import_resolver.MirrorFailures(ttl=60)
+
+    def _resolver(self):
+        resolver = DefaultImportResolver(rules=[self.rule],
+                                         failures=self.failures)
+        self.addCleanup(resolver.close)
+        return resolver
+
+    @property
+    def rule(self):
+        # the origin is mirrored by the mirror
+        return {self.origin.url('')[:-1]: self.mirror.url('')[:-1]}
+
+    def test_rules_trie(self):
+        trie = default_import_resolver._RulesTrie([
+            {'http://a/b': 'x'},
+            {'http://c': 'y'},
+            {'http://a': 'z'},
+            {'http://a/b': 'w'},
+            {'': 'v'}
+        ])
+        self.assertEqual([('http://a/b', 'x'),
+                          ('http://a', 'z'),
+                          ('http://a/b', 'w'),
+                          ('', 'v')],
+                         trie.matches('http://a/b/c'))
+        self.assertEqual([('', 'v')], trie.matches('http://b'))
+        self.assertEqual([], default_import_resolver._RulesTrie(
+            []).matches('http://a'))
+
+    def test_failed_mirror_host_is_skipped(self):
+        rule = self.rule.items()[0]
+        self.mirror.status = 503
+        resolver = self._resolver()
+        self.assertEqual(self.files['types.yaml'],
+                         resolver.resolve(self.origin.url('types.yaml')))
+        self.assertEqual(MAX_NUMBER_RETRIES + 1, len(self.mirror.requests))
+        # another resolver skips the failed mirror host for other urls
+        other_resolver = self._resolver()
+        self.assertEqual(self.files['plugin.yaml'],
+                         other_resolver.resolve(
+                             self.origin.url('plugin.yaml')))
+        self.assertEqual(MAX_NUMBER_RETRIES + 1, len(self.mirror.requests))
+        self.assertEqual(['/types.yaml', '/plugin.yaml'],
+                         self.origin.requests)
+        self.assertEqual({rule: 1}, dict(resolver.stats.failures))
+        self.assertEqual({None: 1}, dict(resolver.stats.hits))
+        self.assertEqual({rule: 1}, dict(other_resolver.stats.skipped))
+        self.assertEqual({None: 1}, dict(other_resolver.stats.hits))
+
+    def test_failed_mirror_is_tried_again_after_ttl(self):
+        self.failures.ttl = 0.5
+        self.mirror.status = 503
+        self.origin.status = 503
+        self.assertRaises(DSLParsingLogicException,
+                          self._resolver().resolve,
+                          self.origin.url('types.yaml'))
+        ex = self.assertRaises(DSLParsingLogicException,
+                               self._resolver().resolve,
+                               self.origin.url('plugin.yaml'))
+        self.assertIn("Skipped, host '127.0.0.1:{0}' failed".format(
+            self.mirror.port), str(ex))
+        self.mirror.status = None
+        time.sleep(0.5)
+        resolver = self._resolver()
+        self.assertEqual(self.files['types.yaml'],
+                         resolver.resolve(self.origin.url('types.yaml')))
+        self.assertEqual({self.rule.items()[0]: 1},
+                         dict(resolver.stats.hits))
+
+    def test_missing_file_does_not_skip_mirror_host(self):
+        rule = self.rule.items()[0]
+        self.files['origin_only.yaml'] = 'node_types: {}'
+        self.mirror.files = dict(self.files)
+        del self.mirror.files['origin_only.yaml']
+        resolver = self._resolver()
+        for _ in range(2):
+            self.assertEqual(self.files['origin_only.yaml'],
+                             resolver.resolve(
+                                 self.origin.url('origin_only.yaml')))
+        self.assertEqual(self.files['types.yaml'],
+                         resolver.resolve(self.origin.url('types.yaml')))
+        self.assertEqual(['/origin_only.yaml', '/types.yaml'],
+                         self.mirror.requests)
+        self.assertEqual({rule: 1, None: 2}, dict(resolver.stats.hits))
+        self.assertEqual({rule: 1}, dict(resolver.stats.failures))
+        self.assertEqual({rule: 1}, dict(resolver.stats.skipped))
+
+
 class TestDefaultResolverValidations(testtools.TestCase):
 
     def test_illegal_default_resolver_rules_type(self):
@@ -287,6 +439,14 @@ class TestDefaultResolverValidations(testtools.TestCase):
                 'pair but the rule {0} has 2 keys'
                 .format(rules), str(ex))
 
+    def test_illegal_default_resolver_concurrency(self):
+        for params in [{'max_concurrent_imports': 0},
+                       {'max_concurrent_imports_per_host': '2'}]:
+            ex = self.assertRaises(DefaultResolverValidationException,
+                                   DefaultImportResolver, **params)
+            self.assertIn('The `{0}` parameter must be a positive integer'
+                          .format(params.keys()[0]), str(ex))
+
     def test_illegal_default_resolver_parameters(self):
         # illegal initialization of the default resolver
         params = {
@@ -0,0 +1,162 @@
+########
+# Copyright (c) 2015 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+import os
+import shutil
+import tempfile
+import time
+import urllib
+
+import testtools
+
+from dsl_parser import constants
+from dsl_parser.existence_cache import ExistenceCache
+from dsl_parser.import_resolver.default_import_resolver import \
+    DefaultImportResolver
+from dsl_parser.parser import parse_from_url
+from dsl_parser.tests.imports_server import ImportsServer
+
+BLUEPRINT = """
+tosca_definitions_version: cloudify_dsl_1_0
+imports:
+    -   types.yaml
+plugins:
+    script:
+        executor: central_deployment_agent
+        install: false
+node_templates:
+    a:
+        type: type
+    b:
+        type: type
+    c:
+        type: type
+"""
+
+TYPES = """
+node_types:
+    type:
+        interfaces:
+            test:
+                op: scripts/op.sh
+"""
+
+
+class TestExistenceCache(testtools.TestCase):
+
+    def setUp(self):
+        super(TestExistenceCache, self).setUp()
+        self.files = {
+            'blueprint.yaml': BLUEPRINT,
+            'types.yaml': TYPES,
+            'scripts/op.sh': 'echo'
+        }
+
+    def _parse(self, server, **kwargs):
+        with DefaultImportResolver() as resolver:
+            return parse_from_url(server.url('blueprint.yaml'),
+                                  resolver=resolver, **kwargs)
+
+    def _assert_script_operations(self, plan):
+        for node in plan[constants.NODES]:
+            self.assertEqual(constants.SCRIPT_PLUGIN_RUN_TASK,
+                             node['operations']['op']['operation'])
+
+    def test_file_urls_are_checked_with_stat(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'op.sh')
+        with open(path, 'w') as f:
+            f.write('echo')
+        cache = ExistenceCache()
+        self.assertTrue(cache.exists(
+            'file:' + urllib.pathname2url(path)))
+        self.assertFalse(cache.exists(
+            'file:' + urllib.pathname2url(path + '.missing')))
+        self.assertFalse(cache.exists(
+            'file:' + urllib.pathname2url(directory)))
+        self.assertIsNone(cache.content('file:' + urllib.pathname2url(path)))
+
+    def test_each_url_is_checked_once_per_parse(self):
+        with ImportsServer(self.files, latency=0) as server:
+            self._assert_script_operations(self._parse(server))
+            # nodes a, b and c share the operation of their type
+            self.assertEqual(['/types.yaml', '/scripts/op.sh'],
+                             server.head_requests)
+            self.assertEqual(['/types.yaml'],
+                             [r for r in server.requests
+                              if r != '/blueprint.yaml'])
+            self._parse(server)
+        self.assertEqual(4, len(server.head_requests))
+
+    def test_content_of_get_check_is_reused(self):
+        with ImportsServer(self.files, latency=0, head=False) as server:
+            self._assert_script_operations(self._parse(server))
+        self.assertEqual(['/types.yaml', '/scripts/op.sh'],
+                         server.head_requests)
+        # types.yaml was downloaded by its check and is not fetched again
+        self.assertEqual(['/blueprint.yaml', '/types.yaml',
+                          '/scripts/op.sh'],
+                         server.requests)
+
+    def test_content_is_not_reused_for_mapped_urls(self):
+        with ImportsServer(self.files, latency=0, head=False) as server:
+            cache = ExistenceCache()
+            url = server.url('types.yaml')
+            self.assertTrue(cache.exists(url))
+            resolver = DefaultImportResolver(
+                rules=[{server.url(''): server.url('')}])
+            self.assertFalse(resolver.reads_as_is(url))
+            self.assertTrue(DefaultImportResolver().reads_as_is(url))
+            self.assertEqual(TYPES, cache.content(url))
+            self.assertIsNone(cache.content(url))
+
+    def test_cache_shared_between_parses(self):
+        cache = ExistenceCache(ttl=60)
+        with ImportsServer(self.files, latency=0) as server:
+            self._parse(server, existence_cache=cache)
+            self._parse(server, existence_cache=cache)
+            self.assertEqual(['/types.yaml', '/scripts/op.sh'],
+                             server.head_requests)
+            cache.ttl = 0.05
+            time.sleep(0.1)
+            self._parse(server, existence_cache=cache)
+        self.assertEqual(4, len(server.head_requests))
+
+    def test_missing_urls(self):
+        with ImportsServer(self.files, latency=0) as server:
+            cache = ExistenceCache()
+            self.assertFalse(cache.exists(server.url('missing.yaml')))
+            server.status = 500
+            self.assertFalse(cache.exists(server.url('other.yaml')))
+        self.assertFalse(cache.exists(server.url('types.yaml')))
+
+    def test_failed_checks_are_not_remembered(self):
+        cache = ExistenceCache()
+        with ImportsServer(self.files, latency=0) as server:
+            url = server.url('types.yaml')
+            server.status = 500
+            self.assertFalse(cache.exists(url))
+            self.assertNotIn(url, cache)
+            server.status = None
+            self.assertTrue(cache.exists(url))
+            self.assertIn(url, cache)
+            missing_url = server.url('missing.yaml')
+            self.assertFalse(cache.exists(missing_url))
+            self.assertIn(missing_url, cache)
+        # the server is gone
+        other_url = server.url('scripts/op.sh')
+        self.assertFalse(cache.exists(other_url))
+        self.assertNotIn(other_url, cache)
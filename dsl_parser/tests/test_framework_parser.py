@@ -15,7 +15,8 @@
 
 import testtools
 
-from dsl_parser import exceptions
+from dsl_parser import (exceptions,
+                        holder)
 
 from dsl_parser.framework import (parser,
                                   elements,
@@ -313,3 +314,358 @@ class TestSchemaValidation(testtools.TestCase):
             {'child': 'value'},
             TestElement,
             error_code=exceptions.ERROR_CODE_ILLEGAL_VALUE_ACCESS)
+
+
+class TestElementInitialValue(testtools.TestCase):
+
+    def test_initial_value_restored_once(self):
+        class TestLeaf(elements.Element):
+            schema = elements.Leaf(type=str)
+
+        class TestChild(elements.Element):
+            schema = {
+                'leaf': TestLeaf
+            }
+
+        class TestElement(elements.Element):
+            schema = {
+                'child': TestChild
+            }
+
+        value = holder.Holder.of({'child': {'leaf': 'value'}})
+        context = parser.Context(value=value,
+                                 element_cls=TestElement,
+                                 element_name='root',
+                                 inputs=None)
+        root = context.element_type_to_elements[TestElement][0]
+        child = context.element_type_to_elements[TestChild][0]
+        self.assertIs(root._initial_value['child'], child._initial_value)
+        self.assertEqual({'leaf': 'value'}, child.initial_value)
+        self.assertIs(child._initial_value, child.initial_value)
+
+
+class TestElementTree(testtools.TestCase):
+
+    def test_tree_navigation(self):
+        class TestLeaf(elements.Element):
+            schema = elements.Leaf(type=str)
+
+        class TestChild(elements.Element):
+            schema = elements.List(type=TestLeaf)
+
+        class TestElement(elements.Element):
+            schema = {
+                'child': TestChild
+            }
+
+        value = holder.Holder.of({'child': ['a', 'b', 'c']})
+        context = parser.Context(value=value,
+                                 element_cls=TestElement,
+                                 element_name='root',
+                                 inputs=None)
+        root = context.element_type_to_elements[TestElement][0]
+        child = context.element_type_to_elements[TestChild][0]
+        leaves = context.element_type_to_elements[TestLeaf]
+        self.assertEqual([child], list(context.child_elements_iter(root)))
+        self.assertEqual(leaves, list(context.child_elements_iter(child)))
+        self.assertEqual(['a', 'b', 'c'],
+                         [leaf.initial_value for leaf in leaves])
+        self.assertEqual([child, root], list(context.ancestors_iter(
+            leaves[0])))
+        self.assertEqual([], list(context.ancestors_iter(root)))
+        self.assertEqual([child] + leaves, context.descendants(root))
+
+    def test_topological_sort_orders_children_before_parents(self):
+        class TestLeaf(elements.Element):
+            schema = elements.Leaf(type=str)
+
+        class TestElement(elements.Element):
+            schema = {
+                'first': TestLeaf,
+                'second': TestLeaf
+            }
+            requires = {
+                TestLeaf: []
+            }
+
+        value = holder.Holder.of({'first': '1', 'second': '2'})
+        context = parser.Context(value=value,
+                                 element_cls=TestElement,
+                                 element_name='root',
+                                 inputs=None)
+        ordered = context.elements_graph_topological_sort()
+        root = context.element_type_to_elements[TestElement][0]
+        self.assertEqual(3, len(ordered))
+        self.assertIs(root, ordered[-1])
+
+
+class TestKeyedRequirements(testtools.TestCase):
+
+    def _parse(self, value, source_requirement):
+        class Target(elements.Element):
+            schema = elements.Leaf(type=str)
+
+            def parse(self):
+                return self.name
+
+        class Targets(elements.DictElement):
+            schema = elements.Dict(type=Target)
+
+        class Source(elements.Element):
+            schema = elements.Leaf(type=(str, list))
+            requires = {
+                Target: [source_requirement]
+            }
+
+            def parse(self, targets):
+                return targets
+
+        class Sources(elements.DictElement):
+            schema = elements.Dict(type=Source)
+
+        class TestElement(elements.DictElement):
+            schema = {
+                'targets': Targets,
+                'sources': Sources
+            }
+
+        return parser.parse(value, element_cls=TestElement)['sources']
+
+    def test_keyed_requirement(self):
+        value = {
+            'targets': {'t1': '', 't2': '', 't3': ''},
+            'sources': {'s1': 't2', 's2': 't4'}
+        }
+        requirement = requirements.Value(
+            'targets',
+            multiple_results=True,
+            source_keys=lambda source: [source.initial_value],
+            target_key=requirements.element_name_key)
+        self.assertEqual({'s1': ['t2'], 's2': []},
+                         self._parse(value, requirement))
+
+    def test_keyed_requirement_multiple_keys(self):
+        value = {
+            'targets': {'t1': '', 't2': '', 't3': ''},
+            'sources': {'s1': ['t3', 't1', 't3']}
+        }
+        requirement = requirements.Value(
+            'targets',
+            multiple_results=True,
+            source_keys=lambda source: source.initial_value,
+            target_key=requirements.element_name_key)
+        result = self._parse(value, requirement)['s1']
+        self.assertEqual(['t1', 't3'], sorted(result))
+        self.assertEqual(2, len(result))
+
+    def test_keyed_requirement_with_predicate(self):
+        value = {
+            'targets': {'t1': '', 't2': ''},
+            'sources': {'s1': ['t1', 't2']}
+        }
+        requirement = requirements.Value(
+            'targets',
+            multiple_results=True,
+            predicate=lambda source, target: target.name != 't1',
+            source_keys=lambda source: source.initial_value,
+            target_key=requirements.element_name_key)
+        self.assertEqual({'s1': ['t2']}, self._parse(value, requirement))
+
+    def test_unhashable_source_key(self):
+        value = {
+            'targets': {'t1': ''},
+            'sources': {'s1': [['t1']]}
+        }
+        requirement = requirements.Value(
+            'targets',
+            multiple_results=True,
+            source_keys=lambda source: source.initial_value,
+            target_key=requirements.element_name_key)
+        self.assertEqual({'s1': []}, self._parse(value, requirement))
+
+    def test_source_keys_require_target_key(self):
+        self.assertRaises(ValueError,
+                          requirements.Requirement,
+                          'name',
+                          source_keys=lambda source: [])
+
+
+class TestSchemaPlan(testtools.TestCase):
+
+    def test_plan_cached(self):
+        class TestLeaf(elements.Element):
+            schema = elements.Leaf(type=str)
+
+        class TestElement(elements.Element):
+            schema = {
+                'leaf': TestLeaf
+            }
+
+        validator = parser.SchemaAPIValidator()
+        plan = validator.plan(TestElement)
+        self.assertIs(plan, validator.plan(TestElement))
+        self.assertEqual([(parser._TRAVERSE_DICT_SCHEMA,
+                           [('leaf', TestLeaf)])], plan.traversal)
+        self.assertEqual([], validator.plan(TestLeaf).traversal)
+        self.assertEqual([(False, None, False, str)],
+                         validator.plan(TestLeaf).validations)
+
+    def test_plan_recompiled_on_schema_change(self):
+        class TestElement(elements.Element):
+            schema = elements.Leaf(type=str)
+
+        validator = parser.SchemaAPIValidator()
+        plan = validator.plan(TestElement)
+        TestElement.schema = elements.Leaf(type=int)
+        new_plan = validator.plan(TestElement)
+        self.assertIsNot(plan, new_plan)
+        self.assertEqual([(False, None, False, int)], new_plan.validations)
+        TestElement.schema = 1
+        self.assertRaises(exceptions.DSLParsingSchemaAPIException,
+                          validator.plan, TestElement)
+
+    def test_list_schema_plan(self):
+        class TestLeaf(elements.Element):
+            schema = elements.Leaf(type=str)
+
+        class TestElement(elements.Element):
+            schema = [
+                elements.Leaf(type=str),
+                elements.List(type=TestLeaf),
+                elements.Dict(type=TestLeaf)
+            ]
+
+        plan = parser.SchemaAPIValidator().plan(TestElement)
+        self.assertEqual([(parser._TRAVERSE_LIST, TestLeaf),
+                          (parser._TRAVERSE_DICT, TestLeaf)],
+                         plan.traversal)
+        self.assertEqual([(False, None, False, str),
+                          (False, None, True, None),
+                          (True, None, False, None)],
+                         plan.validations)
+
+
+class TestSharedValues(testtools.TestCase):
+
+    def setUp(self):
+        super(TestSharedValues, self).setUp()
+        self.addCleanup(setattr, elements, 'debug_shared_values',
+                        elements.debug_shared_values)
+
+    def _parse(self, modify):
+        class TestLeaf(elements.Element):
+            schema = elements.Leaf(type=list)
+
+        class TestChild(elements.Element):
+            schema = elements.Leaf(type=str)
+            requires = {
+                TestLeaf: [requirements.Value('leaf')]
+            }
+
+            def parse(self, leaf):
+                if modify:
+                    leaf.append(self.initial_value)
+                return leaf
+
+        class TestElement(elements.DictElement):
+            schema = {
+                'leaf': TestLeaf,
+                'child': TestChild
+            }
+
+        return parser.parse({'leaf': ['a'], 'child': 'b'},
+                            element_cls=TestElement)
+
+    def test_values_are_not_copied(self):
+        elements.debug_shared_values = False
+        self.assertEqual({'leaf': ['a'], 'child': ['a']}, self._parse(False))
+
+    def test_result_does_not_share_values(self):
+        elements.debug_shared_values = False
+        result = self._parse(False)
+        self.assertIsNot(result['leaf'], result['child'])
+
+    def test_modification_detected_in_debug_mode(self):
+        elements.debug_shared_values = True
+        ex = self.assertRaises(exceptions.DSLParsingSchemaAPIException,
+                               self._parse, True)
+        self.assertEqual(exceptions.ERROR_CODE_SHARED_VALUE_MODIFIED,
+                         ex.err_code)
+        self.assertIn("'leaf' was modified while processing 'child'",
+                      str(ex))
+        self.assertEqual({'leaf': ['a'], 'child': ['a']}, self._parse(False))
+
+    def test_copy_value(self):
+        shared = {'a': [1]}
+        value = holder.Holder.of('holder')
+        result = elements.copy_value({'x': shared, 'y': shared,
+                                      'z': set([1]), 'h': value})
+        self.assertEqual({'x': shared, 'y': shared, 'z': set([1]),
+                          'h': value}, result)
+        self.assertIsNot(result['x'], result['y'])
+        self.assertIsNot(result['x']['a'], result['y']['a'])
+        self.assertIs(value, result['h'])
+
+
+class TestPrelinked(testtools.TestCase):
+
+    def test_prelinked_elements_are_not_processed(self):
+        parsed = []
+
+        class TestLeaf(elements.Element):
+            schema = elements.Leaf(type=str)
+
+            def parse(self):
+                parsed.append(self.name)
+                return self.initial_value.upper()
+
+        class TestType(elements.Element):
+            schema = {
+                'leaf': TestLeaf
+            }
+            provides = ['leaf']
+
+            def parse(self):
+                parsed.append(self.name)
+                return self.child(TestLeaf).value
+
+            def calculate_provided(self):
+                return {'leaf': self.value}
+
+        class TestTypes(elements.DictElement):
+            schema = elements.Dict(type=TestType)
+
+        class TestUser(elements.Element):
+            schema = elements.Leaf(type=str)
+            requires = {
+                TestType: [requirements.Requirement(
+                    'leaf',
+                    source_keys=lambda source: [source.initial_value],
+                    target_key=requirements.element_name_key)]
+            }
+
+            def parse(self, leaf):
+                return leaf
+
+        class TestElement(elements.DictElement):
+            schema = {
+                'types': TestTypes,
+                'user': TestUser
+            }
+
+        value = {
+            'types': {'a': {'leaf': 'x'},
+                      'b': {'leaf': 'y'}},
+            'user': 'a'
+        }
+        prelinked = {
+            'types': {'a': parser.Prelinked(value='PRELINKED',
+                                            provided={'leaf': 'PROVIDED'})}
+        }
+        result = parser.parse(value, element_cls=TestElement,
+                              prelinked=prelinked)
+        self.assertEqual({'types': {'a': 'PRELINKED', 'b': 'Y'},
+                          'user': 'PROVIDED'}, result)
+        self.assertEqual(['leaf', 'b'], parsed)
+        self.assertEqual({'types': {'a': 'X', 'b': 'Y'}, 'user': 'X'},
+                         parser.parse(value, element_cls=TestElement))
@@ -0,0 +1,147 @@
+########
+# Copyright (c) 2015 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+import copy
+
+import testtools
+
+from dsl_parser import yaml_loader
+from dsl_parser.holder import Holder
+
+
+class TestHolder(testtools.TestCase):
+
+    def _assert_marks(self, holder, start_line, start_column,
+                      end_line, end_column):
+        self.assertEqual((start_line, start_column, end_line, end_column),
+                         (holder.start_line, holder.start_column,
+                          holder.end_line, holder.end_column))
+
+    def test_marks(self):
+        holder = Holder('value', 1, 2, 3, 4, filename='file.yaml')
+        self._assert_marks(holder, 1, 2, 3, 4)
+        self.assertEqual('value<1.2-3.4 [file.yaml]>', str(holder))
+
+    def test_no_marks(self):
+        self._assert_marks(Holder('value'), None, None, None, None)
+
+    def test_large_marks(self):
+        holder = Holder('value', 2 ** 40, 2 ** 33, 0, 0)
+        self._assert_marks(holder, 2 ** 40, 2 ** 33, 0, 0)
+
+    def test_set_marks(self):
+        holder = Holder('value', 1, 2, 3, 4)
+        holder.start_line = 10
+        holder.end_column = 40
+        self._assert_marks(holder, 10, 2, 3, 40)
+
+    def test_no_instance_dict(self):
+        self.assertFalse(hasattr(Holder('value'), '__dict__'))
+
+    def test_copy(self):
+        holder = Holder({}, 1, 2, 3, 4, filename='file.yaml')
+        holder_copy = holder.copy()
+        self.assertIs(holder.value, holder_copy.value)
+        self.assertEqual(str(holder), str(holder_copy))
+        holder_copy.start_line = 5
+        self.assertEqual(1, holder.start_line)
+
+    def test_deepcopy(self):
+        holder = Holder.of({'key': ['value']}, filename='file.yaml')
+        holder.start_line = 1
+        holder_copy = copy.deepcopy(holder)
+        self.assertEqual({'key': ['value']}, holder_copy.restore())
+        self.assertEqual(1, holder_copy.start_line)
+
+    def test_of(self):
+        holder = Holder.of({'key': ['value']}, filename='file.yaml')
+        self.assertEqual({'key': ['value']}, holder.restore())
+        key_holder, value_holder = holder.get_item('key')
+        self.assertEqual('file.yaml', value_holder.value[0].filename)
+
+    def test_filenames_shared_per_document(self):
+        filename = ''.join(['file', '.yaml'])
+        result = yaml_loader.load('key: [value]', filename)
+        key_holder, value_holder = result.get_item('key')
+        self.assertIs(result.filename, value_holder.value[0].filename)
+        self.assertIs(intern('file.yaml'), result.filename)
+
+    def test_get_item(self):
+        holder = Holder.of({'a': 1, 'b': 2})
+        key_holder, value_holder = holder.get_item('a')
+        self.assertEqual('a', key_holder.value)
+        self.assertEqual(1, value_holder.value)
+        self.assertEqual((None, None), holder.get_item('c'))
+        self.assertIn('b', holder)
+        self.assertNotIn('c', holder)
+
+    def test_get_item_non_dict(self):
+        self.assertRaises(ValueError, Holder.of([]).get_item, 'a')
+
+    def test_set_item(self):
+        holder = Holder.of({'a': 1})
+        self.assertNotIn('b', holder)
+        holder.set_item(Holder('b'), Holder(2))
+        self.assertEqual(2, holder.get_item('b')[1].value)
+        holder.set_item(Holder('a'), Holder(3))
+        self.assertEqual({'a': 3, 'b': 2}, holder.restore())
+        self.assertEqual(2, len(holder.value))
+
+    def test_get_item_after_direct_modification(self):
+        holder = Holder.of({'a': 1})
+        self.assertNotIn('b', holder)
+        holder.value[Holder('b')] = Holder(2)
+        self.assertIn('b', holder)
+        holder.value = {Holder('c'): Holder(3)}
+        self.assertNotIn('b', holder)
+        self.assertIn('c', holder)
+
+    def test_get_item_unhashable_key(self):
+        list_key = Holder([Holder('a')])
+        holder = Holder({list_key: Holder(1), Holder('b'): Holder(2)})
+        self.assertEqual(2, holder.get_item('b')[1].value)
+        self.assertEqual((None, None), holder.get_item(['a']))
+
+    def test_restore_memo(self):
+        holder = Holder.of({'a': {'b': [1, 2]}})
+        memo = {}
+        restored = holder.restore(memo)
+        self.assertEqual({'a': {'b': [1, 2]}}, restored)
+        self.assertIs(restored, holder.restore(memo))
+        self.assertIs(restored['a'], holder.get_item('a')[1].restore(memo))
+        # without a memo, each restore returns a new value
+        restored = holder.restore()
+        restored['a']['b'].append(3)
+        self.assertEqual({'a': {'b': [1, 2]}}, holder.restore())
+        self.assertIsNot(holder.restore()['a'], holder.restore()['a'])
+
+    def test_restore_after_modification(self):
+        holder = Holder.of({'a': 1})
+        self.assertEqual({'a': 1}, holder.restore())
+        holder.set_item(Holder('b'), Holder(2))
+        self.assertEqual({'a': 1, 'b': 2}, holder.restore())
+        holder.value[Holder('c')] = Holder(3)
+        self.assertEqual({'a': 1, 'b': 2, 'c': 3}, holder.restore())
+        holder.value = {}
+        self.assertEqual({}, holder.restore())
+
+    def test_restore_after_nested_modification(self):
+        holder = Holder.of({'a': {'b': 1}})
+        self.assertEqual({'a': {'b': 1}}, holder.restore())
+        child = holder.get_item('a')[1]
+        child.set_item(Holder('b'), Holder(2))
+        self.assertEqual({'a': {'b': 2}}, holder.restore())
+        child.value[Holder('c')] = Holder(3)
+        self.assertEqual({'a': {'b': 2, 'c': 3}}, holder.restore())
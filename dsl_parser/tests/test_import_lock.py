@@ -0,0 +1,179 @@
+########
+# Copyright (c) 2015 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+import hashlib
+import json
+import os
+import shutil
+import StringIO
+import tempfile
+import urllib
+
+import testtools
+from mock import patch
+
+from dsl_parser import (cli,
+                        import_lock)
+from dsl_parser.exceptions import DSLParsingLogicException
+from dsl_parser.import_resolver.default_import_resolver import \
+    DefaultImportResolver
+from dsl_parser.import_resolver.lockfile_import_resolver import \
+    LockfileImportResolver
+from dsl_parser.parser import parse_from_path
+from dsl_parser.tests.imports_server import ImportsServer
+
+BLUEPRINT = """
+tosca_definitions_version: cloudify_dsl_1_0
+imports:
+    -   local.yaml
+    -   {0}
+node_templates:
+    node:
+        type: remote_type
+"""
+
+
+class TestImportLock(testtools.TestCase):
+
+    def setUp(self):
+        super(TestImportLock, self).setUp()
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir)
+        self.vendor_dir = os.path.join(self.temp_dir, 'vendor')
+        self.lockfile_path = os.path.join(self.vendor_dir,
+                                          import_lock.LOCKFILE_NAME)
+        self.files = {
+            'types.yaml': 'imports: [plugin.yaml]\n'
+                          'node_types: {remote_type: {}}',
+            'plugin.yaml': 'plugins: {plugin: {executor: '
+                           'central_deployment_agent, source: dummy}}'
+        }
+        self.server = ImportsServer(self.files, latency=0)
+        self.server.__enter__()
+        self.addCleanup(self._stop_server)
+        self.blueprint_path = os.path.join(self.temp_dir, 'blueprint.yaml')
+        self._write('blueprint.yaml',
+                    BLUEPRINT.format(self.server.url('types.yaml')))
+        self._write('local.yaml', 'node_types: {local_type: {}}')
+
+    def _write(self, name, content):
+        with open(os.path.join(self.temp_dir, name), 'w') as f:
+            f.write(content)
+
+    def _stop_server(self):
+        if self.server is not None:
+            self.server.__exit__()
+            self.server = None
+
+    def _file_url(self, name):
+        return 'file:' + urllib.pathname2url(
+            os.path.join(self.temp_dir, name))
+
+    def test_lockfile(self):
+        lock = import_lock.lock_imports(self.blueprint_path,
+                                        vendor_dir=self.vendor_dir)
+        with open(self.lockfile_path) as f:
+            self.assertEqual(lock, json.load(f))
+        self.assertEqual(self._file_url('blueprint.yaml'),
+                         lock['blueprint'])
+        self.assertEqual(set([self._file_url('local.yaml'),
+                              self.server.url('types.yaml'),
+                              self.server.url('plugin.yaml')]),
+                         set(i['url'] for i in lock['imports']))
+        for imported in lock['imports']:
+            with open(os.path.join(self.vendor_dir, imported['path'])) as f:
+                content = f.read()
+            self.assertEqual(imported['size'], len(content))
+            self.assertEqual(imported['sha256'],
+                             hashlib.sha256(content).hexdigest())
+        self.assertEqual({self._file_url('local.yaml'): True,
+                          self.server.url('plugin.yaml'): True},
+                         lock['existence'])
+
+    def test_imports_reached_by_other_urls(self):
+        # the same plugins, reached by another URL
+        self.files['mirror.yaml'] = self.files['plugin.yaml']
+        imports = '{0}\n    -   {1}'.format(self.server.url('types.yaml'),
+                                            self.server.url('mirror.yaml'))
+        self._write('blueprint.yaml', BLUEPRINT.format(imports))
+        lock = import_lock.lock_imports(self.blueprint_path,
+                                        vendor_dir=self.vendor_dir)
+        urls = [i['url'] for i in lock['imports']]
+        self.assertEqual(self.server.url('mirror.yaml'), urls[-1])
+        locked = dict((i['url'], i['sha256']) for i in lock['imports'])
+        self.assertEqual(locked[self.server.url('plugin.yaml')],
+                         locked[self.server.url('mirror.yaml')])
+
+    def test_parse_with_lockfile_makes_no_network_calls(self):
+        import_lock.lock_imports(self.blueprint_path,
+                                 vendor_dir=self.vendor_dir)
+        expected = parse_from_path(self.blueprint_path)
+        self._stop_server()
+        with patch('requests.Session.request',
+                   side_effect=AssertionError('network call')):
+            with patch('urllib2.urlopen',
+                       side_effect=AssertionError('network call')):
+                plan = parse_from_path(
+                    self.blueprint_path,
+                    resolver=LockfileImportResolver(self.lockfile_path))
+        self.assertEqual(expected, plan)
+
+    def test_modified_vendored_import(self):
+        lock = import_lock.lock_imports(self.blueprint_path,
+                                        vendor_dir=self.vendor_dir)
+        path = os.path.join(self.vendor_dir, lock['imports'][0]['path'])
+        with open(path, 'a') as f:
+            f.write('\n')
+        ex = self.assertRaises(
+            DSLParsingLogicException,
+            parse_from_path, self.blueprint_path,
+            resolver=LockfileImportResolver(self.lockfile_path))
+        self.assertEqual(13, ex.err_code)
+        self.assertIn('does not match', str(ex))
+
+    def test_import_not_in_lockfile(self):
+        import_lock.lock_imports(self.blueprint_path,
+                                 vendor_dir=self.vendor_dir)
+        self.files['other.yaml'] = 'node_types: {remote_type: {}}'
+        self._write('blueprint.yaml',
+                    BLUEPRINT.format(self.server.url('other.yaml')))
+        ex = self.assertRaises(
+            DSLParsingLogicException,
+            parse_from_path, self.blueprint_path,
+            resolver=LockfileImportResolver(self.lockfile_path))
+        self.assertIn('is not in the imports lockfile', str(ex))
+        # imports not in the lockfile may be fetched by another resolver
+        with DefaultImportResolver() as default_resolver:
+            parse_from_path(self.blueprint_path,
+                            resolver=LockfileImportResolver(
+                                self.lockfile_path,
+                                resolver=default_resolver))
+        self.assertIn('/other.yaml', self.server.requests)
+
+    def test_cli(self):
+        with patch('sys.stdout', new_callable=StringIO.StringIO) as stdout:
+            self.assertEqual(0, cli.main(['lock', self.blueprint_path]))
+        self.assertIn('Locked 3 imports', stdout.getvalue())
+        self.assertTrue(os.path.isfile(self.lockfile_path))
+        self._stop_server()
+        with patch('sys.stdout', new_callable=StringIO.StringIO) as stdout:
+            self.assertEqual(0, cli.main(['parse', self.blueprint_path,
+                                          '--lockfile',
+                                          self.lockfile_path]))
+        plan = json.loads(stdout.getvalue())
+        self.assertEqual('node', plan['nodes'][0]['id'])
+        with patch('sys.stderr', new_callable=StringIO.StringIO) as stderr:
+            self.assertEqual(1, cli.main(['parse', self.blueprint_path]))
+        self.assertIn('Import failed', stderr.getvalue())
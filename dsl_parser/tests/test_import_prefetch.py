@@ -0,0 +1,200 @@
+########
+# Copyright (c) 2015 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+from multiprocessing.dummy import DummyProcess
+
+import testtools
+
+from dsl_parser import import_prefetch
+from dsl_parser.import_resolver.default_import_resolver import \
+    DefaultImportResolver
+from dsl_parser.parser import parse_from_path
+from dsl_parser.tests.imports_server import ImportsServer
+
+BLUEPRINT = """
+tosca_definitions_version: cloudify_dsl_1_0
+imports:
+{0}
+node_templates:
+    node:
+        type: {1}
+"""
+
+
+def _types(name, imports=()):
+    return 'imports: [{0}]\nnode_types: {{{1}: {{}}}}\n'.format(
+        ', '.join(imports), name)
+
+
+class TestImportPrefetch(testtools.TestCase):
+
+    def setUp(self):
+        super(TestImportPrefetch, self).setUp()
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir)
+        self.manifests = import_prefetch.ImportManifests()
+        # a chain of imports, each importing the next one
+        self.files = {
+            'a.yaml': _types('a', ['b.yaml']),
+            'b.yaml': _types('b', ['c.yaml']),
+            'c.yaml': _types('c', ['d.yaml']),
+            'd.yaml': _types('d')
+        }
+        self.blueprint_path = os.path.join(self.temp_dir, 'blueprint.yaml')
+
+    def _write_blueprint(self, server, imports, node_type='a'):
+        with open(self.blueprint_path, 'w') as f:
+            f.write(BLUEPRINT.format(
+                '\n'.join('    -   {0}'.format(server.url(name))
+                          for name in imports),
+                node_type))
+
+    def _parse(self, import_manifests=True):
+        with DefaultImportResolver(
+                max_concurrent_imports_per_host=8) as resolver:
+            return parse_from_path(
+                self.blueprint_path,
+                resolver=resolver,
+                import_manifests=self.manifests if import_manifests
+                else None)
+
+    def test_recorded_imports_are_prefetched(self):
+        with ImportsServer(self.files, latency=0.2) as server:
+            self._write_blueprint(server, ['a.yaml'])
+            started = time.time()
+            expected = self._parse()
+            first_elapsed = time.time() - started
+            self.assertEqual(1, server.max_in_flight)
+            started = time.time()
+            plan = self._parse()
+            elapsed = time.time() - started
+        self.assertEqual(expected, plan)
+        # the imports and the checks locating the relative imports were
+        # one after the other, and are now all at once
+        self.assertGreater(first_elapsed, 7 * server.latency)
+        self.assertLess(elapsed, 2 * server.latency)
+        self.assertEqual(7, server.max_in_flight)
+        self.assertEqual(8, len(server.requests))
+        self.assertEqual(6, len(server.head_requests))
+
+    def test_imports_changed_since_recorded(self):
+        self.files['e.yaml'] = _types('e')
+        with ImportsServer(self.files, latency=0) as server:
+            self._write_blueprint(server, ['a.yaml'])
+            self._parse()
+            # c.yaml and d.yaml are no longer imported, e.yaml is new
+            self.files['b.yaml'] = _types('b', ['e.yaml'])
+            self._parse()
+            manifest = self.manifests.get(
+                'file:' + self.blueprint_path)
+            self.assertEqual([server.url(name) for name in
+                              ['a.yaml', 'b.yaml', 'e.yaml']],
+                             manifest['imports'])
+            self._write_blueprint(server, ['a.yaml', 'd.yaml'],
+                                  node_type='d')
+            self._parse()
+
+    def test_sequential_resolver_is_not_prefetched(self):
+        with ImportsServer(self.files, latency=0.05) as server:
+            self._write_blueprint(server, ['a.yaml'])
+            for _ in range(2):
+                with DefaultImportResolver(
+                        max_concurrent_imports=1) as resolver:
+                    parse_from_path(self.blueprint_path,
+                                    resolver=resolver,
+                                    import_manifests=self.manifests)
+        self.assertEqual(1, server.max_in_flight)
+
+    def test_prefetch_is_opt_in(self):
+        with ImportsServer(self.files, latency=0) as server:
+            self._write_blueprint(server, ['a.yaml'])
+            self._parse(import_manifests=False)
+            self._write_blueprint(server, ['d.yaml'], node_type='d')
+            self._parse(import_manifests=False)
+        self.assertIsNone(self.manifests.get('file:' + self.blueprint_path))
+        self.assertEqual(['/a.yaml', '/b.yaml', '/c.yaml', '/d.yaml',
+                          '/d.yaml'], server.requests)
+
+    def test_discarded_prefetches_are_waited_for(self):
+        self.files['slow.yaml'] = _types('slow')
+        with ImportsServer(self.files, latency=0.3) as server:
+            self._write_blueprint(server, ['slow.yaml'], node_type='slow')
+            self._parse()
+            self._write_blueprint(server, [], node_type='missing')
+            # slow.yaml is prefetched but no longer imported
+            self.assertRaises(Exception, self._parse)
+            # the prefetch was not made or was made before the parse ended
+            self.assertEqual([], [t for t in threading.enumerate()
+                                  if isinstance(t, DummyProcess)])
+
+    def test_relative_import_checks_are_prefetched(self):
+        for name, content in self.files.items():
+            with open(os.path.join(self.temp_dir, name), 'w') as f:
+                f.write(content)
+        with open(self.blueprint_path, 'w') as f:
+            f.write(BLUEPRINT.format('    -   a.yaml', 'a'))
+        self._parse()
+        manifest = self.manifests.get(
+            'file:' + self.blueprint_path)
+        self.assertEqual(['file:' + os.path.join(self.temp_dir, name)
+                          for name in ['a.yaml', 'b.yaml', 'c.yaml',
+                                       'd.yaml']],
+                         manifest['checks'])
+        self._parse()
+
+    def test_manifests_file(self):
+        path = os.path.join(self.temp_dir, 'manifests', 'imports.json')
+        manifests = import_prefetch.ImportManifests(path=path, max_size=2)
+        for i in range(3):
+            manifests.put('file:/blueprint{0}.yaml'.format(i),
+                          {'imports': ['http://host/{0}.yaml'.format(i)],
+                           'checks': []})
+        loaded = import_prefetch.ImportManifests(path=path)
+        self.assertIsNone(loaded.get('file:/blueprint0.yaml'))
+        self.assertEqual({'imports': ['http://host/2.yaml'], 'checks': []},
+                         loaded.get('file:/blueprint2.yaml'))
+        with open(path, 'w') as f:
+            f.write('corrupt')
+        self.assertIsNone(import_prefetch.ImportManifests(path=path).get(
+            'file:/blueprint2.yaml'))
+
+    def test_manifests_file_of_several_processes(self):
+        path = os.path.join(self.temp_dir, 'imports.json')
+        first = import_prefetch.ImportManifests(path=path)
+        second = import_prefetch.ImportManifests(path=path)
+        first.put('file:/blueprint1.yaml',
+                  {'imports': ['http://host/1.yaml'], 'checks': []})
+        second.put('file:/blueprint2.yaml',
+                   {'imports': ['http://host/2.yaml'], 'checks': []})
+        loaded = import_prefetch.ImportManifests(path=path)
+        self.assertEqual({'imports': ['http://host/1.yaml'], 'checks': []},
+                         loaded.get('file:/blueprint1.yaml'))
+        self.assertEqual({'imports': ['http://host/2.yaml'], 'checks': []},
+                         loaded.get('file:/blueprint2.yaml'))
+        first.put('file:/blueprint2.yaml',
+                  {'imports': ['http://host/3.yaml'], 'checks': []})
+        loaded = import_prefetch.ImportManifests(path=path)
+        self.assertEqual({'imports': ['http://host/1.yaml'], 'checks': []},
+                         loaded.get('file:/blueprint1.yaml'))
+        self.assertEqual({'imports': ['http://host/3.yaml'], 'checks': []},
+                         loaded.get('file:/blueprint2.yaml'))
+        second.clear()
+        self.assertIsNone(import_prefetch.ImportManifests(path=path).get(
+            'file:/blueprint1.yaml'))
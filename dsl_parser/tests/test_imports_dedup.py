@@ -0,0 +1,137 @@
+########
+# Copyright (c) 2015 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+import os
+
+from dsl_parser import (import_lock,
+                        utils)
+from dsl_parser.elements import imports
+from dsl_parser.import_resolver.default_import_resolver import \
+    DefaultImportResolver
+from dsl_parser.import_resolver.lockfile_import_resolver import \
+    LockfileImportResolver
+from dsl_parser.parser import parse_from_path
+from dsl_parser.tests.abstract_test_parser import AbstractTestParser
+from dsl_parser.tests.imports_server import ImportsServer
+
+TYPES = """
+node_types:
+    imported_type: {}
+"""
+
+
+class TestImportsDeduplication(AbstractTestParser):
+
+    def _blueprint(self, import_urls):
+        return self.BASIC_VERSION_SECTION_DSL_1_0 + """
+node_templates:
+    node:
+        type: imported_type
+imports:
+""" + ''.join('    -   {0}\n'.format(url) for url in import_urls)
+
+    def _ordered_imports(self, blueprint, resolver=None):
+        ordered = imports._build_ordered_imports(
+            parsed_dsl_holder=utils.load_yaml(blueprint, 'error'),
+            dsl_location=None,
+            resources_base_url=None,
+            resolver=resolver or DefaultImportResolver(
+                max_concurrent_imports=1))
+        return [i['import'] for i in ordered]
+
+    def test_canonical_url(self):
+        for url, expected in [
+                ('http://host/a/../types.yaml', 'http://host/types.yaml'),
+                ('HTTP://Host:80/./a/b/../../types.yaml#x',
+                 'http://host/types.yaml'),
+                ('https://host:443/../types.yaml?a=./b',
+                 'https://host/types.yaml?a=./b'),
+                ('http://user@host:8080/a/./', 'http://user@host:8080/a/'),
+                ('http://host/a/..', 'http://host/'),
+                ('file:/tmp/a/../types.yaml', 'file:/tmp/types.yaml'),
+                ('file:///tmp/types.yaml', 'file:///tmp/types.yaml'),
+                ('http://host/a//b.yaml', 'http://host/a//b.yaml'),
+                ('file:a/../types.yaml', 'file:types.yaml'),
+                ('file:../a/./../types.yaml', 'file:../types.yaml')]:
+            self.assertEqual(expected, imports._canonical_url(url))
+
+    def test_remove_dot_segments(self):
+        for path, expected in [
+                ('/a/b/c/./../../g', '/a/g'),
+                ('/../a', '/a'),
+                ('/a/..', '/'),
+                ('/a/b/.', '/a/b/'),
+                ('/a//b/../c', '/a//c'),
+                ('a/../b', 'b'),
+                ('./a/b/../c', 'a/c'),
+                ('a/..', ''),
+                ('a/b/../../..', '..'),
+                ('../../a/./b', '../../a/b'),
+                ('../a/../b', '../b')]:
+            self.assertEqual(expected, imports._remove_dot_segments(path))
+
+    def test_equivalent_urls_are_fetched_once(self):
+        files = {'types.yaml': TYPES}
+        with ImportsServer(files, latency=0) as server:
+            blueprint = self._blueprint([
+                server.url('a/../types.yaml'),
+                server.url('types.yaml#types'),
+                server.url('./types.yaml')])
+            self.parse(blueprint, resolver=DefaultImportResolver())
+        self.assertEqual(['/types.yaml'], server.requests)
+
+    def test_same_content_at_another_url_is_loaded_once(self):
+        files = {'types.yaml': TYPES}
+        with ImportsServer(files, latency=0) as server:
+            with ImportsServer(dict(files), latency=0) as mirror:
+                blueprint = self._blueprint([server.url('types.yaml'),
+                                             mirror.url('types.yaml')])
+                self.assertEqual(['root', server.url('types.yaml')],
+                                 self._ordered_imports(blueprint))
+                # used to fail on the duplicate node type
+                self.parse(blueprint)
+        # the mirror's content is fetched, once by each parse, to find it
+        # is the same
+        self.assertEqual(['/types.yaml'] * 2, mirror.requests)
+
+    def test_same_content_with_other_relative_imports(self):
+        plugins = []
+        for directory in ['a', 'b']:
+            plugins.append(self.make_file_with_name(
+                'imports: [types.yaml]', 'plugin.yaml', directory))
+            self.make_file_with_name(
+                TYPES.replace('imported_type', directory), 'types.yaml',
+                directory)
+        blueprint = self._blueprint(plugins).replace(
+            'type: imported_type', 'type: a\n    other_node:\n        type: b')
+        plan = self.parse(blueprint)
+        self.assertEqual(['a', 'b'], sorted(n['type'] for n in plan['nodes']))
+
+    def test_lockfile_locks_all_urls_of_an_import(self):
+        files = {'types.yaml': TYPES}
+        vendor_dir = os.path.join(self._temp_dir, 'vendor')
+        with ImportsServer(files, latency=0) as server:
+            with ImportsServer(dict(files), latency=0) as mirror:
+                blueprint_path = self.make_file_with_name(
+                    self._blueprint([server.url('types.yaml'),
+                                     mirror.url('types.yaml')]),
+                    'blueprint.yaml')
+                lock = import_lock.lock_imports(blueprint_path,
+                                                vendor_dir=vendor_dir)
+        self.assertEqual([server.url('types.yaml'), mirror.url('types.yaml')],
+                         [i['url'] for i in lock['imports']])
+        parse_from_path(blueprint_path,
+                        resolver=LockfileImportResolver(os.path.join(
+                            vendor_dir, import_lock.LOCKFILE_NAME)))
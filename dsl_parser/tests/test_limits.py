@@ -0,0 +1,288 @@
+########
+# Copyright (c) 2015 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+import os
+import StringIO
+import time
+import zipfile
+
+from dsl_parser import (exceptions,
+                        parser,
+                        yaml_loader)
+from dsl_parser.import_resolver.caching_import_resolver import \
+    CachingImportResolver
+from dsl_parser.import_resolver.default_import_resolver import \
+    DefaultImportResolver
+from dsl_parser.limits import ParsingLimits
+from dsl_parser.tests.abstract_test_parser import AbstractTestParser
+from dsl_parser.tests.imports_server import ImportsServer
+
+BLUEPRINT = """
+node_types:
+    type:
+        properties:
+            prop: {{default: value}}
+node_templates:
+    node:
+        type: type
+{0}"""
+
+# 10 ** 9 strings once its aliases are expanded
+ALIAS_BOMB = """
+node_types:
+    type:
+        properties:
+            prop: {default: a}
+node_templates:
+    node:
+        type: type
+        properties:
+            prop:
+                a: &a [x, x, x, x, x, x, x, x, x, x]
+"""
+for _level, _name in enumerate('bcdefghij'):
+    ALIAS_BOMB += '                {0}: &{0} [{1}]\n'.format(
+        _name, ', '.join(['*' + 'abcdefghij'[_level]] * 10))
+
+
+class TestParsingLimits(AbstractTestParser):
+
+    def _parse(self, dsl_string, **limits):
+        return parser.parse(self.BASIC_VERSION_SECTION_DSL_1_0 + dsl_string,
+                            limits=ParsingLimits(**limits))
+
+    def _assert_limit_exceeded(self, message, func, *args, **kwargs):
+        ex = self.assertRaises(exceptions.DSLParsingFormatException,
+                               func, *args, **kwargs)
+        self.assertEqual(exceptions.ERROR_CODE_LIMIT_EXCEEDED, ex.err_code)
+        self.assertIn(message, str(ex))
+        return ex
+
+    def test_no_limits(self):
+        self._parse(self.MINIMAL_BLUEPRINT)
+
+    def test_document_bytes(self):
+        size = len(self.BASIC_VERSION_SECTION_DSL_1_0 + self.MINIMAL_BLUEPRINT)
+        self._parse(self.MINIMAL_BLUEPRINT, max_document_bytes=size)
+        self._assert_limit_exceeded(
+            'larger than the limit of {0} bytes'.format(size - 1),
+            self._parse, self.MINIMAL_BLUEPRINT,
+            max_document_bytes=size - 1)
+
+        imported = self.make_yaml_file('node_types: {other: {}}\n' +
+                                       '#' * 1000)
+        dsl_string = BLUEPRINT.format('imports: [{0}]\n'.format(imported))
+        self._assert_limit_exceeded(
+            'larger than the limit of 1000 bytes',
+            self._parse, dsl_string, max_document_bytes=1000)
+
+    def test_document_bytes_from_url(self):
+        files = {'blueprint.yaml': self.BASIC_VERSION_SECTION_DSL_1_0 +
+                 self.MINIMAL_BLUEPRINT + '#' * 10000}
+        with ImportsServer(files, latency=0) as server:
+            self._assert_limit_exceeded(
+                'larger than the limit of 1000 bytes',
+                parser.parse_from_url, server.url('blueprint.yaml'),
+                limits=ParsingLimits(max_document_bytes=1000))
+
+    def test_documents_are_read_up_to_the_limit(self):
+        limits = ParsingLimits(max_document_bytes=1000)
+        f = StringIO.StringIO('#' * 100000)
+        self._assert_limit_exceeded(
+            'larger than the limit of 1000 bytes',
+            limits.read_document, f, 'document.yaml')
+        self.assertEqual(1001, f.tell())
+        self.assertEqual('#' * 1000, limits.read_document(
+            StringIO.StringIO('#' * 1000), 'document.yaml'))
+
+        read = []
+
+        def chunks():
+            for _ in xrange(100):
+                read.append(1)
+                yield '#' * 100
+        self._assert_limit_exceeded(
+            'larger than the limit of 1000 bytes',
+            limits.read_chunks, chunks(), 'document.yaml')
+        self.assertEqual(11, len(read))
+
+    def test_document_bytes_of_http_imports(self):
+        files = {'blueprint.yaml': self.BASIC_VERSION_SECTION_DSL_1_0 +
+                 BLUEPRINT.format('imports: [big.yaml]\n'),
+                 'big.yaml': 'node_types: {other: {}}\n' + '#' * 100000}
+        with ImportsServer(files, latency=0) as server:
+            # raised by the fetch of the import, before it is loaded
+            self._assert_limit_exceeded(
+                "Document '{0}' is larger than the limit of 1000 bytes"
+                .format(server.url('big.yaml')),
+                parser.parse_from_url, server.url('blueprint.yaml'),
+                limits=ParsingLimits(max_document_bytes=1000))
+
+    def test_document_bytes_of_cached_http_imports(self):
+        files = {'big.yaml': 'node_types: {other: {}}\n' + '#' * 100000}
+        cache_dir = self.make_file_with_name('', 'cache')
+        os.remove(cache_dir)
+        with ImportsServer(files, latency=0) as server:
+            dsl_string = BLUEPRINT.format(
+                'imports: [{0}]\n'.format(server.url('big.yaml')))
+            with CachingImportResolver(cache_dir=cache_dir) as resolver:
+                self._assert_limit_exceeded(
+                    'larger than the limit of 1000 bytes',
+                    parser.parse,
+                    self.BASIC_VERSION_SECTION_DSL_1_0 + dsl_string,
+                    resolver=resolver,
+                    limits=ParsingLimits(max_document_bytes=1000))
+                self.assertNotIn(server.url('big.yaml'), resolver.cache)
+
+    def test_document_bytes_of_archive_members(self):
+        archive_path = self.make_file_with_name('', 'blueprint.zip')
+        with zipfile.ZipFile(archive_path, 'w',
+                             zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr('blueprint.yaml',
+                             self.BASIC_VERSION_SECTION_DSL_1_0 +
+                             BLUEPRINT.format('imports: [big.yaml]\n'))
+            # compressed to a few kilobytes
+            archive.writestr('big.yaml', '#' * (10 * 1024 * 1024))
+        self._assert_limit_exceeded(
+            "blueprint.zip/big.yaml' is larger than the limit of 1000 bytes",
+            parser.parse_from_archive, archive_path,
+            limits=ParsingLimits(max_document_bytes=1000))
+
+    def test_alias_expansions(self):
+        started = time.time()
+        self._assert_limit_exceeded(
+            'expand to more than the limit of 1000 nodes',
+            self._parse, ALIAS_BOMB, max_alias_expansions=1000)
+        # the document over the limit is not cached
+        self._assert_limit_exceeded(
+            'expand to more than the limit of 1000 nodes',
+            self._parse, ALIAS_BOMB, max_alias_expansions=1000)
+        self.assertLess(time.time() - started, 5)
+
+        aliases = """
+node_types:
+    type:
+        properties:
+            a: {default: &default [1, 2, 3]}
+            b: {default: *default}
+            c: {default: *default}
+node_templates:
+    node:
+        type: type
+"""
+        self._parse(aliases, max_alias_expansions=8)
+        self._assert_limit_exceeded(
+            'expand to more than the limit of 7 nodes',
+            self._parse, aliases, max_alias_expansions=7)
+
+    def test_nesting_depth(self):
+        dsl_string = BLUEPRINT.format(
+            '        properties:\n'
+            '            prop: [[[[[[[[[[value]]]]]]]]]]\n')
+        # node_templates.node.properties.prop and the lists in it
+        self._parse(dsl_string, max_nesting_depth=14)
+        self._assert_limit_exceeded(
+            'nested deeper than the limit of 13 levels',
+            self._parse, dsl_string, max_nesting_depth=13)
+
+    def test_nesting_depth_while_composing(self):
+        # deeper than the recursion limit of the composer
+        dsl_string = '\nx: {0}{1}\n'.format('[' * 20000, ']' * 20000)
+        loaders = [yaml_loader.MarkedLoader]
+        if yaml_loader.CMarkedLoader:
+            loaders.append(yaml_loader.CMarkedLoader)
+        for loader_cls in loaders:
+            self._assert_limit_exceeded(
+                'nested deeper than the limit of 50 levels',
+                yaml_loader.load, dsl_string, 'blueprint.yaml',
+                loader_cls=loader_cls,
+                limits=ParsingLimits(max_nesting_depth=50))
+        self._assert_limit_exceeded(
+            'nested deeper than the limit of 50 levels',
+            self._parse, dsl_string, max_nesting_depth=50)
+
+    def test_documents_over_limits_are_not_cached(self):
+        dsl_string = BLUEPRINT.format(
+            '        properties:\n'
+            '            prop: [[[[[[[[[[uncached]]]]]]]]]]\n')
+        for _ in xrange(2):
+            hits = yaml_loader.holders_cache.hits
+            self._assert_limit_exceeded(
+                'nested deeper than the limit of 13 levels',
+                self._parse, dsl_string, max_nesting_depth=13)
+            self.assertEqual(hits, yaml_loader.holders_cache.hits)
+
+    def test_cached_documents(self):
+        dsl_string = BLUEPRINT.format(
+            '        properties:\n'
+            '            prop: [[[[[[[[[[value]]]]]]]]]]\n')
+        self._parse(dsl_string)
+        self._assert_limit_exceeded(
+            'nested deeper than the limit of 13 levels',
+            self._parse, dsl_string, max_nesting_depth=13)
+
+    def test_elements(self):
+        dsl_string = BLUEPRINT.format(''.join(
+            '    node{0}:\n'
+            '        type: type\n'.format(i) for i in xrange(1000)))
+        self._assert_limit_exceeded(
+            'more than the limit of 1000 elements',
+            self._parse, dsl_string, max_elements=1000)
+        self._parse(dsl_string, max_elements=10000)
+
+    def test_elements_of_imported_types(self):
+        imported = self.make_yaml_file('node_types:\n' + ''.join(
+            '    type{0}: {{}}\n'.format(i) for i in xrange(1000)))
+        dsl_string = BLUEPRINT.format('imports: [{0}]\n'.format(imported))
+        self._assert_limit_exceeded(
+            'more than the limit of 1000 elements',
+            self._parse, dsl_string, max_elements=1000)
+
+    def test_imports(self):
+        dsl_string = BLUEPRINT.format(self.create_yaml_with_imports(
+            ['node_types: {{type{0}: {{}}}}'.format(i) for i in xrange(3)]))
+        self._parse(dsl_string, max_imports=3)
+        self._assert_limit_exceeded(
+            'more than the limit of 2 imports',
+            self._parse, dsl_string, max_imports=2)
+
+    def test_imports_of_concurrent_fetches(self):
+        files = dict(('{0}.yaml'.format(i),
+                      'node_types: {{type{0}: {{}}}}'.format(i))
+                     for i in xrange(6))
+        with ImportsServer(files, latency=0) as server:
+            dsl_string = BLUEPRINT.format('imports: [{0}]\n'.format(
+                ', '.join(server.url(name) for name in sorted(files))))
+            self._assert_limit_exceeded(
+                'more than the limit of 2 imports',
+                parser.parse, self.BASIC_VERSION_SECTION_DSL_1_0 + dsl_string,
+                resolver=DefaultImportResolver(max_concurrent_imports=4),
+                limits=ParsingLimits(max_imports=2))
+        # the level over the limit is not fetched
+        self.assertEqual([], server.requests)
+
+    def test_document_bytes_of_concurrent_fetches(self):
+        files = {'a.yaml': 'imports: [b.yaml]\n' + '#' * 1000,
+                 'b.yaml': 'node_types: {other: {}}\n'}
+        with ImportsServer(files, latency=0) as server:
+            dsl_string = BLUEPRINT.format(
+                'imports: [{0}]\n'.format(server.url('a.yaml')))
+            self._assert_limit_exceeded(
+                'larger than the limit of 1000 bytes',
+                parser.parse, self.BASIC_VERSION_SECTION_DSL_1_0 + dsl_string,
+                resolver=DefaultImportResolver(max_concurrent_imports=4),
+                limits=ParsingLimits(max_document_bytes=1000))
+        # the imports of the import over the limit are not read
+        self.assertEqual(['/a.yaml'], server.requests)
@@ -20,12 +20,18 @@ import yaml as yml
 from urllib2 import HTTPError
 from urllib import pathname2url
 
+from mock import patch
+
 from dsl_parser import exceptions
 from dsl_parser import constants
 from dsl_parser import version
 from dsl_parser import models
+from dsl_parser.framework import (elements as framework_elements,
+                                  parser as framework_parser)
 from dsl_parser.tests.abstract_test_parser import AbstractTestParser
-from dsl_parser.parser import parse_from_path, parse_from_url
+from dsl_parser.parser import (parse_from_path,
+                               parse_from_url,
+                               parse_dsl_header)
 from dsl_parser.parser import parse as dsl_parse
 from dsl_parser.interfaces.constants import NO_OP
 from dsl_parser.interfaces.utils import operation_mapping
@@ -287,6 +293,26 @@ imports: []
         result = self.parse(yaml)
         self._assert_minimal_blueprint(result)
 
+    def test_import_into_empty_section(self):
+        imported = self.make_yaml_file("""
+node_types:
+    test_type:
+        properties:
+            key:
+                default: 'default'
+""")
+        yaml = """
+imports: [{0}]
+node_types:
+node_templates:
+    test_node:
+        type: test_type
+        properties:
+            key: "val"
+""".format(imported)
+        result = self.parse(yaml)
+        self._assert_minimal_blueprint(result)
+
     def test_blueprint_description_field(self):
         yaml = self.MINIMAL_BLUEPRINT + self.BASIC_VERSION_SECTION_DSL_1_2 +\
             """
@@ -3183,3 +3209,196 @@ node_templates:
         plugin2 = node2['plugins_to_install'][0]
         self.assertEqual(expected_plugin1, plugin1)
         self.assertEqual(expected_plugin2, plugin2)
+
+    def test_version_and_imports_stages_read_only_their_keys(self):
+        stages = []
+        original_parse = framework_parser.parse
+
+        def recording_parse(value, element_cls, **kwargs):
+            stages.append((element_cls.__name__,
+                           sorted(k.value for k in value.value)))
+            return original_parse(value, element_cls, **kwargs)
+
+        imported = self.make_yaml_file(self.BASIC_TYPE + self.BASIC_PLUGIN)
+        yaml = self.BASIC_VERSION_SECTION_DSL_1_0 + """
+imports:
+    -   {0}
+""".format(imported) + self.BASIC_NODE_TEMPLATES_SECTION
+        with patch.object(framework_parser, 'parse', recording_parse):
+            result = self.parse(yaml)
+        self.assertEqual('test_node', result['nodes'][0]['id'])
+        self.assertEqual([
+            ('BlueprintVersionExtractor', ['tosca_definitions_version']),
+            ('BlueprintImporter', ['imports']),
+            ('TypeLibrary', ['node_types',
+                             'plugins',
+                             'tosca_definitions_version']),
+            ('Blueprint', ['node_templates',
+                           'node_types',
+                           'plugins',
+                           'tosca_definitions_version'])
+        ], stages)
+
+    def test_parse_dsl_header(self):
+        yaml = self.BASIC_VERSION_SECTION_DSL_1_2 + """
+imports:
+    -   types.yaml
+node_templates: [not, a, valid
+"""
+        header = parse_dsl_header(yaml)
+        self.assertEqual((1, 2), header['version']['definitions_version'])
+        self.assertEqual('cloudify_dsl_1_2',
+                         header['tosca_definitions_version'].value)
+        imports = header['imports']
+        self.assertEqual(['types.yaml'], imports.restore())
+        self.assertEqual(4, imports.start_line)
+        self.assertEqual(8, imports.value[0].start_column)
+
+    def test_parse_dsl_header_unsupported_version(self):
+        self._assert_dsl_parsing_exception_error_code(
+            'tosca_definitions_version: cloudify_dsl_9_9\nimports: []',
+            29, exceptions.DSLParsingLogicException,
+            parsing_method=parse_dsl_header)
+
+
+class TestDebugSharedValues(AbstractTestParser):
+    """Parses blueprints that use most of the elements in the debug mode
+    of the framework parser, which fails if an element modifies a value
+    it shares with other elements."""
+
+    TYPES = """
+plugins:
+    plugin:
+        executor: central_deployment_agent
+        source: dummy
+data_types:
+    datatype:
+        properties:
+            a: {default: 1}
+            b: {type: integer}
+    derived_datatype:
+        derived_from: datatype
+        properties:
+            c: {default: [1, 2]}
+node_types:
+    root:
+        properties:
+            prop: {type: datatype, default: {b: 2}}
+            list_prop: {default: [a, b]}
+        interfaces:
+            lifecycle:
+                create: plugin.tasks.create
+                start:
+                    implementation: plugin.tasks.start
+                    inputs:
+                        timeout: {default: 30}
+    derived:
+        derived_from: root
+        properties:
+            derived_prop: {type: derived_datatype, default: {b: 3}}
+        interfaces:
+            lifecycle:
+                start:
+                    implementation: plugin.tasks.start
+                    inputs:
+                        retries: {default: 3}
+relationships:
+    connected_to:
+        source_interfaces:
+            relationship:
+                establish: plugin.tasks.establish
+        target_interfaces:
+            relationship:
+                unlink: plugin.tasks.unlink
+    derived_connected_to:
+        derived_from: connected_to
+        properties:
+            rel_prop: {default: value}
+policy_types:
+    policy_type:
+        properties:
+            key: {default: value}
+        source: source
+policy_triggers:
+    trigger:
+        parameters:
+            param: {default: value}
+        source: source
+"""
+
+    BLUEPRINT = """
+inputs:
+    input: {default: {b: 4}}
+node_templates:
+    node1:
+        type: root
+        properties:
+            prop: {get_input: input}
+        instances:
+            deploy: 2
+    node2:
+        type: derived
+        interfaces:
+            lifecycle:
+                configure: plugin.tasks.configure
+        relationships:
+            -   type: derived_connected_to
+                target: node1
+                source_interfaces:
+                    relationship:
+                        establish:
+                            implementation: plugin.tasks.establish
+                            inputs:
+                                arg: {get_property: [SOURCE, prop]}
+    node3:
+        type: derived
+        properties:
+            list_prop: [c]
+        relationships:
+            -   type: connected_to
+                target: node1
+            -   type: connected_to
+                target: node2
+groups:
+    group:
+        members: [node1, node2]
+        policies:
+            policy:
+                type: policy_type
+                properties:
+                    key: group_value
+                triggers:
+                    trigger:
+                        type: trigger
+                        parameters:
+                            param: {get_property: [SELF, key]}
+outputs:
+    output:
+        value: {get_attribute: [node2, attribute]}
+    property:
+        value: {get_property: [node3, list_prop]}
+"""
+
+    def setUp(self):
+        super(TestDebugSharedValues, self).setUp()
+        self.addCleanup(setattr, framework_elements, 'debug_shared_values',
+                        framework_elements.debug_shared_values)
+
+    def _parse_in_both_modes(self, dsl_string):
+        framework_elements.debug_shared_values = False
+        expected = self.parse_1_2(dsl_string)
+        framework_elements.debug_shared_values = True
+        self.assertEqual(expected, self.parse_1_2(dsl_string))
+        # the values of the first parse were not modified by the second
+        framework_elements.debug_shared_values = False
+        self.assertEqual(expected, self.parse_1_2(dsl_string))
+
+    def test_blueprint(self):
+        self._parse_in_both_modes(self.TYPES + self.BLUEPRINT)
+
+    def test_imported_types(self):
+        # imported types are prelinked from their type library
+        self._parse_in_both_modes(
+            self.create_yaml_with_imports(
+                [self.BASIC_VERSION_SECTION_DSL_1_2 + self.TYPES]) +
+            self.BLUEPRINT)
@@ -197,6 +197,25 @@ imports:
         self._assert_dsl_parsing_exception_error_code(
             yaml, 2, DSLParsingFormatException)
 
+    def test_import_mergeable_section_not_a_dict(self):
+        bad_import = self.make_yaml_file("""
+node_types: [type]
+""")
+        other_import = self.make_yaml_file("""
+node_types:
+    other_type: {}
+""")
+        yaml = """
+node_templates: {{}}
+imports:
+    -   {0}
+    -   {1}
+""".format(bad_import, other_import)
+        ex = self._assert_dsl_parsing_exception_error_code(
+            yaml, 1, DSLParsingFormatException)
+        self.assertIn("'node_types' of import 'file:{0}' must be a dict but "
+                      "found a list".format(bad_import), str(ex))
+
     def test_type_multiple_derivation(self):
         yaml = self.BASIC_NODE_TEMPLATES_SECTION + """
 node_types:
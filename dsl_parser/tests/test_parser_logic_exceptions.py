@@ -20,7 +20,8 @@ from dsl_parser.parser import parse as dsl_parse
 from dsl_parser import exceptions
 from dsl_parser.exceptions import DSLParsingLogicException
 from dsl_parser import version
-from dsl_parser.tests.abstract_test_parser import AbstractTestParser
+from dsl_parser.tests.abstract_test_parser import (AbstractTestParser,
+                                                   timeout)
 from dsl_parser.import_resolver.default_import_resolver import \
     DefaultImportResolver
 
@@ -91,6 +92,31 @@ node_types:
         self.assertEqual(len(circular), 4)
         self.assertEqual(circular[0], circular[-1])
 
+    @timeout(seconds=30)
+    def test_dense_cyclic_dependency(self):
+        nodes_count = 30
+        yaml = self.BASIC_VERSION_SECTION_DSL_1_0 + """
+node_types:
+    test_type: {}
+relationships:
+    test_relationship: {}
+node_templates:"""
+        for i in range(nodes_count):
+            yaml += """
+    node{0}:
+        type: test_type
+        relationships:""".format(i)
+            for j in range(nodes_count):
+                if i != j:
+                    yaml += """
+            -   type: test_relationship
+                target: node{0}""".format(j)
+        ex = self._assert_dsl_parsing_exception_error_code(
+            yaml, exceptions.ERROR_CODE_CYCLE, DSLParsingLogicException)
+        circular = ex.circular_dependency
+        self.assertEqual(circular[0], circular[-1])
+        self.assertEqual(len(circular) - 1, len(set(circular)))
+
     def test_plugin_with_wrongful_executor_field(self):
         yaml = self.BASIC_NODE_TEMPLATES_SECTION + """
 plugins:
@@ -167,6 +193,37 @@ relationships:
         self._assert_dsl_parsing_exception_error_code(
             yaml, 4, DSLParsingLogicException)
 
+    def test_import_conflict_on_type_from_several_imports(self):
+        imported_yamls = ["""
+node_types:
+    type{0}: {{}}
+""".format(i) for i in range(3)]
+        imported_yamls.append("""
+node_types:
+    type1:
+        properties: {}
+""")
+        yaml = self.create_yaml_with_imports(imported_yamls) + \
+            self.MINIMAL_BLUEPRINT
+        ex = self._assert_dsl_parsing_exception_error_code(
+            yaml, 4, DSLParsingLogicException)
+        self.assertIn("Import failed: Could not merge 'node_types' due "
+                      "to conflict on 'type1'", str(ex))
+
+    def test_import_non_mergeable_field(self):
+        imported_yaml = """
+outputs:
+    output: {value: 1}
+"""
+        yaml = self.create_yaml_with_imports([imported_yaml]) + """
+outputs:
+    other_output: {value: 2}
+"""
+        ex = self._assert_dsl_parsing_exception_error_code(
+            yaml, 3, DSLParsingLogicException)
+        self.assertIn("Import failed: non-mergeable field: 'outputs'",
+                      str(ex))
+
     def test_top_level_relationships_circular_inheritance(self):
         yaml = self.MINIMAL_BLUEPRINT + """
 relationships:
@@ -0,0 +1,207 @@
+########
+# Copyright (c) 2015 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+from mock import patch
+
+from dsl_parser import (constants,
+                        deadline as _deadline,
+                        exceptions,
+                        parser as dsl_parser,
+                        type_library)
+from dsl_parser.elements import (node_types,
+                                 blueprint)
+from dsl_parser.framework import parser as framework_parser
+from dsl_parser.tests.abstract_test_parser import AbstractTestParser
+
+IMPORTED_TYPES = """
+plugins:
+    test_plugin:
+        executor: central_deployment_agent
+        source: dummy
+data_types:
+    endpoint:
+        properties:
+            host:
+                type: string
+                default: localhost
+            port:
+                type: integer
+                default: 80
+node_types:
+    cloudify.nodes.Root:
+        interfaces:
+            lifecycle:
+                create: test_plugin.create
+        properties:
+            endpoint:
+                type: endpoint
+    cloudify.nodes.Compute:
+        derived_from: cloudify.nodes.Root
+        properties:
+            endpoint:
+                type: endpoint
+                default:
+                    port: 22
+relationships:
+    cloudify.relationships.depends_on:
+        source_interfaces:
+            relationship:
+                preconfigure: test_plugin.preconfigure
+    cloudify.relationships.contained_in:
+        derived_from: cloudify.relationships.depends_on
+"""
+
+BLUEPRINT = """
+node_types:
+    web:
+        derived_from: cloudify.nodes.Compute
+node_templates:
+    host:
+        type: cloudify.nodes.Compute
+    server:
+        type: web
+        relationships:
+            -   type: cloudify.relationships.contained_in
+                target: host
+"""
+
+
+class TestTypeLibrary(AbstractTestParser):
+
+    def setUp(self):
+        super(TestTypeLibrary, self).setUp()
+        type_library.type_libraries.clear()
+        self.addCleanup(type_library.type_libraries.clear)
+
+    def _blueprint(self, imported_content=IMPORTED_TYPES, extra=''):
+        imported = self.make_yaml_file(imported_content)
+        return self.BASIC_VERSION_SECTION_DSL_1_2 + """
+imports:
+    -   {0}
+""".format(imported) + BLUEPRINT + extra
+
+    def _parse_without_library(self, yaml):
+        with patch.object(type_library, 'prelinked_types',
+                          lambda **kwargs: None):
+            return self.parse(yaml)
+
+    def _count_parsed_node_types(self, yaml):
+        parsed = []
+        original_parse = node_types.NodeType.parse
+
+        def counting_parse(element, **kwargs):
+            parsed.append(element.name)
+            return original_parse(element, **kwargs)
+        with patch.object(node_types.NodeType, 'parse', counting_parse):
+            plan = self.parse(yaml)
+        return plan, parsed
+
+    def test_same_plan_as_without_library(self):
+        yaml = self._blueprint()
+        expected = self._parse_without_library(yaml)
+        self.assertEqual(expected, self.parse(yaml))
+        self.assertEqual(expected, self.parse(yaml))
+        self.assertEqual(1, type_library.type_libraries.hits)
+        server = self.get_node_by_name(expected, 'server')
+        self.assertEqual({'host': 'localhost', 'port': 22},
+                         server['properties']['endpoint'])
+        self.assertEqual(['cloudify.nodes.Root',
+                          'cloudify.nodes.Compute',
+                          'web'], server['type_hierarchy'])
+
+    def test_imported_types_are_parsed_once(self):
+        yaml = self._blueprint()
+        _, parsed = self._count_parsed_node_types(yaml)
+        self.assertEqual(['web'], parsed[-1:])
+        _, parsed = self._count_parsed_node_types(yaml)
+        self.assertEqual(['web'], parsed)
+
+    def test_library_shared_by_blueprints_with_same_imports(self):
+        imported = self.make_yaml_file(IMPORTED_TYPES)
+        for node_name in ['a', 'b']:
+            yaml = self.BASIC_VERSION_SECTION_DSL_1_2 + """
+imports:
+    -   {0}
+node_templates:
+    {1}:
+        type: cloudify.nodes.Compute
+""".format(imported, node_name)
+            self.parse(yaml)
+        self.assertEqual(1, len(type_library.type_libraries))
+        self.assertEqual(1, type_library.type_libraries.hits)
+
+    def test_library_keyed_by_parse_inputs(self):
+        yaml = self._blueprint()
+        self.parse(yaml)
+        self.parse(yaml, validate_version=False)
+        self.assertEqual(2, len(type_library.type_libraries))
+
+    def test_relationships_not_prelinked_with_blueprint_plugins(self):
+        yaml = self._blueprint(extra="""
+plugins:
+    other_plugin:
+        executor: central_deployment_agent
+        source: dummy
+""")
+        recorded = []
+        original = type_library.prelinked_types
+
+        def recording_prelinked_types(**kwargs):
+            recorded.append(original(**kwargs))
+            return recorded[-1]
+        with patch.object(type_library, 'prelinked_types',
+                          recording_prelinked_types):
+            plan = self.parse(yaml)
+        self.assertEqual(self._parse_without_library(yaml), plan)
+        self.assertEqual([constants.DATA_TYPES, constants.NODE_TYPES],
+                         sorted(recorded[0]))
+
+    def test_failed_library_is_cached(self):
+        # an imported type derived from a type of the main blueprint
+        # cannot be parsed on its own
+        yaml = self._blueprint(imported_content=IMPORTED_TYPES.replace(
+            'node_types:\n',
+            'node_types:\n    imported:\n        derived_from: web\n'))
+        libraries = []
+        original_parse = framework_parser.parse
+
+        def recording_parse(value, element_cls, **kwargs):
+            if element_cls is blueprint.TypeLibrary:
+                libraries.append(value)
+            return original_parse(value, element_cls, **kwargs)
+        with patch.object(framework_parser, 'parse', recording_parse):
+            first = self.parse(yaml)
+            second = self.parse(yaml)
+        self.assertEqual(first, second)
+        self.assertEqual(self._parse_without_library(yaml), second)
+        self.assertEqual(1, len(libraries))
+        self.assertEqual(1, type_library.type_libraries.hits)
+
+    def test_interrupted_library_is_not_cached(self):
+        yaml = self._blueprint()
+        original_parse = framework_parser.parse
+
+        def cancelling_parse(value, element_cls, **kwargs):
+            if element_cls is blueprint.TypeLibrary:
+                _deadline.current().cancel()
+            return original_parse(value, element_cls, **kwargs)
+        with patch.object(framework_parser, 'parse', cancelling_parse):
+            self.assertRaises(exceptions.DSLParsingDeadlineException,
+                              dsl_parser.parse, yaml,
+                              deadline=_deadline.Deadline(60))
+        self.assertEqual(0, len(type_library.type_libraries))
+        self.parse(yaml)
+        _, parsed = self._count_parsed_node_types(yaml)
+        self.assertEqual(['web'], parsed)
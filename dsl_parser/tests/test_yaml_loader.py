@@ -0,0 +1,209 @@
+########
+# Copyright (c) 2015 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+import testtools
+
+from dsl_parser import (yaml_loader,
+                        utils,
+                        exceptions)
+from dsl_parser.tests.abstract_test_parser import AbstractTestParser
+
+DOCUMENT = """
+tosca_definitions_version: cloudify_dsl_1_2
+imports:
+    - http://www.getcloudify.org/types.yaml
+    - plugin.yaml
+node_types:
+    type: &type
+        derived_from: cloudify.nodes.Root
+        properties:
+            port: { default: 8080 }
+            ratio: { default: 0.5 }
+            enabled: { default: true }
+            nothing: { default: null }
+            created: { default: 2015-01-01 }
+    other_type: *type
+node_templates:
+    node:
+        type: type
+        relationships:
+            -   type: cloudify.relationships.contained_in
+                target: 'host'
+tags: !!set { a, b }
+"""
+
+
+def _dump(holder):
+    value = holder.value
+    if isinstance(value, dict):
+        value = sorted((_dump(k), _dump(v)) for k, v in value.iteritems())
+    elif isinstance(value, (list, set)):
+        value = sorted(_dump(v) for v in value)
+    return (repr(value),
+            holder.start_line,
+            holder.start_column,
+            holder.end_line,
+            holder.end_column,
+            holder.filename)
+
+
+class TestYamlLoader(testtools.TestCase):
+
+    def setUp(self):
+        super(TestYamlLoader, self).setUp()
+        if yaml_loader.CMarkedLoader is None:
+            self.skipTest('PyYAML is not built with libyaml')
+
+    def test_default_loader(self):
+        self.assertIs(yaml_loader.CMarkedLoader, yaml_loader.DefaultLoader)
+
+    def test_libyaml_holders_match_pure_python_holders(self):
+        pure = yaml_loader.load(DOCUMENT, 'blueprint.yaml',
+                                loader_cls=yaml_loader.MarkedLoader)
+        libyaml = yaml_loader.load(DOCUMENT, 'blueprint.yaml',
+                                   loader_cls=yaml_loader.CMarkedLoader)
+        self.assertEqual(_dump(pure), _dump(libyaml))
+        self.assertEqual(pure.restore(), libyaml.restore())
+
+    def test_libyaml_empty_document(self):
+        result = yaml_loader.load('', 'empty.yaml',
+                                  loader_cls=yaml_loader.CMarkedLoader)
+        self.assertEqual({}, result.value)
+        self.assertEqual('empty.yaml', result.filename)
+
+    def test_libyaml_illegal_yaml(self):
+        self.assertRaises(exceptions.DSLParsingFormatException,
+                          utils.load_yaml,
+                          raw_yaml='key: [1, 2',
+                          error_message='Failed to parse DSL')
+
+
+class TestHoldersCache(AbstractTestParser):
+
+    def setUp(self):
+        super(TestHoldersCache, self).setUp()
+        yaml_loader.holders_cache.clear()
+        self.addCleanup(yaml_loader.holders_cache.clear)
+
+    def test_cache_hit(self):
+        first = utils.load_yaml(DOCUMENT, 'error', filename='blueprint.yaml')
+        second = utils.load_yaml(DOCUMENT, 'error', filename='blueprint.yaml')
+        self.assertIs(first, second)
+        self.assertEqual(1, yaml_loader.holders_cache.hits)
+        self.assertEqual(1, yaml_loader.holders_cache.misses)
+
+    def test_cache_key_includes_filename(self):
+        first = utils.load_yaml(DOCUMENT, 'error', filename='a.yaml')
+        second = utils.load_yaml(DOCUMENT, 'error', filename='b.yaml')
+        self.assertIsNot(first, second)
+        self.assertEqual('b.yaml', second.filename)
+
+    def test_cache_key_includes_content(self):
+        first = utils.load_yaml('a: 1', 'error', filename='a.yaml')
+        second = utils.load_yaml('a: 2', 'error', filename='a.yaml')
+        self.assertEqual({'a': 1}, first.restore())
+        self.assertEqual({'a': 2}, second.restore())
+
+    def test_merging_imports_does_not_modify_cached_holders(self):
+        imported = self.make_yaml_file("""
+node_types:
+    imported_type: {}
+""")
+        blueprint = self.BASIC_VERSION_SECTION_DSL_1_0 + """
+imports:
+    -   {0}
+node_types:
+    test_type: {{}}
+node_templates:
+    node:
+        type: test_type
+""".format(imported)
+        first = self.parse(blueprint)
+        cached = utils.load_yaml(blueprint, 'error')
+        self.assertEqual(['test_type'],
+                         cached.get_item('node_types')[1].restore().keys())
+        second = self.parse(blueprint)
+        self.assertEqual(first, second)
+        self.assertGreater(yaml_loader.holders_cache.hits, 0)
+
+
+class TestLoadHeader(testtools.TestCase):
+
+    KEYS = ['tosca_definitions_version', 'imports']
+
+    def _loaders(self):
+        loaders = [yaml_loader.MarkedLoader]
+        if yaml_loader.CMarkedLoader is not None:
+            loaders.append(yaml_loader.CMarkedLoader)
+        return loaders
+
+    def test_header_holders_match_full_load(self):
+        full = yaml_loader.load(DOCUMENT, 'blueprint.yaml')
+        for loader_cls in self._loaders():
+            header = yaml_loader.load_header(DOCUMENT, 'blueprint.yaml',
+                                             self.KEYS,
+                                             loader_cls=loader_cls)
+            self.assertEqual(
+                {'tosca_definitions_version': 'cloudify_dsl_1_2',
+                 'imports': ['http://www.getcloudify.org/types.yaml',
+                             'plugin.yaml']},
+                header.restore())
+            for key in self.KEYS:
+                self.assertEqual(
+                    [_dump(h) for h in full.get_item(key)],
+                    [_dump(h) for h in header.get_item(key)])
+
+    def test_reading_stops_after_keys(self):
+        document = DOCUMENT.replace('tags:', 'tags: [not, yaml')
+        document = """
+imports: [a.yaml]
+tosca_definitions_version: cloudify_dsl_1_2
+""" + document.split('imports:')[0] + 'node_templates: [never'
+        for loader_cls in self._loaders():
+            header = yaml_loader.load_header(document, 'blueprint.yaml',
+                                             self.KEYS,
+                                             loader_cls=loader_cls)
+            self.assertEqual({'tosca_definitions_version': 'cloudify_dsl_1_2',
+                              'imports': ['a.yaml']},
+                             header.restore())
+
+    def test_missing_keys(self):
+        header = yaml_loader.load_header('a: {b: c}\nd: [e]', 'f.yaml',
+                                         self.KEYS)
+        self.assertEqual({}, header.value)
+        self.assertEqual('f.yaml', header.filename)
+
+    def test_empty_document(self):
+        header = yaml_loader.load_header('', 'f.yaml', self.KEYS)
+        self.assertEqual({}, header.value)
+
+    def test_not_a_mapping(self):
+        header = yaml_loader.load_header('[1, 2]', 'f.yaml', self.KEYS)
+        self.assertEqual([1, 2], header.restore())
+
+    def test_alias_to_header_anchor(self):
+        header = yaml_loader.load_header("""
+tosca_definitions_version: &v cloudify_dsl_1_2
+imports: [*v]
+""", 'f.yaml', self.KEYS)
+        self.assertEqual(['cloudify_dsl_1_2'],
+                         header.get_item('imports')[1].restore())
+
+    def test_alias_to_skipped_anchor(self):
+        self.assertRaises(exceptions.DSLParsingFormatException,
+                          utils.load_yaml_header,
+                          raw_yaml='a: &v x\nimports: [*v]',
+                          error_message='Failed to parse DSL',
+                          keys=self.KEYS)
@@ -0,0 +1,188 @@
+########
+# Copyright (c) 2015 GigaSpaces Technologies Ltd. All rights reserved
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+#    * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    * See the License for the specific language governing permissions and
+#    * limitations under the License.
+
+"""
+Prelinked type libraries.
+
+Most blueprints import the same types and plugins files. The node types,
+relationships and data types those imports define are parsed once, on
+their own, and the parsed types are then prelinked into every blueprint
+importing the same files, which only parses its own types and templates.
+
+Types parsed on their own can only refer to types, data types and
+plugins of the imports, so they are parsed to the same values in any
+blueprint that imports them. Imports whose types cannot be parsed on
+their own (e.g. types derived from a type of the main blueprint) are not
+prelinked, and neither are relationships when the main blueprint adds
+plugins, as their operations are mapped by the names of all plugins.
+
+Operation mappings of the types may be scripts of the blueprint, so a
+library records which scripts it found and is parsed again when one of
+them was added or removed since.
+"""
+
+from dsl_parser import (cache,
+                        constants,
+                        exceptions,
+                        holder,
+                        utils,
+                        version as _version)
+from dsl_parser.elements import blueprint
+from dsl_parser.framework import parser
+from dsl_parser.framework.parser import Prelinked
+
+DEFAULT_TYPE_LIBRARIES_CACHE_SIZE = 32
+
+# parsed type libraries keyed by the version, resource base and
+# validate_version of the parse and by the (filename, content digest) of
+# each import. imports whose types failed to parse on their own are cached
+# as FAILED, so they are not parsed again. nothing is cached for a library
+# parse interrupted by the deadline of the parse.
+type_libraries = cache.LRUCache(DEFAULT_TYPE_LIBRARIES_CACHE_SIZE)
+
+FAILED = object()
+
+_SECTIONS = [constants.PLUGINS,
+             constants.NODE_TYPES,
+             constants.RELATIONSHIPS,
+             constants.DATA_TYPES]
+
+
+def prelinked_types(imported_blueprints,
+                    blueprint_holder,
+                    resource_base,
+                    validate_version,
+                    existence_cache=None,
+                    limits=None):
+    """Returns the types of ``imported_blueprints`` (as ordered by the
+    imports stage) to prelink into the parse of the merged blueprint
+    ``blueprint_holder``, in the format of the ``prelinked`` argument of
+    framework.parser.parse, or None."""
+    if not imported_blueprints:
+        return None
+    _, version_holder = blueprint_holder.get_item(_version.VERSION)
+    key = (version_holder.value if version_holder else None,
+           resource_base,
+           validate_version,
+           tuple((imported['parsed'].filename, imported['digest'])
+                 for imported in imported_blueprints))
+    library = type_libraries.get(key)
+    if library is None or (library is not FAILED and
+                           _changed(library['existence_checks'],
+                                    existence_cache)):
+        library = _parse_type_library(imported_blueprints,
+                                      version_holder,
+                                      resource_base,
+                                      validate_version,
+                                      existence_cache,
+                                      limits)
+        type_libraries.put(key, library)
+    if library is FAILED:
+        return None
+    prelinked = {
+        constants.NODE_TYPES: library[constants.NODE_TYPES],
+        constants.DATA_TYPES: library[constants.DATA_TYPES]
+    }
+    if _section_keys(blueprint_holder, constants.PLUGINS) == \
+            library[constants.PLUGINS]:
+        prelinked[constants.RELATIONSHIPS] = library[constants.RELATIONSHIPS]
+    return prelinked
+
+
+def _parse_type_library(imported_blueprints,
+                        version_holder,
+                        resource_base,
+                        validate_version,
+                        existence_cache,
+                        limits=None):
+    recorder = _ExistenceRecorder(existence_cache)
+    library_holder = holder.Holder(value={})
+    if version_holder is not None:
+        library_holder.value[holder.Holder(_version.VERSION)] = version_holder
+    for section in _SECTIONS:
+        section_holders = [_section(imported['parsed'], section)
+                           for imported in imported_blueprints]
+        section_holders = [h for h in section_holders if h is not None]
+        # sections are only added if imported, as some are not supported
+        # by older dsl versions
+        if not section_holders:
+            continue
+        merged = {}
+        for section_holder in section_holders:
+            merged.update(section_holder.value)
+        library_holder.value[holder.Holder(section)] = holder.Holder(merged)
+    try:
+        library = parser.parse(value=library_holder,
+                               element_cls=blueprint.TypeLibrary,
+                               inputs={
+                                   'resource_base': resource_base,
+                                   'validate_version': validate_version,
+                                   'existence_cache': recorder
+                               },
+                               limits=limits)
+    except exceptions.DSLParsingDeadlineException:
+        # the parse was interrupted, not the library found unparsable
+        raise
+    except exceptions.DSLParsingException, ex:
+        if ex.err_code == exceptions.ERROR_CODE_LIMIT_EXCEEDED:
+            raise
+        return FAILED
+    for section in [constants.NODE_TYPES,
+                    constants.RELATIONSHIPS,
+                    constants.DATA_TYPES]:
+        library[section] = dict(
+            (name, Prelinked(value=parsed['value'],
+                             provided=parsed['provided']))
+            for name, parsed in library[section].iteritems())
+    library['existence_checks'] = recorder.checks
+    return library
+
+
+def _changed(existence_checks, existence_cache):
+    exists = existence_cache.exists if existence_cache is not None \
+        else utils.url_exists
+    return any(exists(url) != existed
+               for url, existed in existence_checks.iteritems())
+
+
+class _ExistenceRecorder(object):
+
+    def __init__(self, existence_cache):
+        self.existence_cache = existence_cache
+        self.checks = {}
+
+    def exists(self, url):
+        if self.existence_cache is not None:
+            exists = self.existence_cache.exists(url)
+        else:
+            exists = utils.url_exists(url)
+        self.checks[url] = exists
+        return exists
+
+
+def _section(dsl_holder, section):
+    if not isinstance(dsl_holder.value, dict):
+        return None
+    _, section_holder = dsl_holder.get_item(section)
+    if section_holder is None or not isinstance(section_holder.value, dict):
+        return None
+    return section_holder
+
+
+def _section_keys(dsl_holder, section):
+    section_holder = _section(dsl_holder, section)
+    if section_holder is None:
+        return set()
+    return set(key_holder.value for key_holder in section_holder.value)
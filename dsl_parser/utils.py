@@ -69,7 +69,8 @@ def merge_schemas(overridden_schema,
                     path=[],
                     raise_on_missing_property=False)
                 if default_value:
-                    merged[key]['default'] = default_value
+                    merged[key] = dict(overriding_property,
+                                       default=default_value)
     return merged
 
 
@@ -231,14 +232,30 @@ def parse_value(
             value))
 
 
-def load_yaml(raw_yaml, error_message, filename=None):
+def load_yaml(raw_yaml, error_message, filename=None, limits=None):
+    """``limits`` (a limits.ParsingLimits) bounds the size of the document
+    before it is loaded and its aliases and nesting while it is."""
+    if limits is not None:
+        limits.check_document_bytes(raw_yaml, filename)
     try:
-        return yaml_loader.load(raw_yaml, filename)
+        return yaml_loader.load_cached(raw_yaml, filename, limits=limits)
     except yaml.parser.ParserError, ex:
         raise DSLParsingFormatException(-1, '{0}: Illegal yaml; {1}'
                                         .format(error_message, ex))
 
 
+def load_yaml_header(raw_yaml, error_message, keys, filename=None,
+                     limits=None):
+    if limits is not None:
+        limits.check_document_bytes(raw_yaml, filename)
+    try:
+        return yaml_loader.load_header(raw_yaml, filename, keys,
+                                       limits=limits)
+    except (yaml.parser.ParserError, yaml.composer.ComposerError), ex:
+        raise DSLParsingFormatException(-1, '{0}: Illegal yaml; {1}'
+                                        .format(error_message, ex))
+
+
 def url_exists(url):
     try:
         with contextlib.closing(urllib2.urlopen(url)):
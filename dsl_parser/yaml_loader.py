@@ -13,6 +13,11 @@
 #    * See the License for the specific language governing permissions and
 #    * limitations under the License.
 
+import collections
+import hashlib
+
+from yaml import (events,
+                  nodes)
 from yaml.reader import Reader
 from yaml.scanner import Scanner
 from yaml.composer import Composer
@@ -20,14 +25,28 @@ from yaml.resolver import Resolver
 from yaml.parser import Parser
 from yaml.constructor import SafeConstructor
 
-from dsl_parser import holder
+try:
+    from yaml.cyaml import CParser
+except ImportError:
+    # PyYAML was built without the libyaml C extension
+    CParser = None
+
+from dsl_parser import (holder,
+                        cache)
+
+DEFAULT_HOLDERS_CACHE_SIZE = 256
+
+# parsed holder trees keyed by (digest of the raw yaml, filename).
+# cached trees are shared between loads so they must never be mutated,
+# callers that need to modify a tree must copy the modified holders first.
+holders_cache = cache.LRUCache(DEFAULT_HOLDERS_CACHE_SIZE)
 
 
 class HolderConstructor(SafeConstructor):
 
     def __init__(self, filename):
         SafeConstructor.__init__(self)
-        self.filename = filename
+        self.filename = holder.intern_filename(filename)
 
     def construct_yaml_null(self, node):
         obj = SafeConstructor.construct_yaml_null(self, node)
@@ -145,10 +164,210 @@ class MarkedLoader(Reader, Scanner, Parser, Composer, HolderConstructor,
         Resolver.__init__(self)
 
 
-def load(stream, filename):
-    result = MarkedLoader(stream, filename).get_single_data()
+if CParser is not None:
+    class CMarkedLoader(CParser, HolderConstructor, Resolver):
+        """Same as MarkedLoader, only reading, scanning, parsing and
+        composing are done by libyaml. Nodes composed by libyaml carry the
+        same marks so the constructed holders are identical."""
+
+        def __init__(self, stream, filename=None):
+            CParser.__init__(self, stream)
+            HolderConstructor.__init__(self, filename)
+            Resolver.__init__(self)
+else:
+    CMarkedLoader = None
+
+DefaultLoader = CMarkedLoader or MarkedLoader
+
+
+class _LimitedComposer(Composer):
+    """A composer checking the alias expansions and the nesting depth of
+    the nodes against ``limits`` (a limits.ParsingLimits) while they are
+    composed, so a document over the limits fails before it is composed
+    further, or recursed into too deeply."""
+
+    def __init__(self, limits=None):
+        Composer.__init__(self)
+        self.limits = limits
+        self._depth = 0
+        self._alias_expansions = 0
+        # id of composed node -> (size with aliases expanded, depth)
+        self._expanded = {}
+
+    def compose_node(self, parent, index):
+        if self.limits is None:
+            return Composer.compose_node(self, parent, index)
+        if self.check_event(events.AliasEvent):
+            node = self.anchors.get(self.peek_event().anchor)
+            if node is not None:
+                expanded = self._expanded.get(id(node))
+                if expanded is None:
+                    # an alias of a node that is being composed
+                    raise self.limits.recursive_alias(self.filename)
+                self._alias_expansions += expanded[0]
+                self.limits.check_alias_expansions(self._alias_expansions,
+                                                   self.filename)
+                self.limits.check_nesting_depth(self._depth + expanded[1],
+                                                self.filename)
+            return Composer.compose_node(self, parent, index)
+        # the C parser matches the exact event classes
+        collection = self.check_event(events.SequenceStartEvent,
+                                      events.MappingStartEvent)
+        if collection:
+            self._depth += 1
+            self.limits.check_nesting_depth(self._depth, self.filename)
+        node = Composer.compose_node(self, parent, index)
+        if collection:
+            self._depth -= 1
+        self._expanded[id(node)] = self._node_expanded(node)
+        return node
+
+    def _node_expanded(self, node):
+        if isinstance(node, nodes.SequenceNode):
+            children = node.value
+        elif isinstance(node, nodes.MappingNode):
+            children = [child for pair in node.value for child in pair]
+        else:
+            return 1, 0
+        children = [self._expanded[id(child)] for child in children]
+        return (1 + sum(size for size, _ in children),
+                1 + max([depth for _, depth in children] or [0]))
+
+
+class _LimitedLoader(_LimitedComposer, HolderConstructor, Resolver):
+    """Composes and constructs holders from the events of ``loader``,
+    checking the nodes against ``limits``. The events are read from
+    ``loader`` as they are composed."""
+
+    def __init__(self, loader, filename, limits):
+        _LimitedComposer.__init__(self, limits)
+        HolderConstructor.__init__(self, filename)
+        Resolver.__init__(self)
+        self.check_event = loader.check_event
+        self.peek_event = loader.peek_event
+        self.get_event = loader.get_event
+
+
+class _EventsLoader(_LimitedComposer, HolderConstructor, Resolver):
+    """Composes and constructs holders from events read by another
+    loader, checking the nodes against ``limits`` if given. Anchors are
+    kept across the loaded nodes."""
+
+    def __init__(self, filename, limits=None):
+        _LimitedComposer.__init__(self, limits)
+        HolderConstructor.__init__(self, filename)
+        Resolver.__init__(self)
+        self._events = collections.deque()
+
+    def check_event(self, *choices):
+        if not self._events:
+            return False
+        if not choices:
+            return True
+        return isinstance(self._events[0], choices)
+
+    def peek_event(self):
+        return self._events[0]
+
+    def get_event(self):
+        return self._events.popleft()
+
+    def load_node(self, node_events):
+        self._events.extend(node_events)
+        node = self.compose_node(None, None)
+        return self.construct_document(node)
+
+
+def load(stream, filename, loader_cls=None, limits=None):
+    """Loads the holder tree of the document ``stream``. ``limits``
+    (a limits.ParsingLimits) are checked while the document is composed,
+    in python, from the events of the loader."""
+    loader_cls = loader_cls or DefaultLoader
+    loader = loader_cls(stream, filename)
+    if limits is not None and limits.checks_nodes():
+        loader = _LimitedLoader(loader, filename, limits)
+    result = loader.get_single_data()
     if result is None:
         # load of empty string returns None so we convert it to an empty
         # dict
         result = holder.Holder.of({}, filename=filename)
     return result
+
+
+def _node_events(loader, keep=True):
+    """Reads the events of the next node. Returns them, or only the last
+    one if ``keep`` is False."""
+    result = []
+    depth = 0
+    while True:
+        event = loader.get_event()
+        if keep:
+            result.append(event)
+        if isinstance(event, events.CollectionStartEvent):
+            depth += 1
+        elif isinstance(event, events.CollectionEndEvent):
+            depth -= 1
+        if depth == 0:
+            return result if keep else [event]
+
+
+def load_header(stream, filename, keys, loader_cls=None, limits=None):
+    """Reads the top level mapping of a document event by event and
+    returns a dict holder of the ``keys`` entries found in it, checking
+    their nodes against ``limits``, as ``load`` does.
+
+    Reading stops as soon as all ``keys`` were read, the values of other
+    entries are skipped without being composed, so aliases to anchors in
+    skipped values cannot be resolved. If the document is not a mapping,
+    it is loaded as is."""
+    loader_cls = loader_cls or DefaultLoader
+    loader = loader_cls(stream, filename)
+    if limits is not None and not limits.checks_nodes():
+        limits = None
+    events_loader = _EventsLoader(filename, limits)
+    loader.get_event()
+    if loader.check_event(events.StreamEndEvent):
+        return holder.Holder.of({}, filename=filename)
+    loader.get_event()
+    if not loader.check_event(events.MappingStartEvent):
+        return events_loader.load_node(_node_events(loader))
+
+    mapping_start = loader.get_event()
+    end_mark = mapping_start.end_mark
+    remaining = set(keys)
+    result = {}
+    while remaining and not loader.check_event(events.MappingEndEvent):
+        key_events = _node_events(loader)
+        key_event = key_events[0]
+        wanted = (isinstance(key_event, events.ScalarEvent) and
+                  key_event.value in remaining)
+        value_events = _node_events(loader, keep=wanted)
+        end_mark = value_events[-1].end_mark
+        if wanted:
+            remaining.discard(key_event.value)
+            key_holder = events_loader.load_node(key_events)
+            result[key_holder] = events_loader.load_node(value_events)
+    return holder.Holder(value=result,
+                         start_line=mapping_start.start_mark.line,
+                         start_column=mapping_start.start_mark.column,
+                         end_line=end_mark.line,
+                         end_column=end_mark.column,
+                         filename=holder.intern_filename(filename))
+
+
+def load_cached(stream, filename, limits=None):
+    """Same as load, only identical (stream, filename) pairs are loaded
+    once and the resulting holder tree is shared. A document over
+    ``limits`` is not cached, and cached trees are checked against them
+    too."""
+    if not isinstance(stream, basestring):
+        return load(stream, filename, limits=limits)
+    raw = stream.encode('utf-8') if isinstance(stream, unicode) else stream
+    key = (hashlib.sha1(raw).hexdigest(), filename)
+    result = holders_cache.get(key)
+    if result is None:
+        result = load(stream, filename, limits=limits)
+        holders_cache.put(key, result)
+    elif limits is not None:
+        limits.check_document(result, filename)
+    return result
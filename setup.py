@@ -34,6 +34,11 @@ try:
 except ImportError:
     install_requires.append('importlib')
 
+try:
+    import argparse  # NOQA
+except ImportError:
+    install_requires.append('argparse')
+
 setup(
     name='cloudify-dsl-parser',
     version='3.4a1',
@@ -47,5 +52,10 @@ setup(
     license='LICENSE',
     description='Cloudify DSL parser',
     zip_safe=False,
-    install_requires=install_requires
+    install_requires=install_requires,
+    entry_points={
+        'console_scripts': [
+            'dsl-parser = dsl_parser.cli:main'
+        ]
+    }
 )